@@ -0,0 +1,23 @@
+"""Drop cached users (``usercache.py``) when a user row changes."""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import usercache
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=User, dispatch_uid='usercache_user_saved')
+@receiver(post_delete, sender=User, dispatch_uid='usercache_user_deleted')
+def _user_changed(sender, instance, **kwargs):
+    try:
+        usercache.invalidate(instance.pk)
+        # Also after commit, so a request that read the old row meanwhile
+        # does not keep it cached under the new version
+        transaction.on_commit(lambda: usercache.invalidate(instance.pk))
+    except Exception:
+        logger.exception("User cache: failed to invalidate user %s", instance.pk)
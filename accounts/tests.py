@@ -0,0 +1,41 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from . import usercache
+from .models import Roles, User
+
+
+@override_settings(AUTH_USER_CACHE=True)
+class UserCacheTests(TestCase):
+    """Blocking or demoting a user reaches sessions served from ``usercache``."""
+
+    def setUp(self):
+        usercache.clear()
+        self.creator = User.objects.create(username='test_creator', role=Roles.CREATOR)
+        self.admin = User.objects.create(username='test_admin', role=Roles.ADMIN, is_staff=True)
+        self.client.force_login(self.creator)
+        self.target = Client()
+        self.target.force_login(self.admin)
+        self.dashboard = reverse('admin_dashboard')
+        # Loads the admin into the cache
+        self.assertEqual(self.target.get(self.dashboard, secure=True).status_code, 200)
+
+    def test_toggle_active_logs_out_cached_session(self):
+        self.client.post(reverse('toggle_active', args=[self.admin.pk]), secure=True)
+        response = self.target.get(self.dashboard, secure=True)
+        self.assertRedirects(response, reverse('accounts:login') + f'?next={self.dashboard}',
+                             fetch_redirect_response=False)
+
+    def test_remove_admin_drops_cached_role(self):
+        self.client.post(reverse('remove_admin', args=[self.admin.pk]), secure=True)
+        self.admin.refresh_from_db()
+        self.assertEqual(self.admin.role, Roles.STAFF)
+        response = self.target.get(self.dashboard, secure=True)
+        self.assertNotEqual(response.status_code, 200)
+
+    @override_settings(AUTH_USER_CACHE=False)
+    def test_without_shared_cache_change_from_another_worker_is_seen(self):
+        # update() sends no signal, like a save in a worker whose bump
+        # does not reach this one (per-process cache)
+        User.objects.filter(pk=self.admin.pk).update(role=Roles.STAFF)
+        self.assertNotEqual(self.target.get(self.dashboard, secure=True).status_code, 200)
@@ -0,0 +1,108 @@
+"""Per-process cache of logged-in users.
+
+Without it every request loads its user with a SELECT on ``accounts_user``
+before ``role_required`` can look at the role. ``get_user(request)`` keeps
+the verified user per worker, keyed on the user id, the auth backend and
+the session auth hash stored in the session, so a session whose hash no
+longer matches (password change) is still checked against the database and
+logged out as before.
+
+* saving or deleting a user (``make_admin*``, ``remove_admin``,
+  ``toggle_active``, password or profile edits) bumps that user's version
+  in Django's cache framework (see ``signals.py``); every request compares
+  its entry's version with it, so with a shared cache (``REDIS_URL``) all
+  workers see the change on their next request;
+* with the default per-process cache other workers do not see the bump, so
+  entries also expire after ``AUTH_USER_CACHE_TTL`` seconds. A blocked or
+  demoted user would keep working there until then, which is why
+  ``AUTH_USER_CACHE`` is only on by default with ``REDIS_URL``.
+
+Each request gets its own copy of the cached user, so attributes set on
+``request.user`` never leak into other requests. ``AUTH_USER_CACHE=False``
+restores Django's behaviour.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+
+MAX_ENTRIES = 1000
+
+_lock = threading.Lock()
+_entries = OrderedDict()    # (user id, backend, session hash) -> (user, version, loaded_at)
+
+
+def _version_key(user_id):
+    return f'auth_user:{user_id}:version'
+
+
+def _version(user_id):
+    try:
+        return cache.get(_version_key(user_id), 0)
+    except Exception:
+        return None
+
+
+def invalidate(user_id):
+    """Make every worker reload this user on its next request."""
+    with _lock:
+        for key in [k for k in _entries if k[0] == user_id]:
+            del _entries[key]
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        # Start from the clock so a restarted cache never repeats a version
+        cache.add(_version_key(user_id), int(time.time()))
+    except Exception:
+        pass
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def _session_key(request):
+    session = request.session
+    try:
+        user_id = auth.get_user_model()._meta.pk.to_python(session[SESSION_KEY])
+        return user_id, session[BACKEND_SESSION_KEY], session.get(HASH_SESSION_KEY)
+    except KeyError:
+        return None
+
+
+def get_user(request):
+    """Like ``django.contrib.auth.get_user``, served from the cache when possible."""
+    if not getattr(settings, 'AUTH_USER_CACHE', True):
+        return auth.get_user(request)
+    key = _session_key(request)
+    if key is None or not key[2]:
+        return auth.get_user(request)
+    version = _version(key[0])
+    if version is not None:
+        with _lock:
+            entry = _entries.get(key)
+        if entry and entry[1] == version and time.monotonic() - entry[2] < settings.AUTH_USER_CACHE_TTL:
+            return copy.copy(entry[0])
+
+    # Full check: loads the user and verifies (or flushes) the session
+    user = auth.get_user(request)
+    if version is not None and user.is_authenticated:
+        key = _session_key(request)
+        if key and key[0] == user.pk and key[2]:
+            with _lock:
+                _entries[key] = (copy.copy(user), version, time.monotonic())
+                _entries.move_to_end(key)
+                while len(_entries) > MAX_ENTRIES:
+                    _entries.popitem(last=False)
+    return user
+
+
+async def aget_user(request):
+    return await sync_to_async(get_user)(request)
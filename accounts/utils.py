@@ -1,8 +1,40 @@
 from functools import wraps
+from inspect import iscoroutinefunction
+
+
+def _deny(request):
+    # If user is authenticated but not allowed:
+    # log them out and redirect to login page instead of 403
+    try:
+        from django.contrib.auth import logout
+        from django.conf import settings
+        from django.shortcuts import redirect
+        logout(request)
+        return redirect(getattr(settings, 'LOGIN_URL', '/accounts/login/'))
+    except Exception:
+        from django.shortcuts import redirect
+        return redirect('/accounts/login/')
 
 
 def role_required(allowed_roles):
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            # Async views (ASGI mode): load the user without blocking the event
+            # loop and cache it on request.user, so the view and the template
+            # context processors do not query it again
+            @wraps(view_func)
+            async def _async_wrapped(request, *args, **kwargs):
+                user = await request.auser()
+                request.user = user
+                if not user.is_authenticated:
+                    from django.contrib.auth.views import redirect_to_login
+                    return redirect_to_login(request.get_full_path())
+                if user.role in allowed_roles or user.is_superuser:
+                    return await view_func(request, *args, **kwargs)
+                from asgiref.sync import sync_to_async
+                return await sync_to_async(_deny)(request)
+            return _async_wrapped
+
         @wraps(view_func)
         def _wrapped(request, *args, **kwargs):
             if not request.user.is_authenticated:
@@ -10,16 +42,6 @@ def role_required(allowed_roles):
                 return redirect_to_login(request.get_full_path())
             if request.user.role in allowed_roles or request.user.is_superuser:
                 return view_func(request, *args, **kwargs)
-            # If user is authenticated but not allowed:
-            # log them out and redirect to login page instead of 403
-            try:
-                from django.contrib.auth import logout
-                from django.conf import settings
-                from django.shortcuts import redirect
-                logout(request)
-                return redirect(getattr(settings, 'LOGIN_URL', '/accounts/login/'))
-            except Exception:
-                from django.shortcuts import redirect
-                return redirect('/accounts/login/')
+            return _deny(request)
         return _wrapped
     return decorator
@@ -5,3 +5,5 @@ class AppointmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appointments'
 
+    def ready(self):
+        from . import signals  # noqa: F401
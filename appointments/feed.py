@@ -0,0 +1,239 @@
+"""Live updates for the price (Admin 2) and cashier (Admin 3) queue pages.
+
+Every change that moves an appointment into, within or out of a queue is
+appended to ``QueueEvent`` by ``signals.py``: a booking, a price, a payment
+or a deletion. The queue page opens a Server-Sent Events stream
+(``queue_feed`` view) which reads the events after the last one it has
+seen and sends, for every affected appointment, either the rendered table
+row (``{"id", "html"}``) or ``{"id", "remove": true}`` when the appointment
+has left that queue. Rows always reflect the current state, so replaying
+an event twice is harmless.
+
+Waiting for new events: on PostgreSQL the stream LISTENs on a channel that
+every event NOTIFYs (delivered on commit); elsewhere, and behind PgBouncer
+in transaction mode (``QUEUE_FEED_LISTEN=False``), it polls the table
+every ``QUEUE_FEED_POLL_SECONDS``. A stream ends after
+``QUEUE_FEED_MAX_SECONDS`` and the browser reconnects with the last event
+id, so a sync worker is never held for long. Under ASGI the view serves
+``astream()`` instead, which waits without holding a thread.
+
+Event ids are allocated before commit, so a slower transaction can commit
+an id lower than one already sent. Events from the last few seconds are
+therefore re-read and those not sent yet are delivered late rather than
+lost.
+"""
+import json
+import logging
+import select
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import QueueEvent
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'klinika_queue_events'
+GRACE = timedelta(seconds=10)
+
+QUEUES = {
+    'price': Q(service_price__isnull=True),
+    'cashier': Q(service_price__isnull=False, payment__isnull=True),
+}
+
+
+def record(appointment_id, kind):
+    """Log a queue change (inside the caller's transaction)."""
+    QueueEvent.objects.create(appointment_id=appointment_id, kind=kind)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, str(appointment_id)])
+
+
+def last_event_id():
+    return QueueEvent.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+async def alast_event_id():
+    return (await QueueEvent.objects.aaggregate(last=Max('pk')))['last'] or 0
+
+
+class _Poller:
+    def __init__(self):
+        self.interval = getattr(settings, 'QUEUE_FEED_POLL_SECONDS', 1.0)
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+
+    def close(self):
+        pass
+
+
+class _PgListener:
+    """Blocks on the connection socket until a NOTIFY arrives (psycopg 2 or 3)."""
+
+    def __init__(self):
+        connection.ensure_connection()
+        self.raw = connection.connection
+        self.pending = False
+        if hasattr(self.raw, 'add_notify_handler'):
+            # psycopg 3 hands notifications to handlers as it reads them
+            self.raw.add_notify_handler(self._notified)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+    def _notified(self, notify):
+        self.pending = True
+
+    def _take(self):
+        """Whether a notification has been read (psycopg 2 queues them, psycopg 3 calls us)."""
+        received, self.pending = self.pending, False
+        if hasattr(self.raw, 'poll'):
+            received = received or bool(self.raw.notifies)
+            self.raw.notifies.clear()
+        return received
+
+    def wait(self, timeout):
+        # A NOTIFY read together with the last query's results leaves no
+        # data on the socket: do not sleep through it
+        if self._take():
+            return
+        if select.select([self.raw], [], [], timeout) != ([], [], []):
+            if hasattr(self.raw, 'poll'):
+                self.raw.poll()
+            else:
+                pgconn = self.raw.pgconn
+                pgconn.consume_input()
+                while pgconn.notifies():
+                    pass
+            self._take()
+
+    def close(self):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('UNLISTEN *')
+            if hasattr(self.raw, 'remove_notify_handler'):
+                self.raw.remove_notify_handler(self._notified)
+        except Exception:
+            pass
+
+
+def _waiter():
+    listen = getattr(settings, 'QUEUE_FEED_LISTEN', True)
+    if listen and connection.vendor == 'postgresql' and not connection.in_atomic_block:
+        try:
+            listener = _PgListener()
+            if hasattr(listener.raw, 'fileno'):
+                return listener
+            listener.close()
+        except Exception:
+            logger.exception("Queue feed: LISTEN failed, polling instead")
+    return _Poller()
+
+
+def _message(event_id, payload):
+    return f"id: {event_id}\nevent: row\ndata: {json.dumps(payload)}\n\n"
+
+
+def render_changes(ids, queue, user):
+    """SSE payloads for the appointments ``ids`` as seen on ``queue``."""
+    from .rows import list_queryset, with_actions
+    rows = {a.pk: a for a in with_actions(list_queryset().filter(pk__in=ids).filter(QUEUES[queue]), user)}
+    for pk in ids:
+        ap = rows.get(pk)
+        if ap is None:
+            yield {'id': pk, 'remove': True}
+        else:
+            html = render_to_string('appointments/_appointment_row.html', {'a': ap, 'user': user})
+            yield {'id': pk, 'html': html}
+
+
+class _Feed:
+    """State of one stream: the cursor and the grace-window bookkeeping."""
+
+    def __init__(self, queue, user, after):
+        self.queue = queue
+        self.user = user
+        self.after = after
+        self.recent = {}  # event id -> created_at, for re-reading the grace window
+        self.max_seconds = getattr(settings, 'QUEUE_FEED_MAX_SECONDS', 30)
+        self.keepalive = 15
+        self.started = self.last_write = time.monotonic()
+        self.idle = True
+
+    def open(self):
+        return f"retry: {int(getattr(settings, 'QUEUE_FEED_RETRY_MS', 3000))}\n\n"
+
+    def running(self):
+        return time.monotonic() - self.started < self.max_seconds
+
+    def step(self):
+        """Messages for the events since the last step ([] when idle)."""
+        messages = []
+        now = timezone.now()
+        events = list(QueueEvent.objects
+                      .filter(Q(pk__gt=self.after) | Q(created_at__gte=now - GRACE))
+                      .exclude(pk__in=list(self.recent))
+                      .order_by('pk')
+                      .values_list('pk', 'appointment_id', 'created_at')[:500])
+        if events:
+            for pk, _, created_at in events:
+                self.recent[pk] = created_at
+            self.after = max(self.after, events[-1][0])
+            ids = list(dict.fromkeys(e[1] for e in events))
+            for payload in render_changes(ids, self.queue, self.user):
+                messages.append(_message(self.after, payload))
+            self.last_write = time.monotonic()
+        self.recent = {pk: at for pk, at in self.recent.items() if at >= now - GRACE}
+        if time.monotonic() - self.last_write >= self.keepalive:
+            messages.append(": ping\n\n")
+            self.last_write = time.monotonic()
+        self.idle = not events
+        return messages
+
+    def timeout(self):
+        return min(self.keepalive, max(0.0, self.max_seconds - (time.monotonic() - self.started)))
+
+
+def stream(queue, user, after):
+    """Generator of SSE messages for ``queue`` starting after event ``after``."""
+    feed = _Feed(queue, user, after)
+    waiter = _waiter()
+    try:
+        yield feed.open()
+        while feed.running():
+            yield from feed.step()
+            if feed.idle:
+                waiter.wait(feed.timeout())
+    finally:
+        waiter.close()
+
+
+async def astream(queue, user, after):
+    """``stream()`` as an async generator, for ASGI workers.
+
+    Django can only serve a synchronous iterator under ASGI by reading it to
+    the end first, which would hold every message back until the stream
+    closes. Here each step runs in a worker thread and the wait between
+    steps is an ``asyncio.sleep``, so an open stream costs the server no
+    thread while idle. It polls every ``QUEUE_FEED_POLL_SECONDS`` also on
+    PostgreSQL (LISTEN needs a dedicated blocking connection).
+    """
+    import asyncio
+
+    from asgiref.sync import sync_to_async
+
+    feed = _Feed(queue, user, after)
+    interval = getattr(settings, 'QUEUE_FEED_POLL_SECONDS', 1.0)
+    step = sync_to_async(feed.step)
+    yield feed.open()
+    while feed.running():
+        for message in await step():
+            yield message
+        if feed.idle:
+            await asyncio.sleep(min(feed.timeout(), interval))
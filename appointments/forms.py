@@ -1,9 +1,12 @@
 from django import forms
+from django.urls import reverse
 from .models import Appointment
 
 
 class AppointmentForm(forms.ModelForm):
     patient_name = forms.CharField(label="Bemor ism familiyasi")
+    # Filled in by the autocomplete when an existing patient is picked
+    patient_id = forms.IntegerField(required=False, widget=forms.HiddenInput)
 
     class Meta:
         model = Appointment
@@ -17,5 +20,6 @@ class AppointmentForm(forms.ModelForm):
             'placeholder': 'Ism familiya kiriting',
             'autocomplete': 'off',
             'list': 'patients_suggest',
+            'data-search-url': reverse('patients:search'),
         })
 
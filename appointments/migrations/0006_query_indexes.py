@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0005_remove_appointment_complaint_delete_complaint'),
+        ('doctors', '0003_doctor_code_prefix_and_receipt_serial'),
+        ('patients', '0002_alter_patient_options_alter_patient_address_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['-date', '-time'], name='appt_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', '-date', '-time'], name='appt_doctor_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('service_price__isnull', True)), fields=['-date', '-time'], name='appt_unpriced_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('service_price__isnull', False)), fields=['-date', '-time'], name='appt_priced_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['created_at'], name='appt_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_query_indexes'),
+        ('doctors', '0003_doctor_code_prefix_and_receipt_serial'),
+        ('patients', '0004_patient_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_date_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_doctor_date_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_unpriced_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_priced_idx',
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['-date', '-time', '-id'], name='appt_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', '-date', '-time', '-id'], name='appt_doctor_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('service_price__isnull', True)), fields=['-date', '-time', '-id'], name='appt_unpriced_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('service_price__isnull', False)), fields=['-date', '-time', '-id'], name='appt_priced_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueueEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appointment_id', models.BigIntegerField(verbose_name='Qabul')),
+                ('kind', models.CharField(choices=[('created', 'Yaratildi'), ('priced', 'Narx belgilandi'), ('paid', "To'landi"), ('deleted', "O'chirildi")], max_length=10, verbose_name='Turi')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Navbat hodisasi',
+                'verbose_name_plural': 'Navbat hodisalari',
+            },
+        ),
+    ]
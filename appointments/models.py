@@ -30,3 +30,43 @@ class Appointment(models.Model):
     class Meta:
         verbose_name = "Qabul"
         verbose_name_plural = "Qabullar"
+        indexes = [
+            # Queue/list pages: ORDER BY -date, -time, -id (+ date range filters);
+            # the id makes the key unique for keyset pagination
+            models.Index(fields=['-date', '-time', '-id'], name='appt_date_time_idx'),
+            # doctor_appointments: WHERE doctor_id = ? ORDER BY -date, -time, -id
+            models.Index(fields=['doctor', '-date', '-time', '-id'], name='appt_doctor_date_time_idx'),
+            # Admin 2 queue: only appointments still waiting for a price
+            models.Index(fields=['-date', '-time', '-id'], name='appt_unpriced_idx',
+                         condition=models.Q(service_price__isnull=True)),
+            # Admin 3 queue: priced appointments (payment is checked per row)
+            models.Index(fields=['-date', '-time', '-id'], name='appt_priced_idx',
+                         condition=models.Q(service_price__isnull=False)),
+            # Retention purge: WHERE created_at < cutoff
+            models.Index(fields=['created_at'], name='appt_created_at_idx'),
+        ]
+
+
+class QueueEvent(models.Model):
+    """Change log of appointments for the live queue pages (see feed.py).
+
+    Only the appointment id is stored: the feed always sends the row's
+    current state. Not a foreign key, so deletions can be logged too.
+    """
+
+    class Kind(models.TextChoices):
+        CREATED = 'created', 'Yaratildi'
+        PRICED = 'priced', 'Narx belgilandi'
+        PAID = 'paid', "To'landi"
+        DELETED = 'deleted', "O'chirildi"
+
+    appointment_id = models.BigIntegerField("Qabul")
+    kind = models.CharField("Turi", max_length=10, choices=Kind.choices)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.appointment_id}"
+
+    class Meta:
+        verbose_name = "Navbat hodisasi"
+        verbose_name_plural = "Navbat hodisalari"
@@ -0,0 +1,45 @@
+"""Log queue changes for the live queue pages (see feed.py)."""
+import logging
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from payments.models import Payment
+
+from . import feed
+from .models import Appointment, QueueEvent
+
+logger = logging.getLogger(__name__)
+
+
+def _record(appointment_id, kind):
+    from dashboard.signals import is_suspended
+    if is_suspended():
+        return  # retention purge
+    try:
+        feed.record(appointment_id, kind)
+    except Exception:
+        logger.exception("Queue feed: failed to log %s for appointment %s", kind, appointment_id)
+
+
+@receiver(post_save, sender=Appointment, dispatch_uid='queue_appointment_saved')
+def _appointment_saved(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        _record(instance.pk, QueueEvent.Kind.CREATED)
+    elif update_fields is None or 'service_price' in update_fields:
+        _record(instance.pk, QueueEvent.Kind.PRICED)
+
+
+@receiver(post_delete, sender=Appointment, dispatch_uid='queue_appointment_deleted')
+def _appointment_deleted(sender, instance, **kwargs):
+    _record(instance.pk, QueueEvent.Kind.DELETED)
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='queue_payment_saved')
+@receiver(post_delete, sender=Payment, dispatch_uid='queue_payment_deleted')
+def _payment_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    _record(instance.appointment_id, QueueEvent.Kind.PAID)
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time as dtime
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+from doctors.models import Doctor
+from doctors.utils import doc_number_allocator, next_doc_no
+from patients.models import Patient
+from payments.models import Payment
+
+from .models import Appointment
+
+# (page, user role, url) -> SQL queries the page runs, whatever the number of
+# rows on it (database sessions, cached users: the session SELECT is
+# included). Change a number only together with the change that needs it.
+QUERY_BUDGET = {
+    ('list', 'creator', '/appointments/'): 2,
+    ('queue_price', 'creator', '/appointments/queue/price/'): 3,
+    ('queue_price', 'admin2', '/appointments/queue/price/'): 3,
+    ('queue_cashier', 'creator', '/appointments/queue/cashier/'): 3,
+    ('queue_cashier', 'admin3', '/appointments/queue/cashier/'): 3,
+    ('doctor_appointments', 'admin3', '/admin/doctors/{doctor}/appointments/'): 3,
+}
+
+
+# Counted with the default session/auth setup, whatever SESSION_MODE is set
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', AUTH_USER_CACHE=True)
+class ListQueryCountTests(TestCase):
+    """The appointment list and queue pages load payment state in the page
+    query (``rows.py``): their query count does not grow with the rows."""
+
+    rows = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = Doctor.objects.create(full_name='Tekshiruv Shifokor', department='Terapiya',
+                                           phone='+998900000000', room_number='1')
+        cls.patient = Patient.objects.create(full_name='Tekshiruv Bemor', phone='+998900000001')
+        cls.users = {
+            role: User.objects.create(username=f'test_{role}', role=role)
+            for role in {role for _, role, _ in QUERY_BUDGET}
+        }
+
+    def add(self, count):
+        """``count`` rows in each state: unpriced, unpaid, paid."""
+        today = timezone.localdate()
+        for i in range(count):
+            t = dtime(8 + i // 60 % 12, i % 60)
+            Appointment.objects.create(doctor=self.doctor, patient=self.patient, date=today, time=t)
+            Appointment.objects.create(doctor=self.doctor, patient=self.patient, date=today, time=t,
+                                       service_price=Decimal('50000'))
+            paid = Appointment.objects.create(doctor=self.doctor, patient=self.patient, date=today, time=t,
+                                              service_price=Decimal('50000'))
+            Payment.objects.create(appointment=paid, amount=paid.service_price, method='cash')
+
+    def assertPageQueries(self, rows):
+        for (page, role, url), budget in QUERY_BUDGET.items():
+            url = url.format(doctor=self.doctor.pk)
+            with self.subTest(page=page, role=role, rows=rows):
+                self.client.force_login(self.users[role])
+                self.client.get(url, secure=True)  # warm per-process caches (clinic settings, ...)
+                with self.assertNumQueries(budget):
+                    response = self.client.get(url, secure=True)
+                self.assertEqual(response.status_code, 200)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add(1)
+        self.assertPageQueries(1)
+        self.add(self.rows - 1)
+        self.assertPageQueries(self.rows)
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs concurrent writers and row locks (PostgreSQL)")
+class ConcurrentDocNumberTests(TransactionTestCase):
+    """Parallel bookings for one doctor get distinct ``doc_no`` values, and
+    with the default block of 1 (``SEQUENCE_BLOCK_SIZE``) no gaps."""
+
+    bookings = 500
+    threads = 32
+
+    def test_parallel_bookings(self):
+        doctor = Doctor.objects.create(full_name='Stress test', department='Stress', phone='',
+                                       room_number='-', code_prefix='ZZ')
+        patient = Patient.objects.create(full_name='Stress test', phone='')
+        doc_number_allocator().reset(doctor.pk)
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        def book(i):
+            try:
+                if i < barrier.parties:
+                    barrier.wait(timeout=30)
+                now = timezone.localtime()
+                ap = Appointment(doctor=doctor, patient=patient, date=now.date(), time=now.time())
+                ap.doc_no = next_doc_no(doctor.pk)
+                ap.save()
+            except Exception as e:  # collect and report, do not stop other workers
+                errors.append(repr(e))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            list(pool.map(book, range(self.bookings)))
+        self.assertEqual(errors, [])
+        numbers = sorted(Appointment.objects.filter(doctor=doctor).values_list('doc_no', flat=True))
+        self.assertEqual(len(numbers), self.bookings)
+        self.assertEqual(len(set(numbers)), len(numbers), "duplicate doc_no")
+        if doc_number_allocator().block == 1:
+            self.assertEqual(numbers, list(range(1, self.bookings + 1)))
@@ -11,4 +11,5 @@ urlpatterns = [
     path('<int:appointment_id>/set_price/', views.appointment_set_price, name='set_price'),
     path('queue/price/', views.appointments_pending_price, name='queue_price'),
     path('queue/cashier/', views.appointments_for_cashier, name='queue_cashier'),
+    path('queue/<str:queue>/feed/', views.queue_feed, name='queue_feed'),
 ]
@@ -1,16 +1,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.template.response import TemplateResponse
 from django.utils import timezone
 
 from accounts.utils import role_required
  
 from patients.models import Patient
+from patients.search import find_patient, normalize_name
+from klinika_project.pagination import akeyset_page
+from doctors.utils import next_doc_no
+from .feed import QUEUES
+from .rows import list_queryset, with_actions
 from .models import Appointment, AppointmentStatus
 # from payments.models import Payment, PaymentMethod
 from .forms import AppointmentForm
 from django import forms
 
+# List pages page through appointments newest first (see klinika_project.pagination).
+# They and the two queues are async views: under ASGI (SERVER_MODE=asgi) their
+# queries run without tying up a worker; TemplateResponse is rendered by Django
+# in a thread afterwards, since template tags may still touch the ORM.
+APPOINTMENT_ORDER = ('-date', '-time', '-id')
+
 
 @login_required
 @role_required(['creator', 'admin', 'admin1', 'staff'])
@@ -21,32 +33,31 @@ def appointment_create(request):
             ap = form.save(commit=False)
             ap.created_by = request.user
             ap.status = AppointmentStatus.WAITING
-            # Map patient_name -> Patient record (create if not exists)
+            # Map patient_name -> Patient record: the patient picked in the
+            # autocomplete, else one with the same normalised name, else new
             full_name = form.cleaned_data.get('patient_name').strip()
-            patient, _ = Patient.objects.get_or_create(full_name=full_name, defaults={'phone': ''})
+            patient = None
+            patient_id = form.cleaned_data.get('patient_id')
+            if patient_id:
+                patient = Patient.objects.filter(pk=patient_id).first()
+                if patient and patient.search_name != normalize_name(full_name):
+                    patient = None  # name edited after picking a suggestion
+            if patient is None:
+                patient = find_patient(full_name) or Patient.objects.create(full_name=full_name, phone='')
             ap.patient = patient
             # Auto date/time: today + now (local time)
             ap.date = timezone.localdate()
             ap.time = timezone.localtime(timezone.now()).time()
-            # Assign sequential document number per doctor
-            doc = ap.doctor
-            try:
-                doc.receipt_serial = (doc.receipt_serial or 0) + 1
-            except Exception:
-                doc.receipt_serial = 1
-            ap.doc_no = doc.receipt_serial
-            try:
-                doc.save(update_fields=['receipt_serial'])
-            except Exception:
-                doc.save()
+            # Assign sequential document number per doctor. The counter is
+            # bumped by a single atomic UPDATE, so the doctor row is locked
+            # only for that statement, not for the whole booking.
+            ap.doc_no = next_doc_no(ap.doctor_id)
             ap.save()
             messages.success(request, 'Qabul saqlandi (sana/vaqt avtomatik). Kvitansiya tayyor.')
             return redirect(f"/appointments/receipt/{ap.id}/?auto=1")
     else:
         form = AppointmentForm()
-    # Patient name suggestions (last 50)
-    suggestions = list(Patient.objects.order_by('-created_at').values_list('full_name', flat=True)[:50])
-    return render(request, 'appointments/appointment_form.html', {'form': form, 'patient_suggestions': suggestions})
+    return render(request, 'appointments/appointment_form.html', {'form': form})
 
 
 @login_required
@@ -55,8 +66,8 @@ def appointment_receipt(request, appointment_id):
     ap = get_object_or_404(Appointment.objects.select_related('doctor', 'patient'), pk=appointment_id)
     # Optional clinic settings
     try:
-        from dashboard.models import Setting
-        setting = Setting.objects.first()
+        from dashboard.clinic import get_setting
+        setting = get_setting()
     except Exception:
         setting = None
     auto = request.GET.get('auto') == '1'
@@ -68,33 +79,26 @@ def appointment_receipt(request, appointment_id):
         'auto_print': auto,
     }
     from django.template.loader import render_to_string
+    from django.http import HttpResponse
     html = render_to_string('appointments/receipt.html', context)
     # If auto print requested, return HTML (JS can trigger print dialog)
     if auto:
-        from django.http import HttpResponse
-        return HttpResponse(html)
-    try:
-        from weasyprint import HTML
-        pdf = HTML(string=html).write_pdf()
-        from django.http import HttpResponse
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="appointment_{ap.id}.pdf"'
-        return response
-    except Exception:
-        from django.http import HttpResponse
         return HttpResponse(html)
+    from payments.receipts import pdf_response
+    return pdf_response(request, 'appointment', ap.id, html, f"appointment_{ap.id}.pdf")
 
 
 @login_required
 @role_required(['creator', 'admin', 'doctor', 'staff', 'admin2', 'admin3'])
-def appointment_list(request):
+async def appointment_list(request):
     role = getattr(request.user, 'role', None)
     if role == 'admin2':
         return redirect('appointments:queue_price')
     if role == 'admin3':
         return redirect('appointments:queue_cashier')
-    items = Appointment.objects.select_related('doctor', 'patient').order_by('-date', '-time')[:100]
-    return render(request, 'appointments/appointment_list.html', {'appointments': items})
+    page = await akeyset_page(request, list_queryset(), APPOINTMENT_ORDER, per_page=100)
+    with_actions(page, request.user)
+    return TemplateResponse(request, 'appointments/appointment_list.html', {'appointments': page, 'page': page})
 
 
 class SetPriceForm(forms.Form):
@@ -143,30 +147,32 @@ def advance_queue(request, appointment_id, action):
 
 @login_required
 @role_required(['creator', 'admin', 'admin2'])
-def appointments_pending_price(request):
-    items = (Appointment.objects
-             .select_related('doctor', 'patient')
-             .filter(service_price__isnull=True)
-             .order_by('-date', '-time')[:200])
+async def appointments_pending_price(request):
+    feed = await _feed_context(request, 'price')
+    page = await akeyset_page(request, list_queryset().filter(QUEUES['price']), APPOINTMENT_ORDER, per_page=200)
+    with_actions(page, request.user)
     ctx = {
-        'appointments': items,
+        **feed,
+        'appointments': page,
+        'page': page,
         'page_title': "Narx belgilash uchun (Admin 2)",
     }
-    return render(request, 'appointments/appointment_list.html', ctx)
+    return TemplateResponse(request, 'appointments/appointment_list.html', ctx)
 
 
 @login_required
 @role_required(['creator', 'admin', 'admin3'])
-def appointments_for_cashier(request):
-    items = (Appointment.objects
-             .select_related('doctor', 'patient')
-             .filter(service_price__isnull=False, payment__isnull=True)
-             .order_by('-date', '-time')[:200])
+async def appointments_for_cashier(request):
+    feed = await _feed_context(request, 'cashier')
+    page = await akeyset_page(request, list_queryset().filter(QUEUES['cashier']), APPOINTMENT_ORDER, per_page=200)
+    with_actions(page, request.user)
     ctx = {
-        'appointments': items,
+        **feed,
+        'appointments': page,
+        'page': page,
         'page_title': "To'lov qabul qilish uchun (Admin 3)",
     }
-    return render(request, 'appointments/appointment_list.html', ctx)
+    return TemplateResponse(request, 'appointments/appointment_list.html', ctx)
 
 
 @login_required
@@ -174,8 +180,8 @@ def appointments_for_cashier(request):
 def appointment_price_receipt(request, appointment_id):
     ap = get_object_or_404(Appointment.objects.select_related('doctor', 'patient'), pk=appointment_id)
     try:
-        from dashboard.models import Setting
-        setting = Setting.objects.first()
+        from dashboard.clinic import get_setting
+        setting = get_setting()
     except Exception:
         setting = None
     auto = request.GET.get('auto') == '1'
@@ -187,17 +193,47 @@ def appointment_price_receipt(request, appointment_id):
         'auto_print': auto,
     }
     from django.template.loader import render_to_string
+    from django.http import HttpResponse
     html = render_to_string('appointments/price_receipt.html', context)
+    # If auto print requested, return HTML (JS can trigger print dialog)
     if auto:
-        from django.http import HttpResponse
         return HttpResponse(html)
+    from payments.receipts import pdf_response
+    return pdf_response(request, 'price', ap.id, html, f"appointment_price_{ap.id}.pdf")
+
+
+async def _feed_context(request, queue):
+    """Live-update settings for a queue page (first page only).
+
+    The last event id is read before the rows, so any change made while the
+    page renders is sent again by the feed rather than missed.
+    """
+    if request.GET.get('cursor'):
+        return {}
+    from django.urls import reverse
+    from .feed import alast_event_id
+    return {'feed_url': reverse('appointments:queue_feed', args=[queue]), 'feed_after': await alast_event_id()}
+
+
+@login_required
+@role_required(['creator', 'admin', 'admin2', 'admin3'])
+def queue_feed(request, queue):
+    """Server-Sent Events stream of row changes for a queue page (see feed.py)."""
+    from django.core.handlers.asgi import ASGIRequest
+    from django.http import Http404, HttpResponse, StreamingHttpResponse
+    from .feed import astream, stream
+    allowed = {'price': ('creator', 'admin', 'admin2'), 'cashier': ('creator', 'admin', 'admin3')}
+    if queue not in allowed:
+        raise Http404
+    if request.user.role not in allowed[queue] and not request.user.is_superuser:
+        return HttpResponse(status=403)
     try:
-        from weasyprint import HTML
-        pdf = HTML(string=html).write_pdf()
-        from django.http import HttpResponse
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="appointment_price_{ap.id}.pdf"'
-        return response
-    except Exception:
-        from django.http import HttpResponse
-        return HttpResponse(html)
+        after = int(request.headers.get('Last-Event-ID') or request.GET.get('after') or 0)
+    except ValueError:
+        after = 0
+    # Under ASGI a synchronous iterator would be read to the end before sending
+    events = astream if isinstance(request, ASGIRequest) else stream
+    response = StreamingHttpResponse(events(queue, request.user, after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
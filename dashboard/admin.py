@@ -1,8 +1,30 @@
 from django.contrib import admin
-from .models import Setting
+from .models import Counter, ExportJob, ImportJob, Setting
 
 
 @admin.register(Setting)
 class SettingAdmin(admin.ModelAdmin):
     list_display = ('clinic_name', 'clinic_phone')
 
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'requested_by', 'created_at', 'queue_ms', 'render_ms', 'size')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'queue_ms', 'render_ms', 'size')
+
+
+@admin.register(Counter)
+class CounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source_name', 'status', 'rows_done', 'rows_failed', 'patients_created',
+                    'appointments_created', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('checksum', 'rows_done', 'rows_failed', 'patients_created', 'patients_matched',
+                       'appointments_created', 'first_date', 'last_date', 'elapsed_ms', 'row_errors',
+                       'created_at', 'started_at', 'updated_at', 'finished_at')
@@ -0,0 +1,238 @@
+"""Cached data of the statistics page, one entry per chart and date range.
+
+``get(name, start, end)`` returns the JSON-ready data of one chart; the page
+renders from it and ``/admin/dashboard/stats/charts/<name>/`` serves it, so
+the browser can load the charts in parallel.
+
+Entries are stored in Django's cache framework under a key built from the
+chart name, the range and a generation number:
+
+* a range that ends before today only changes when an older day is written
+  (backdated payment, import, rollup rebuild, retention purge). It uses the
+  *history* generation and is kept ``STATS_CACHE_HISTORY_TTL`` seconds;
+* a range that includes today uses the *live* generation, bumped after every
+  committed write that reaches ``DailyRollup`` (``rollups.apply``), and is
+  kept at most ``STATS_CACHE_LIVE_TTL`` seconds.
+
+Entries computed on the read replica (``klinika_project.replica``) are kept
+at most ``STATS_CACHE_LIVE_TTL`` seconds whatever the range, since a
+replica lagging behind a bump would otherwise pin its stale result under
+the new generation.
+
+With the default per-process cache a bump is only seen by the process that
+made the write; other workers fall back to the TTLs (and without
+``REDIS_URL`` the history TTL defaults to the live one). Set ``REDIS_URL``
+to share the cache (and the generations) between workers.
+"""
+import logging
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from klinika_project import replica
+
+from . import ledger, reports, rollups
+
+logger = logging.getLogger(__name__)
+
+LIVE_KEY = 'stats:gen:live'
+HISTORY_KEY = 'stats:gen:history'
+
+
+# --- Generations ---------------------------------------------------------------
+
+def _generation(key):
+    try:
+        value = cache.get(key)
+        if value is None:
+            # Start from the clock so a restarted cache never reuses old keys
+            cache.add(key, int(time.time()))
+            value = cache.get(key, 0)
+        return value
+    except Exception:
+        logger.exception("Stats cache: cannot read %s", key)
+        return None
+
+
+def _bump(*keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, int(time.time()))
+        except Exception:
+            logger.exception("Stats cache: cannot bump %s", key)
+
+
+def touch(days=()):
+    """Invalidate cached ranges after a write to ``days`` (once it commits).
+
+    Ranges including today are always invalidated; closed ranges only when
+    one of the days is in the past (or ``days`` is empty: unknown).
+    """
+    today = timezone.localdate()
+    keys = [LIVE_KEY]
+    if not days or any(d is None or d < today for d in days):
+        keys.append(HISTORY_KEY)
+    transaction.on_commit(lambda: _bump(*keys))
+
+
+# --- Charts --------------------------------------------------------------------
+
+def _days(start, end):
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def appointments_per_day(start, end):
+    counts = rollups.appointments_by_day(start, end)
+    days = _days(start, end)
+    return {'labels': [d.isoformat() for d in days], 'data': [counts.get(d, 0) for d in days]}
+
+
+def departments(start, end):
+    rows = rollups.appointments_by_department(start, end)
+    return {'labels': [r['department'] or "Noma'lum" for r in rows], 'data': [r['total'] for r in rows]}
+
+
+def unique_patients_per_day(start, end):
+    from appointments.models import Appointment
+    counts = dict(Appointment.objects.filter(date__gte=start, date__lte=end)
+                  .values('date').annotate(total=Count('patient', distinct=True))
+                  .order_by().values_list('date', 'total'))
+    days = _days(start, end)
+    return {'labels': [d.isoformat() for d in days], 'data': [counts.get(d, 0) for d in days]}
+
+
+def doctors(start, end):
+    rows = rollups.appointments_by_doctor(start, end).order_by('doctor__full_name')
+    return {'rows': [{'id': r['doctor__id'], 'full_name': r['doctor__full_name'],
+                      'department': r['doctor__department'], 'total': r['total']} for r in rows]}
+
+
+def finance(start, end):
+    data, rows = reports.finance_report(start, end)
+    data['rows'] = rows
+    return data
+
+
+def admin3_payments(start, end):
+    qs = reports.admin3_payments(start, end)
+    rows = [
+        {
+            'id': p.pk,
+            'created_at': timezone.localtime(p.created_at).strftime('%Y-%m-%d %H:%M'),
+            'patient': getattr(p.appointment.patient, 'full_name', ''),
+            'doctor': getattr(p.appointment.doctor, 'full_name', ''),
+            'amount': p.amount,
+            'method': p.get_method_display(),
+            'cashier': getattr(p.cashier, 'username', ''),
+        }
+        for p in qs
+    ]
+    total = qs.aggregate(total=Sum('amount'))['total']
+    return {'rows': rows, 'total': float(total or 0)}
+
+
+# name -> (function(start, end), default length in days; None: whole history)
+CHARTS = {
+    'last30': (appointments_per_day, 30),
+    'departments': (departments, 30),
+    'weekly_patients': (unique_patients_per_day, 7),
+    'doctors': (doctors, 30),
+    'finance': (finance, None),
+    'admin3': (admin3_payments, 30),
+}
+
+
+def default_range(name, today=None):
+    today = today or timezone.localdate()
+    days = CHARTS[name][1]
+    if days is None:
+        return ledger.first_day() or (today - timedelta(days=30)), today
+    return today - timedelta(days=days - 1), today
+
+
+def data_span(today=None):
+    """First and last day with ``DailyRollup`` rows, widened to include today.
+
+    Cached under the live generation, which every rollup write bumps.
+    """
+    from .models import DailyRollup
+    today = today or timezone.localdate()
+    generation = _generation(LIVE_KEY)
+    key = f'stats:span:{generation}'
+    span = None
+    if generation is not None:
+        try:
+            span = cache.get(key)
+        except Exception:
+            logger.exception("Stats cache: cannot read %s", key)
+    if span is None:
+        span = DailyRollup.objects.aggregate(first=Min('day'), last=Max('day'))
+        span = (span['first'] or today, span['last'] or today)
+        if generation is not None:
+            try:
+                cache.set(key, span, settings.STATS_CACHE_LIVE_TTL)
+            except Exception:
+                logger.exception("Stats cache: cannot store %s", key)
+    return min(span[0], today), max(span[1], today)
+
+
+def parse_range(name, start=None, end=None):
+    """Dates from ISO strings; missing or invalid values fall back to the default range.
+
+    The range is clamped to the days with data (``data_span``) and the
+    default range, so a request cannot build and cache millions of days.
+    """
+    default_start, default_end = default_range(name)
+    try:
+        start = date.fromisoformat(start) if start else default_start
+    except (TypeError, ValueError):
+        start = default_start
+    try:
+        end = date.fromisoformat(end) if end else default_end
+    except (TypeError, ValueError):
+        end = default_end
+    if end < start:
+        start, end = end, start
+    first, last = data_span()
+    first, last = min(first, default_start), max(last, default_end)
+    start = min(max(start, first), last)
+    end = min(max(end, first), last)
+    return start, end
+
+
+def get(name, start=None, end=None):
+    """Chart data for [start, end] (dates or ISO strings), from the cache when possible."""
+    if name not in CHARTS:
+        raise KeyError(name)
+    start, end = parse_range(name, start and str(start), end and str(end))
+    live = end >= timezone.localdate()
+    generation = _generation(LIVE_KEY if live else HISTORY_KEY)
+    key = f'stats:{name}:{generation}:{start.isoformat()}:{end.isoformat()}'
+    if generation is not None:
+        try:
+            data = cache.get(key)
+        except Exception:
+            logger.exception("Stats cache: cannot read %s", key)
+            data = None
+        if data is not None:
+            return data
+    data = CHARTS[name][0](start, end)
+    data.update(start=start.isoformat(), end=end.isoformat())
+    if generation is not None:
+        ttl = settings.STATS_CACHE_LIVE_TTL if live else settings.STATS_CACHE_HISTORY_TTL
+        if replica.current_alias() == replica.REPLICA:
+            # The generation is bumped on the primary at commit; the replica
+            # may not have the write yet, so keep its result only briefly
+            ttl = min(ttl, settings.STATS_CACHE_LIVE_TTL)
+        try:
+            cache.set(key, data, ttl)
+        except Exception:
+            logger.exception("Stats cache: cannot store %s", key)
+    return data
@@ -0,0 +1,101 @@
+"""Cached access to the clinic ``Setting`` row.
+
+The clinic name, address, phone and receipt footer are shown on almost
+every page and on every receipt, but change only when a creator edits the
+settings form. ``get_setting()`` keeps a read-only snapshot of them per
+process and reloads it only when the settings have changed:
+
+* saving or deleting a ``Setting`` bumps a version number kept in Django's
+  cache framework (see ``signals.py``); each process compares its snapshot's
+  version with it at most once every ``SETTING_CACHE_CHECK_SECONDS``, so all
+  gunicorn workers pick up an edit within that interval when the cache is
+  shared (``REDIS_URL``);
+* with the default per-process cache other workers do not see the bump, so
+  snapshots also expire after ``SETTING_CACHE_TTL`` seconds.
+
+``receipt_serial`` is not part of the snapshot: it is allocated by
+``payments.utils`` and always read from the database.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'clinic_setting:version'
+
+
+@dataclass(frozen=True)
+class ClinicSettings:
+    pk: int
+    clinic_name: str
+    clinic_address: str
+    clinic_phone: str
+    receipt_footer: str
+    last_cleanup: Optional[date]
+
+    def __str__(self):
+        return self.clinic_name
+
+
+_lock = threading.Lock()
+_snapshot = None          # (ClinicSettings or None, version, loaded_at, checked_at)
+
+
+def _shared_version():
+    try:
+        return cache.get(VERSION_KEY, 0)
+    except Exception:
+        return None
+
+
+def _load():
+    from .models import Setting
+
+    row = Setting.objects.order_by('pk').values(
+        'pk', 'clinic_name', 'clinic_address', 'clinic_phone', 'receipt_footer', 'last_cleanup').first()
+    return ClinicSettings(**row) if row else None
+
+
+def get_setting():
+    """The clinic settings (``ClinicSettings``), or None if none are saved yet."""
+    global _snapshot
+    now = time.monotonic()
+    snap = _snapshot
+    if snap is not None:
+        value, version, loaded_at, checked_at = snap
+        if now - loaded_at < getattr(settings, 'SETTING_CACHE_TTL', 60):
+            if now - checked_at < getattr(settings, 'SETTING_CACHE_CHECK_SECONDS', 2):
+                return value
+            if _shared_version() == version:
+                _snapshot = (value, version, loaded_at, now)
+                return value
+    with _lock:
+        # Read the version first: a save racing with the load bumps it again
+        # and the next check reloads
+        version = _shared_version()
+        value = _load()
+        _snapshot = (value, version, now, now)
+    return value
+
+
+def clinic_name(default='Klinika'):
+    setting = get_setting()
+    return (setting.clinic_name if setting else '') or default
+
+
+def invalidate():
+    """Drop every process's snapshot (call after changing ``Setting`` rows)."""
+    global _snapshot
+    _snapshot = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing (first change, or evicted): start a new sequence that
+        # cannot equal a version read before the eviction
+        cache.add(VERSION_KEY, int(time.time()))
+    except Exception:
+        pass
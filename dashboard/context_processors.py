@@ -1,7 +1,6 @@
 def clinic_settings(request):
     try:
-        from .models import Setting
-        return {'setting': Setting.objects.first()}
+        from .clinic import get_setting
+        return {'setting': get_setting()}
     except Exception:
         return {'setting': None}
-
@@ -0,0 +1,100 @@
+"""Named running totals for the dashboard cards (``Counter`` rows).
+
+``COUNTED`` maps a counter name to the model whose rows it counts. Creating
+or deleting such a row bumps the counter with a single
+``UPDATE ... SET value = value + 1`` in the same transaction (see
+``signals.py``), so a rolled back write leaves the counter alone and
+concurrent writers never lose an increment. Writes that bypass signals
+(``bulk_create``, raw SQL, ``loaddata --raw``) are caught up by
+``reconcile()`` / ``python manage.py reconcile_counters``, as are the rare
+double decrements when two transactions delete the same row at once (both
+send ``post_delete``).
+"""
+import logging
+
+from django.apps import apps
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Counter
+
+logger = logging.getLogger(__name__)
+
+COUNTED = {
+    'patients': 'patients.Patient',
+    'doctors': 'doctors.Doctor',
+}
+
+
+def model_counter(model):
+    """Counter name for a model class, or None if it is not counted."""
+    label = model._meta.label
+    for name, counted in COUNTED.items():
+        if counted == label:
+            return name
+    return None
+
+
+def bump(name, delta):
+    updated = Counter.objects.filter(name=name).update(value=F('value') + delta, updated_at=timezone.now())
+    if not updated:
+        # First use (no row yet): seed it from the table, which already
+        # includes the row being counted
+        reconcile([name])
+
+
+def get(*names):
+    """Current values as {name: int}; missing counters are computed and stored."""
+    values = dict(Counter.objects.filter(name__in=names).values_list('name', 'value'))
+    missing = [n for n in names if n not in values]
+    if missing:
+        values.update(reconcile(missing))
+    return values
+
+
+async def aget(*names):
+    """``get()`` for async views."""
+    values = {name: value async for name, value in
+              Counter.objects.filter(name__in=names).values_list('name', 'value')}
+    missing = [n for n in names if n not in values]
+    if missing:
+        from asgiref.sync import sync_to_async
+        values.update(await sync_to_async(reconcile)(missing))
+    return values
+
+
+def reconcile(names=None):
+    """Recompute counters from their tables; returns {name: value}.
+
+    The counter row is locked before counting, so increments from writers
+    committing meanwhile wait and are applied on top of the new value.
+    """
+    result = {}
+    for name in names or COUNTED:
+        model = apps.get_model(COUNTED[name])
+        try:
+            with transaction.atomic():
+                Counter.objects.get_or_create(name=name)
+        except IntegrityError:
+            pass  # created concurrently
+        with transaction.atomic():
+            counter = Counter.objects.select_for_update().get(name=name)
+            actual = model.objects.count()
+            if counter.value != actual:
+                logger.info("Counter %s drifted: %s -> %s", name, counter.value, actual)
+                counter.value = actual
+                counter.save(update_fields=['value', 'updated_at'])
+        result[name] = actual
+    return result
+
+
+def drift(names=None):
+    """{name: (stored, actual)} for counters that do not match their table."""
+    stored = dict(Counter.objects.values_list('name', 'value'))
+    result = {}
+    for name in names or COUNTED:
+        actual = apps.get_model(COUNTED[name]).objects.count()
+        if stored.get(name) != actual:
+            result[name] = (stored.get(name), actual)
+    return result
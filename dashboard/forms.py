@@ -13,3 +13,17 @@ class SettingForm(forms.ModelForm):
         self.fields['clinic_phone'].widget.attrs.update({'class': 'form-control', 'placeholder': '+998...'})
         self.fields['clinic_address'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Manzil'})
         self.fields['receipt_footer'].widget.attrs.update({'class': 'form-control', 'placeholder': 'Kvitansiya ostidagi matn'})
+
+
+class ImportForm(forms.Form):
+    file = forms.FileField(label="CSV yoki XLSX fayl")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['file'].widget.attrs.update({'class': 'form-control', 'accept': '.csv,.xlsx'})
+
+    def clean_file(self):
+        f = self.cleaned_data['file']
+        if not f.name.lower().endswith(('.csv', '.xlsx')):
+            raise forms.ValidationError("Faqat .csv yoki .xlsx fayl yuklash mumkin")
+        return f
@@ -0,0 +1,412 @@
+"""Bulk import of patients and historical appointments (CSV or XLSX).
+
+One input row is a patient and, optionally, one of their appointments::
+
+    F.I.Sh.;Telefon;Manzil;Tug'ilgan sana;Shifokor;Sana;Vaqt;Xizmat narxi
+
+(English headers ``full_name, phone, address, birth_date, doctor, date,
+time, price`` work too; see ``COLUMNS``). The file is read as a stream and
+handled in batches of ``IMPORT_BATCH_SIZE`` rows. Per batch:
+
+* rows are validated and normalised (name spacing and case, phone numbers
+  to ``+998XXXXXXXXX``, dates in ISO or ``dd.mm.yyyy``); invalid rows are
+  skipped and recorded in ``ImportJob.row_errors``;
+* patients are matched on the normalised name (``Patient.search_name``,
+  the key the booking form uses) against the database and earlier rows, so
+  a patient appearing on many rows is created once;
+* new patients and appointments are written with ``bulk_create``, and the
+  doctors' ``doc_no`` numbers are reserved with one UPDATE per doctor;
+* all of it commits in one transaction together with the job's progress.
+
+A crash therefore loses at most the batch in flight, and ``run()`` on the
+same job skips the ``rows_done`` rows already committed. ``bulk_create``
+sends no signals, so the dashboard counters and daily rollups for the
+imported date range are recomputed when the import finishes.
+"""
+import csv
+import hashlib
+import io
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dtime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# Canonical field -> accepted header spellings (compared after _header())
+COLUMNS = {
+    'full_name': ('full_name', 'fish', 'fio', 'bemor', 'ism', 'name'),
+    'phone': ('phone', 'telefon', 'tel'),
+    'address': ('address', 'manzil'),
+    'birth_date': ('birth_date', 'birthdate', 'tugilgansana'),
+    'doctor': ('doctor', 'shifokor', 'doctor_id'),
+    'date': ('date', 'sana'),
+    'time': ('time', 'vaqt'),
+    'price': ('price', 'service_price', 'xizmatnarxi', 'narx'),
+}
+MAX_ROW_ERRORS = 500
+STALE_AFTER = timedelta(minutes=5)
+
+
+def _header(value):
+    return re.sub(r"[^a-z0-9_]", '', str(value or '').strip().lower())
+
+
+def _column_map(header):
+    """{column index: canonical field} for a header row."""
+    lookup = {alias: field for field, aliases in COLUMNS.items() for alias in aliases}
+    mapping = {}
+    for i, name in enumerate(header):
+        field = lookup.get(_header(name))
+        if field and field not in mapping.values():
+            mapping[i] = field
+    if 'full_name' not in mapping.values():
+        raise ValueError("Faylda F.I.Sh. (full_name) ustuni topilmadi")
+    return mapping
+
+
+# --- Reading ------------------------------------------------------------------
+
+def _is_xlsx(fileobj, name):
+    if name.lower().endswith('.xlsx'):
+        return True
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    return head[:2] == b'PK'
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    sample = text.read(8192)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    yield from csv.reader(text, dialect)
+
+
+def _xlsx_rows(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX o'qish uchun openpyxl o'rnatilmagan; faylni CSV ko'rinishida saqlang")
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, name=''):
+    """Yield ``(line number, {field: raw value})`` for the data rows of a file."""
+    rows = _xlsx_rows(fileobj) if _is_xlsx(fileobj, name) else _csv_rows(fileobj)
+    mapping = None
+    for line, values in enumerate(rows, start=1):
+        if mapping is None:
+            mapping = _column_map(values)
+            continue
+        if not any(v not in (None, '') for v in values):
+            continue
+        yield line, {field: values[i] for i, field in mapping.items() if i < len(values)}
+
+
+def checksum(fileobj):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(1 << 20), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+# --- Normalisation ------------------------------------------------------------
+
+def _text(value):
+    return ' '.join(str(value).split()) if value is not None else ''
+
+
+def normalize_full_name(value):
+    name = _text(value)
+    if not name:
+        raise ValueError("F.I.Sh. bo'sh")
+    if len(name) > 255:
+        raise ValueError("F.I.Sh. juda uzun")
+    if name.isupper() or name.islower():
+        # Legacy exports are often all caps: "ALIYEV VALI" -> "Aliyev Vali"
+        name = ' '.join('-'.join(p[:1].upper() + p[1:].lower() for p in word.split('-'))
+                        for word in name.split(' '))
+    return name
+
+
+def normalize_phone(value):
+    raw = _text(value)
+    if isinstance(value, float) and value.is_integer():
+        raw = str(int(value))  # spreadsheet cells formatted as numbers
+    digits = re.sub(r'\D', '', raw)
+    if not digits:
+        return ''
+    if len(digits) == 9:
+        return '+998' + digits
+    if len(digits) == 12 and digits.startswith('998'):
+        return '+' + digits
+    if len(digits) == 10 and digits.startswith('8'):
+        return '+998' + digits[1:]  # old "8 (90) 123-45-67"
+    if raw.startswith('+') and 8 <= len(digits) <= 15:
+        return '+' + digits
+    raise ValueError(f"Telefon raqami noto'g'ri: {raw}")
+
+
+def parse_date(value, label="Sana"):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _text(value)
+    for fmt in ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"{label} noto'g'ri: {text}")
+
+
+def parse_time(value):
+    if value in (None, ''):
+        return dtime(0, 0)
+    if isinstance(value, datetime):
+        return value.time().replace(microsecond=0)
+    if isinstance(value, dtime):
+        return value
+    text = _text(value)
+    for fmt in ('%H:%M', '%H:%M:%S', '%H.%M'):
+        try:
+            return datetime.strptime(text, fmt).time()
+        except ValueError:
+            pass
+    raise ValueError(f"Vaqt noto'g'ri: {text}")
+
+
+def parse_price(value):
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(_text(value).replace(' ', '').replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Narx noto'g'ri: {value}")
+    if price < 0 or price >= Decimal('1e10'):
+        raise ValueError(f"Narx noto'g'ri: {value}")
+    return price.quantize(Decimal('0.01'))
+
+
+def _doctor_lookup():
+    from doctors.models import Doctor
+    from patients.search import normalize_name
+
+    lookup = {}
+    for pk, name in Doctor.objects.values_list('pk', 'full_name'):
+        lookup[str(pk)] = pk
+        lookup.setdefault(normalize_name(name), pk)
+    return lookup
+
+
+def parse_row(raw, doctors):
+    """Validate one row; returns a dict of clean values (raises ValueError)."""
+    from patients.search import normalize_name
+
+    row = {
+        'full_name': normalize_full_name(raw.get('full_name')),
+        'phone': normalize_phone(raw.get('phone')),
+        'address': _text(raw.get('address'))[:255],
+        'birth_date': parse_date(raw.get('birth_date'), "Tug'ilgan sana"),
+        'doctor_id': None,
+    }
+    row['key'] = normalize_name(row['full_name'])
+    if not row['key']:
+        raise ValueError(f"F.I.Sh. noto'g'ri: {row['full_name']}")
+    doctor = _text(raw.get('doctor'))
+    day = parse_date(raw.get('date'))
+    if doctor or day:
+        if not (doctor and day):
+            raise ValueError("Qabul uchun shifokor va sana birga kerak")
+        doctor_id = doctors.get(doctor) or doctors.get(normalize_name(doctor))
+        if doctor_id is None:
+            raise ValueError(f"Shifokor topilmadi: {doctor}")
+        row.update(doctor_id=doctor_id, date=day, time=parse_time(raw.get('time')),
+                   price=parse_price(raw.get('price')))
+    return row
+
+
+# --- Writing ------------------------------------------------------------------
+
+def _patient_ids(keys):
+    """{search_name: id of the newest patient with that name} for ``keys``."""
+    from patients.models import Patient
+
+    ids = {}
+    rows = (Patient.objects.filter(search_name__in=keys)
+            .order_by('search_name', '-created_at', '-pk').values_list('search_name', 'pk'))
+    for key, pk in rows:
+        ids.setdefault(key, pk)
+    return ids
+
+
+def import_batch(job, batch, doctors):
+    """Validate and write one batch of ``(line, raw)`` rows; updates ``job``."""
+    from appointments.models import Appointment, AppointmentStatus
+    from doctors.models import Doctor
+    from klinika_project.sequences import reserve
+    from patients.models import Patient
+
+    parsed = []
+    for line, raw in batch:
+        try:
+            parsed.append(parse_row(raw, doctors))
+        except ValueError as exc:
+            job.rows_failed += 1
+            if len(job.row_errors) < MAX_ROW_ERRORS:
+                job.row_errors.append({'row': line, 'error': str(exc)})
+
+    today = timezone.localdate()
+    with transaction.atomic():
+        ids = _patient_ids({r['key'] for r in parsed})
+        new = {}
+        for r in parsed:
+            if r['key'] not in ids and r['key'] not in new:
+                new[r['key']] = Patient(full_name=r['full_name'], phone=r['phone'], address=r['address'],
+                                        birth_date=r['birth_date'], search_name=r['key'])
+        Patient.objects.bulk_create(new.values())
+        if any(p.pk is None for p in new.values()):
+            # Backends that cannot return ids from a bulk INSERT
+            ids.update(_patient_ids(new))
+        else:
+            ids.update((key, p.pk) for key, p in new.items())
+        job.patients_created += len(new)
+        job.patients_matched += len(parsed) - len(new)
+
+        visits = [r for r in parsed if r['doctor_id']]
+        per_doctor = defaultdict(int)
+        for r in visits:
+            per_doctor[r['doctor_id']] += 1
+        numbers = {}
+        for doctor_id, count in per_doctor.items():
+            last = reserve(Doctor, doctor_id, 'receipt_serial', count)
+            numbers[doctor_id] = iter(range(last - count + 1, last + 1))
+        Appointment.objects.bulk_create([
+            Appointment(doctor_id=r['doctor_id'], patient_id=ids[r['key']], date=r['date'], time=r['time'],
+                        service_price=r['price'], doc_no=next(numbers[r['doctor_id']]),
+                        status=AppointmentStatus.DONE if r['date'] < today else AppointmentStatus.WAITING,
+                        created_by_id=job.requested_by_id)
+            for r in visits
+        ])
+        job.appointments_created += len(visits)
+        if visits:
+            first, last = min(r['date'] for r in visits), max(r['date'] for r in visits)
+            job.first_date = min(job.first_date or first, first)
+            job.last_date = max(job.last_date or last, last)
+        job.rows_done += len(batch)
+        job.save(update_fields=['rows_done', 'rows_failed', 'patients_created', 'patients_matched',
+                                'appointments_created', 'first_date', 'last_date', 'row_errors', 'updated_at'])
+
+
+def _finish(job):
+    """Catch up the data that signals normally maintain."""
+    from . import counters, rollups
+
+    counters.reconcile(['patients'])
+    if job.first_date:
+        rollups.rebuild(job.first_date, job.last_date)
+
+
+def resumable(job):
+    """Whether an uploaded job can be (re)started: not done and nobody working on it."""
+    if not job.file or job.status == ImportJob.Status.DONE:
+        return False
+    return job.status != ImportJob.Status.RUNNING or job.updated_at < timezone.now() - STALE_AFTER
+
+
+def claim(job):
+    """Mark ``job`` running unless another process is working on it."""
+    now = timezone.now()
+    available = (Q(status__in=[ImportJob.Status.QUEUED, ImportJob.Status.FAILED])
+                 | Q(status=ImportJob.Status.RUNNING, updated_at__lt=now - STALE_AFTER))
+    claimed = ImportJob.objects.filter(available, pk=job.pk).update(
+        status=ImportJob.Status.RUNNING, started_at=job.started_at or now, updated_at=now, error='')
+    if claimed:
+        job.refresh_from_db()
+    return bool(claimed)
+
+
+def run(job, fileobj, batch_size=None, progress=None):
+    """Import (or continue importing) ``fileobj`` into a claimed ``job``.
+
+    ``progress(job)`` is called after every committed batch. Returns the job;
+    a fatal error marks it failed and is re-raised.
+    """
+    batch_size = max(1, batch_size or getattr(settings, 'IMPORT_BATCH_SIZE', 1000))
+    doctors = _doctor_lookup()
+    try:
+        rows = islice(read_rows(fileobj, job.source_name), job.rows_done, None)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            t0 = time.perf_counter()
+            import_batch(job, batch, doctors)
+            spent = int((time.perf_counter() - t0) * 1000)
+            ImportJob.objects.filter(pk=job.pk).update(elapsed_ms=job.elapsed_ms + spent)
+            job.elapsed_ms += spent
+            if progress:
+                progress(job)
+        _finish(job)
+    except Exception as exc:
+        logger.exception("Import %s failed at row %s", job.pk, job.rows_done)
+        job.status = ImportJob.Status.FAILED
+        job.error = str(exc)[:2000]
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+    job.status = ImportJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    logger.info("Import %s done: %s rows (%s failed), %s new patients, %s appointments, %.0f rows/s",
+                job.pk, job.rows_done, job.rows_failed, job.patients_created, job.appointments_created,
+                job.rows_per_second)
+    return job
+
+
+# --- Uploaded files (web) -----------------------------------------------------
+
+def run_uploaded(job_id):
+    """Claim and run an uploaded job (never raises)."""
+    try:
+        job = ImportJob.objects.get(pk=job_id)
+        if not job.file or not claim(job):
+            return
+        with job.file.open('rb') as fileobj:
+            run(job, fileobj)
+    except Exception:
+        logger.exception("Import %s stopped", job_id)
+
+
+def _thread_main(job_id):
+    try:
+        run_uploaded(job_id)
+    finally:
+        connection.close()
+
+
+def start_thread(job_id):
+    threading.Thread(target=_thread_main, args=(job_id,), name=f'import-{job_id}', daemon=True).start()
@@ -0,0 +1,232 @@
+"""Background rendering of heavy report exports (PDF).
+
+Views call ``enqueue`` and immediately answer with the job id; the document
+is rendered outside the request/response cycle, so a slow WeasyPrint run no
+longer ties up a gunicorn worker that the booking desk needs.
+
+The queue is the ``ExportJob`` table. Jobs are executed either
+
+* by ``python manage.py run_export_worker`` (``EXPORT_JOBS_BACKEND=worker``),
+  which can run as a separate service and in several copies, or
+* by a single daemon thread inside the web process (``thread``, default),
+  started after the enqueuing transaction commits. The thread only claims
+  and stores jobs: the rendering itself runs in ``EXPORT_JOB_PROCESSES``
+  child processes (``renderproc.py``), so it does not take the web
+  worker's GIL and CPU from booking requests.
+
+A job is claimed with a conditional UPDATE (``status=queued -> running``), so
+two workers never render the same job. Each job records how long it waited in
+the queue and how long the rendering took.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from klinika_project import replica
+
+from . import renderproc
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+# kind -> dotted path of ``render(params) -> (bytes or binary file, filename, content_type)``
+RENDERERS = {
+    'admin3_payments': 'dashboard.reports.admin3_payments_pdf',
+    'finance': 'dashboard.reports.finance_pdf',
+    'doctor_appointments': 'doctors.reports.doctor_appointments_pdf',
+}
+
+
+def _backend():
+    return getattr(settings, 'EXPORT_JOBS_BACKEND', 'thread')
+
+
+def enqueue(kind, params, user=None):
+    """Create a queued job and make sure somebody will pick it up."""
+    if kind not in RENDERERS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    job = ExportJob.objects.create(
+        kind=kind, params=params,
+        requested_by=user if user is not None and user.is_authenticated else None,
+    )
+    if _backend() == 'thread':
+        transaction.on_commit(start_thread)
+    return job
+
+
+def claim_next():
+    """Atomically move the oldest queued job to ``running`` and return it."""
+    candidates = (ExportJob.objects.filter(status=ExportJob.Status.QUEUED)
+                  .order_by('created_at', 'pk').values_list('pk', flat=True)[:10])
+    for pk in list(candidates):
+        now = timezone.now()
+        claimed = (ExportJob.objects.filter(pk=pk, status=ExportJob.Status.QUEUED)
+                   .update(status=ExportJob.Status.RUNNING, started_at=now))
+        if claimed:
+            return ExportJob.objects.get(pk=pk)
+    return None
+
+
+def render(kind, params):
+    """``(content, filename, content_type)`` of a job, read inside ``replica.report()``."""
+    renderer = import_string(RENDERERS[kind])
+    # Report reads go to the replica, in one snapshot (see replica.py)
+    with replica.report():
+        return renderer(params)
+
+
+def run_job(job, executor=None):
+    """Render a claimed job and store the result (never raises).
+
+    With ``executor`` (a process pool) the document is rendered there,
+    otherwise in the calling thread.
+    """
+    t0 = time.perf_counter()
+    path = None
+    try:
+        if executor is None:
+            content, filename, content_type = render(job.kind, job.params)
+        else:
+            path, filename, content_type = executor.submit(renderproc.render_to_file, job.kind, job.params).result()
+            content = open(path, 'rb')
+        job.filename = filename
+        job.content_type = content_type
+        if isinstance(content, bytes):
+            content = ContentFile(content)
+        else:
+            content = File(content)
+        with content:
+            job.size = content.size
+            job.file.save(filename, content, save=False)
+        job.status = ExportJob.Status.DONE
+    except Exception as exc:
+        logger.exception("Export job %s (%s) failed", job.pk, job.kind)
+        job.status = ExportJob.Status.FAILED
+        job.error = str(exc)[:2000]
+        if isinstance(exc, BrokenProcessPool):
+            _reset_pool()
+    finally:
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+    job.finished_at = timezone.now()
+    job.render_ms = int((time.perf_counter() - t0) * 1000)
+    if job.started_at:
+        job.queue_ms = max(0, int((job.started_at - job.created_at).total_seconds() * 1000))
+    job.save(update_fields=['status', 'file', 'filename', 'content_type', 'size', 'error',
+                            'finished_at', 'render_ms', 'queue_ms'])
+    logger.info("Export job %s (%s) %s: queue=%s render=%sms size=%s",
+                job.pk, job.kind, job.status,
+                '-' if job.queue_ms is None else f'{job.queue_ms}ms', job.render_ms, job.size)
+    return job
+
+
+def drain(max_jobs=None, executor=None):
+    """Run queued jobs until the queue is empty. Returns the number processed."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = claim_next()
+        if job is None:
+            break
+        run_job(job, executor)
+        done += 1
+    return done
+
+
+def cleanup(ttl_hours=None, timeout_minutes=None):
+    """Fail jobs stuck in ``running`` and delete old finished jobs with their files."""
+    ttl_hours = ttl_hours if ttl_hours is not None else getattr(settings, 'EXPORT_JOB_TTL_HOURS', 24)
+    timeout_minutes = (timeout_minutes if timeout_minutes is not None
+                       else getattr(settings, 'EXPORT_JOB_TIMEOUT_MINUTES', 15))
+    now = timezone.now()
+    stuck = (ExportJob.objects
+             .filter(status=ExportJob.Status.RUNNING, started_at__lt=now - timedelta(minutes=timeout_minutes))
+             .update(status=ExportJob.Status.FAILED, finished_at=now, error="Vaqt tugadi (timeout)"))
+    removed = 0
+    old = ExportJob.objects.filter(
+        status__in=[ExportJob.Status.DONE, ExportJob.Status.FAILED],
+        created_at__lt=now - timedelta(hours=ttl_hours),
+    )
+    for job in old.iterator():
+        if job.file:
+            try:
+                job.file.delete(save=False)
+            except Exception:
+                logger.exception("Export job %s: failed to delete file", job.pk)
+        job.delete()
+        removed += 1
+    return stuck, removed
+
+
+# --- In-process backend --------------------------------------------------------
+
+_thread_lock = threading.Lock()
+_wakeup = threading.Event()
+_thread = None
+_pool = None
+
+
+def _process_pool():
+    """This web process's render pool, started on first use (None: render in the thread)."""
+    global _pool
+    processes = getattr(settings, 'EXPORT_JOB_PROCESSES', 1)
+    if processes <= 0:
+        return None
+    if _pool is None:
+        # spawn, not fork: the web process has threads and open connections
+        _pool = ProcessPoolExecutor(max_workers=processes, initializer=django.setup,
+                                    mp_context=multiprocessing.get_context('spawn'))
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _thread_main():
+    global _thread
+    try:
+        while True:
+            drain(executor=_process_pool())
+            with _thread_lock:
+                # Jobs enqueued while we were draining set the event
+                if not _wakeup.is_set():
+                    _thread = None
+                    break
+                _wakeup.clear()
+        cleanup()
+    except Exception:
+        logger.exception("Export thread crashed")
+        with _thread_lock:
+            _thread = None
+    finally:
+        connection.close()
+
+
+def start_thread():
+    """Start the export thread of this process unless it is already running."""
+    global _thread
+    with _thread_lock:
+        if _thread is not None and _thread.is_alive():
+            _wakeup.set()
+            return
+        _wakeup.clear()
+        _thread = threading.Thread(target=_thread_main, name='export-jobs', daemon=True)
+        _thread.start()
@@ -0,0 +1,134 @@
+"""Persisted daily finance ledger (``FinanceLedger``).
+
+Every revenue/expense change that reaches ``DailyRollup`` is also posted
+here (see ``rollups.apply``). A posting updates the row of its day and adds
+the same amount to the running totals of later days — for today's payments
+there are none, so it is a single-row update. Reading a range is two
+indexed lookups: the running totals just before the range and the rows
+inside it. All arithmetic is done in ``Decimal``.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+
+from .models import DailyRollup, FinanceLedger
+
+ZERO = Decimal('0.00')
+
+# pg_advisory_xact_lock key serialising ledger writers ("klng")
+_LOCK_KEY = 0x6B6C6E67
+
+
+def _lock():
+    """Serialise ledger writes until the end of the current transaction.
+
+    A new row copies the running totals of the previous row; without the
+    lock a concurrent posting to an earlier day could miss it. SQLite
+    already allows only one writer at a time.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_LOCK_KEY])
+
+
+def _running_totals_before(day):
+    row = (FinanceLedger.objects.filter(day__lt=day).order_by('-day')
+           .values_list('revenue_cum', 'expenses_cum').first())
+    return row or (ZERO, ZERO)
+
+
+def post(day, revenue=ZERO, expenses=ZERO):
+    """Add revenue/expenses (may be negative) to ``day``."""
+    revenue = Decimal(revenue or 0)
+    expenses = Decimal(expenses or 0)
+    if day is None or (not revenue and not expenses):
+        return
+    with transaction.atomic():
+        _lock()
+        updated = FinanceLedger.objects.filter(day=day).update(
+            revenue=F('revenue') + revenue, expenses=F('expenses') + expenses,
+            revenue_cum=F('revenue_cum') + revenue, expenses_cum=F('expenses_cum') + expenses,
+        )
+        if not updated:
+            rev_before, exp_before = _running_totals_before(day)
+            try:
+                with transaction.atomic():
+                    FinanceLedger.objects.create(
+                        day=day, revenue=revenue, expenses=expenses,
+                        revenue_cum=rev_before + revenue, expenses_cum=exp_before + expenses,
+                    )
+            except IntegrityError:
+                # Created concurrently (only possible without the lock)
+                FinanceLedger.objects.filter(day=day).update(
+                    revenue=F('revenue') + revenue, expenses=F('expenses') + expenses,
+                    revenue_cum=F('revenue_cum') + revenue, expenses_cum=F('expenses_cum') + expenses,
+                )
+        FinanceLedger.objects.filter(day__gt=day).update(
+            revenue_cum=F('revenue_cum') + revenue, expenses_cum=F('expenses_cum') + expenses,
+        )
+
+
+def rebuild(start=None):
+    """Recompute the ledger from ``DailyRollup`` for ``start`` and all later days."""
+    daily = DailyRollup.objects.all()
+    if start:
+        daily = daily.filter(day__gte=start)
+    daily = (daily.values('day')
+             .annotate(rev=Sum('revenue'), exp=Sum('expenses'))
+             .exclude(rev=0, exp=0)
+             .order_by('day'))
+    with transaction.atomic():
+        _lock()
+        rev_cum, exp_cum = _running_totals_before(start) if start else (ZERO, ZERO)
+        rows = []
+        for r in daily:
+            rev, exp = r['rev'] or ZERO, r['exp'] or ZERO
+            rev_cum += rev
+            exp_cum += exp
+            rows.append(FinanceLedger(day=r['day'], revenue=rev, expenses=exp,
+                                      revenue_cum=rev_cum, expenses_cum=exp_cum))
+        stale = FinanceLedger.objects.all()
+        if start:
+            stale = stale.filter(day__gte=start)
+        stale.delete()
+        FinanceLedger.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def first_day():
+    return (FinanceLedger.objects.exclude(revenue=0, expenses=0)
+            .order_by('day').values_list('day', flat=True).first())
+
+
+def series(start, end):
+    """Daily rows for [start, end] with running totals counted from ``start``.
+
+    Returns a list of dicts (date, rev, exp, profit, rev_cum, exp_cum,
+    profit_cum); days without a ledger row carry the previous totals.
+    """
+    rev_base, exp_base = _running_totals_before(start)
+    stored = {
+        r[0]: r[1:] for r in (FinanceLedger.objects.filter(day__gte=start, day__lte=end)
+                              .values_list('day', 'revenue', 'expenses', 'revenue_cum', 'expenses_cum'))
+    }
+    rows = []
+    rev_cum, exp_cum = ZERO, ZERO
+    day = start
+    while day <= end:
+        rev, exp = ZERO, ZERO
+        if day in stored:
+            rev, exp, rev_total, exp_total = stored[day]
+            rev_cum, exp_cum = rev_total - rev_base, exp_total - exp_base
+        rows.append({
+            'date': day.isoformat(),
+            'rev': rev,
+            'exp': exp,
+            'profit': rev - exp,
+            'rev_cum': rev_cum,
+            'exp_cum': exp_cum,
+            'profit_cum': rev_cum - exp_cum,
+        })
+        day += timedelta(days=1)
+    return rows
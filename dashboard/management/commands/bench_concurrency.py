@@ -0,0 +1,129 @@
+import asyncio
+import ssl
+import time
+from collections import Counter
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def _get(url, headers, timeout, context):
+    """One GET on a new connection; returns (status, response size in bytes)."""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(parts.hostname, port, ssl=context if secure else None), timeout)
+    try:
+        lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: close']
+        lines += [f'{k}: {v}' for k, v in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_line = raw.split(b'\r\n', 1)[0].split()
+    status = int(status_line[1]) if len(status_line) > 1 else 0
+    return status, len(raw)
+
+
+async def _run(urls, clients, total, headers, timeout, context):
+    """``clients`` concurrent loops sharing ``total`` requests over ``urls``."""
+    latencies, statuses, sizes = [], Counter(), []
+    remaining = [total]
+
+    async def client(n):
+        i = n
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            url = urls[i % len(urls)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                status, size = await _get(url, headers, timeout, context)
+            except (OSError, asyncio.TimeoutError) as exc:
+                statuses[type(exc).__name__] += 1
+                continue
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[status] += 1
+            sizes.append(size)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return time.perf_counter() - t0, sorted(latencies), statuses, sizes
+
+
+class Command(BaseCommand):
+    help = (
+        "Ishlab turgan serverga (gunicorn WSGI yoki ASGI) bir vaqtda --clients ta mijozdan "
+        "GET so'rov yuborib, o'tkazuvchanlik va kechikish (p50/p95/p99) ni o'lchaydi. "
+        "--user berilsa shu foydalanuvchi uchun sessiya yaratiladi (server shu bazaga ulangan bo'lishi kerak). "
+        "Misol: SERVER_MODE=wsgi va SERVER_MODE=asgi bilan serverni ishga tushirib, "
+        "python manage.py bench_concurrency http://127.0.0.1:8000/appointments/ --user admin --clients 200"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="To'liq URL(lar), navbat bilan so'raladi")
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000, help="Jami so'rovlar soni")
+        parser.add_argument('--user', help="Sessiya shu foydalanuvchi nomidan ochiladi")
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--insecure', action='store_true', help="https sertifikatini tekshirmaslik")
+
+    def handle(self, *args, **options):
+        for url in options['urls']:
+            if urlsplit(url).scheme not in ('http', 'https'):
+                raise CommandError(f"URL http:// yoki https:// bilan boshlanishi kerak: {url}")
+        clients = max(1, options['clients'])
+        total = max(clients, options['requests'])
+        headers = {'User-Agent': 'klinika-bench', 'Accept': 'text/html,application/json'}
+
+        session = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Foydalanuvchi topilmadi: {options['user']}")
+            session = import_module(settings.SESSION_ENGINE).SessionStore()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.create()
+            headers['Cookie'] = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+        context = ssl.create_default_context()
+        if options['insecure']:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+        try:
+            elapsed, latencies, statuses, sizes = asyncio.run(
+                _run(options['urls'], clients, total, headers, options['timeout'], context))
+        finally:
+            if session is not None:
+                session.delete()
+
+        done = len(latencies)
+        self.stdout.write(f"{clients} mijoz, {total} so'rov, {elapsed:.1f} s")
+        self.stdout.write(f"  o'tkazuvchanlik: {done / elapsed:8.1f} so'rov/s")
+        self.stdout.write(f"  kechikish:       p50 {_pct(latencies, 0.50):.0f} ms, "
+                          f"p95 {_pct(latencies, 0.95):.0f} ms, p99 {_pct(latencies, 0.99):.0f} ms, "
+                          f"max {latencies[-1] if latencies else 0:.0f} ms")
+        if sizes:
+            self.stdout.write(f"  javob hajmi:     o'rtacha {sum(sizes) / len(sizes) / 1024:.1f} KB")
+        self.stdout.write("  holatlar:        " + ', '.join(f'{k}: {v}' for k, v in sorted(statuses.items(), key=str)))
+        if any(not isinstance(k, int) or k >= 400 for k in statuses):
+            self.stdout.write(self.style.WARNING("Xatoli javoblar bor: natijalarni taqqoslashdan oldin tekshiring"))
@@ -0,0 +1,239 @@
+import json
+import logging
+import time
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.models import User
+from appointments.models import Appointment
+from dashboard import jobs
+from patients.models import Patient
+from payments.models import Payment
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'endpoints.json'
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _pct(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def endpoints(targets):
+    """name -> (method, url or ``url(iteration)``, POST data or None)."""
+    doctor, patient, appointment, payment = (targets[k] for k in ('doctor', 'patient', 'appointment', 'payment'))
+    today = timezone.localdate()
+    return {
+        'home': ('get', '/', None),
+        'appointment_create_form': ('get', '/appointments/new/', None),
+        'appointment_create': ('post', '/appointments/new/',
+                               {'doctor': doctor, 'patient_name': patient.full_name, 'patient_id': patient.pk}),
+        'appointment_list': ('get', '/appointments/', None),
+        'queue_price': ('get', '/appointments/queue/price/', None),
+        'queue_cashier': ('get', '/appointments/queue/cashier/', None),
+        'payment_create_form': ('get', lambda i: f"/payments/new/{targets['unpaid'][i]}/", None),
+        'payment_create': ('post', lambda i: f"/payments/new/{targets['unpaid'][i]}/", {'method': 'cash'}),
+        'patient_search': ('get', f"/patients/search/?q={patient.full_name[:4]}", None),
+        'admin_dashboard': ('get', '/admin/dashboard/', None),
+        'doctor_appointments': ('get', f'/admin/doctors/{doctor}/appointments/', None),
+        'stats': ('get', '/admin/dashboard/stats/', None),
+        'stats_chart_finance': ('get', '/admin/dashboard/stats/charts/finance/', None),
+        'export_admin3_csv': ('get', '/admin/dashboard/stats/?export=csv', None),
+        'export_finance_csv': ('get', f'/admin/dashboard/stats/?fin_export=csv&fin_start={today.replace(day=1)}', None),
+        'export_doctor_csv': ('get', f'/admin/doctors/{doctor}/appointments/?export=csv', None),
+        'export_pdf_enqueue': ('get', '/admin/dashboard/stats/?export=pdf', None),
+        'receipt_appointment': ('get', f'/appointments/receipt/{appointment.pk}/', None),
+        'receipt_price': ('get', f'/appointments/price_receipt/{appointment.pk}/', None),
+        'receipt_payment': ('get', f'/payments/receipt/{payment.pk}/', None),
+    }
+
+
+def renders(targets):
+    """PDF exports are rendered by the background job; time the renderer itself."""
+    today = timezone.localdate()
+    return {
+        'export_admin3_pdf': ('admin3_payments', {'pay_start': today.replace(day=1).isoformat(),
+                                                  'pay_end': today.isoformat()}),
+        'export_finance_pdf': ('finance', {'fin_start': today.replace(day=1).isoformat(),
+                                           'fin_end': today.isoformat()}),
+        'export_doctor_pdf': ('doctor_appointments', {'doctor': targets['doctor'], 'q': '', 'start': '', 'end': ''}),
+    }
+
+
+def _request(client, method, path, data):
+    response = getattr(client, method)(path, data or {}, secure=True)
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, len(body)
+
+
+def _render(kind, params):
+    content, _, _ = import_string(jobs.RENDERERS[kind])(params)
+    if isinstance(content, bytes):
+        return 200, len(content)
+    with content:
+        return 200, len(content.read())
+
+
+class Command(BaseCommand):
+    help = (
+        "Asosiy sahifalarni (qabul yaratish, navbatlar, to'lov, statistika, eksportlar, kvitansiyalar) "
+        "Django test client orqali so'rab, har biri uchun kechikish va SQL so'rovlar sonini o'lchaydi "
+        "va saqlangan bazaviy natija (JSON) bilan solishtiradi. Barcha yozuvlar oxirida bekor qilinadi. "
+        "Ma'lumot yo'q bo'lsa avval: python manage.py seed_clinic"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Har bir sahifa necha marta so'ralsin")
+        parser.add_argument('--only', nargs='+', help="Faqat shu nomli sahifalar")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Bazaviy natija fayli (JSON)")
+        parser.add_argument('--save', action='store_true', help="Natijani bazaviy fayl sifatida saqlash")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="p50 necha foizga (0.25 = 25%%) sekinlashsa regressiya hisoblanadi")
+        parser.add_argument('--fail-on-regression', action='store_true',
+                            help="Regressiya topilsa xato kodi bilan chiqish")
+
+    def handle(self, *args, **options):
+        repeat = max(2, options['repeat'])
+        request_log = logging.getLogger('klinika.requests')
+        previous_level = request_log.level
+        request_log.setLevel(logging.ERROR)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                with transaction.atomic():
+                    results, meta = self.run(repeat, options['only'])
+                    raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            request_log.setLevel(previous_level)
+
+        self.report(results)
+        baseline_path = Path(options['baseline'])
+        if options['save']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'meta': meta, 'endpoints': results}, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Bazaviy natija saqlandi: {baseline_path}"))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(f"Bazaviy fayl yo'q ({baseline_path}); saqlash uchun --save")
+            return
+        regressions = self.compare(json.loads(baseline_path.read_text()), results, meta, options['tolerance'])
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"{len(regressions)} ta regressiya: {', '.join(regressions)}")
+
+    def targets(self, repeat):
+        appointment = (Appointment.objects.filter(service_price__isnull=False)
+                       .select_related('patient').order_by('-pk').first())
+        payment = Payment.objects.order_by('-pk').first()
+        patient = Patient.objects.order_by('-pk').first()
+        if not (appointment and payment and patient):
+            raise CommandError("Ma'lumot yetarli emas: avval python manage.py seed_clinic")
+        # Fresh priced, unpaid appointments: one per payment_create request
+        unpaid = Appointment.objects.bulk_create([
+            Appointment(doctor_id=appointment.doctor_id, patient=patient, date=timezone.localdate(),
+                        time=timezone.localtime().time(), service_price=Decimal('100000'))
+            for _ in range(repeat)
+        ])
+        if any(a.pk is None for a in unpaid):
+            unpaid = list(Appointment.objects.filter(payment__isnull=True, service_price__isnull=False)
+                          .order_by('-pk')[:repeat])[::-1]
+        return {'doctor': appointment.doctor_id, 'patient': patient, 'appointment': appointment,
+                'payment': payment, 'unpaid': [a.pk for a in unpaid]}
+
+    def run(self, repeat, only):
+        user = User.objects.create(username='bench_endpoints', role='creator', is_superuser=True, is_staff=True)
+        client = Client()
+        client.force_login(user)
+        targets = self.targets(repeat)
+        specs = {name: (_request, (client, *spec)) for name, spec in endpoints(targets).items()}
+        specs.update({name: (_render, spec) for name, spec in renders(targets).items()})
+        if only:
+            unknown = set(only) - set(specs)
+            if unknown:
+                raise CommandError(f"Noma'lum sahifa: {', '.join(sorted(unknown))} (bor: {', '.join(specs)})")
+            specs = {k: v for k, v in specs.items() if k in only}
+
+        results = {}
+        for name, (call, spec) in specs.items():
+            timings, queries, sizes, statuses = [], [], [], set()
+            for i in range(repeat):
+                args = [a(i) if callable(a) else a for a in spec]
+                # queries_log is a bounded deque; CaptureQueriesContext counts by index
+                connection.queries_log.clear()
+                t0 = time.perf_counter()
+                with CaptureQueriesContext(connection) as ctx:
+                    status, size = call(*args)
+                timings.append((time.perf_counter() - t0) * 1000)
+                queries.append(len(ctx.captured_queries))
+                sizes.append(size)
+                statuses.add(status)
+            warm = sorted(timings[1:])
+            results[name] = {
+                'status': sorted(statuses),
+                'first_ms': round(timings[0], 2),
+                'p50_ms': round(_pct(warm, 0.50), 2),
+                'p95_ms': round(_pct(warm, 0.95), 2),
+                'queries': max(queries[1:]),
+                'queries_first': queries[0],
+                'bytes': sizes[-1],
+            }
+        meta = {
+            'vendor': connection.vendor,
+            'appointments': Appointment.objects.count(),
+            'patients': Patient.objects.count(),
+            'payments': Payment.objects.count(),
+            'repeat': repeat,
+            'date': date.today().isoformat(),
+        }
+        return results, meta
+
+    def report(self, results):
+        self.stdout.write(f"{'sahifa':<26} {'holat':>9} {'1-so`rov':>9} {'p50':>8} {'p95':>8} {'SQL':>5} {'hajm':>9}")
+        for name, r in results.items():
+            status = ','.join(str(s) for s in r['status'])
+            self.stdout.write(f"{name:<26} {status:>9} {r['first_ms']:>7.1f}ms {r['p50_ms']:>6.1f}ms "
+                              f"{r['p95_ms']:>6.1f}ms {r['queries']:>5} {r['bytes'] / 1024:>7.1f}KB")
+
+    def compare(self, baseline, results, meta, tolerance):
+        base_meta = baseline.get('meta', {})
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Bazaviy natija bilan solishtirish ({base_meta.get('date')}, {base_meta.get('vendor')}, "
+            f"{base_meta.get('appointments')} qabul; hozir {meta['vendor']}, {meta['appointments']} qabul)"))
+        if base_meta.get('vendor') != meta['vendor']:
+            self.stdout.write(self.style.WARNING("Boshqa DB: vaqtlar taqqoslanmaydi, faqat SQL soni"))
+        regressions = []
+        for name, r in results.items():
+            base = baseline.get('endpoints', {}).get(name)
+            if base is None:
+                self.stdout.write(f"  {name}: bazaviy natijada yo'q")
+                continue
+            notes = []
+            if r['queries'] > base['queries']:
+                notes.append(f"SQL {base['queries']} -> {r['queries']}")
+            if base_meta.get('vendor') == meta['vendor']:
+                slower = r['p50_ms'] - base['p50_ms']
+                # Small absolute differences are noise on fast pages
+                if slower > max(2.0, base['p50_ms'] * tolerance):
+                    notes.append(f"p50 {base['p50_ms']:.1f} -> {r['p50_ms']:.1f} ms")
+            if r['status'] != base['status']:
+                notes.append(f"holat {base['status']} -> {r['status']}")
+            if notes:
+                regressions.append(name)
+                self.stdout.write(self.style.ERROR(f"  {name}: {'; '.join(notes)}"))
+            else:
+                self.stdout.write(f"  {name}: OK (SQL {r['queries']}/{base['queries']}, "
+                                  f"p50 {r['p50_ms']:.1f}/{base['p50_ms']:.1f} ms)")
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("Regressiya yo'q"))
+        return regressions
@@ -0,0 +1,96 @@
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.templatetags.static import static
+from django.utils import timezone
+
+from accounts.models import User
+from appointments.models import Appointment
+from doctors.models import Doctor
+from doctors.views import doctor_appointments
+from patients.models import Patient
+
+
+class _Rollback(Exception):
+    pass
+
+
+def rewrite_body(response, tag):
+    """The former UiPatchMiddleware: decode, lowercase, splice, re-encode.
+
+    Kept here only as the baseline; base.html now includes the script tag.
+    """
+    content = response.content.decode(response.charset)
+    lower = content.lower()
+    insert_at = lower.rfind('</body>')
+    if insert_at != -1 and tag not in content:
+        content = content[:insert_at] + tag + content[insert_at:]
+        response.content = content.encode(response.charset)
+    return response
+
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timings[len(timings) // 2], peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Katta sahifani (shifokor qabullari, --rows qator) render qilish vaqti va xotirasini, "
+        "hamda javob tanasini qayta yozishning (eski UiPatchMiddleware) qo'shimcha narxini o'lchaydi. "
+        "Sinov ma'lumotlari tranzaksiya oxirida bekor qilinadi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=300)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], max(1, options['repeat']))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        user = User.objects.create(username='bench_page_render', role='creator', is_superuser=True)
+        doc = Doctor.objects.create(full_name='Bench Shifokor', department='-', phone='-', room_number='1')
+        patients = Patient.objects.bulk_create(
+            [Patient(full_name=f'Bemor {i}', phone='') for i in range(rows)])
+        today = timezone.localdate()
+        now = timezone.localtime().time()
+        Appointment.objects.bulk_create([
+            Appointment(doctor=doc, patient=p, date=today - timedelta(days=i % 30), time=now, doc_no=i + 1)
+            for i, p in enumerate(patients)
+        ])
+
+        request = RequestFactory().get(f'/admin/doctors/{doc.pk}/appointments/', secure=True)
+        request.user = user
+        tag = f'<script src="{static("js/ui-patches.js")}" defer></script>'
+        page = doctor_appointments(request, doc.pk)
+        size = len(page.content)
+        included = 'ha' if tag.encode() in page.content else "yo'q"
+        self.stdout.write(f"Sahifa: {rows} qator, {size / 1024:.0f} KB, "
+                          f"ui-patches.js shablonda: {included}")
+
+        render_ms, render_peak = measure(lambda: doctor_appointments(request, doc.pk), repeat)
+        rewrite_ms, rewrite_peak = measure(lambda: rewrite_body(doctor_appointments(request, doc.pk), tag), repeat)
+        only_ms, only_peak = measure(lambda: rewrite_body(page, tag), repeat)
+        self.stdout.write(f"{'render (shablon)':<30} {render_ms:8.2f} ms  {render_peak / 1024:8.0f} KB peak")
+        self.stdout.write(f"{'render + tanani qayta yozish':<30} {rewrite_ms:8.2f} ms  {rewrite_peak / 1024:8.0f} KB peak")
+        self.stdout.write(f"{'faqat qayta yozish':<30} {only_ms:8.2f} ms  {only_peak / 1024:8.0f} KB peak "
+                          f"(~{only_peak / max(size, 1):.1f}x sahifa hajmi)")
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from klinika_project.pdf import PdfDocument, default_font_path
+
+
+class _CountingSink:
+    """Binary stream that only counts the bytes written to it."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def _rows(count):
+    for i in range(count):
+        yield [
+            f"2026-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:{i % 60:02d}",
+            f"Bemor G‘ulomov {i}",
+            f"Shifokor {i % 20}",
+            f"{(i % 500) * 1000}.00",
+            "Naqd",
+            "kassir",
+            f"260101-{i % 10000:04d}",
+        ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Zaxira PDF yozuvchisining (klinika_project.pdf) tezligini o'lchaydi: "
+        "qatorlar soni oshganda vaqt chiziqli o'sishi kerak"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', default='1000,10000,100000',
+                            help="Vergul bilan ajratilgan qatorlar soni (default: 1000,10000,100000)")
+        parser.add_argument('--font', default=None,
+                            help="TTF shrift yo'li (default: PDF_FONT_PATH yoki tizim shrifti); "
+                                 "'' — ichki Courier")
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        font = options['font'] if options['font'] is not None else default_font_path()
+        self.stdout.write(f"Shrift: {font or 'Courier (ichki)'}")
+        base = None
+        for count in [int(n) for n in options['rows'].split(',') if n.strip()]:
+            timings = []
+            for _ in range(max(1, options['repeat'])):
+                sink = _CountingSink()
+                t0 = time.perf_counter()
+                with PdfDocument(sink, font_path=font) as pdf:
+                    pdf.text("Benchmark — Admin 3 to‘lovlar", size=12)
+                    pdf.table_header(['Sana', 'Bemor', 'Shifokor', 'Miqdor', 'Usul', 'Kassir', 'Kvitansiya'],
+                                     widths=[70, 115, 100, 60, 55, 60, 63], align='lllrlll', size=8)
+                    for row in _rows(count):
+                        pdf.row(row)
+                timings.append(time.perf_counter() - t0)
+            best = min(timings)
+            per_row = best / count * 1e6
+            base = base or per_row
+            self.stdout.write(
+                f"{count:>8} qator: {best * 1000:9.1f} ms  {per_row:7.2f} µs/qator  "
+                f"(x{per_row / base:.2f})  {sink.size / 1024:9.0f} KB  {len(pdf._pages)} sahifa"
+            )
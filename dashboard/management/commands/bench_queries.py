@@ -0,0 +1,77 @@
+import time as _time
+from datetime import time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from appointments.models import Appointment
+from dashboard import synthetic
+from doctors.models import Doctor
+from payments.models import ExpenseRequest, ExpenseStatus, Payment
+from klinika_project.pagination import _keyset_filter
+from payments.utils import local_day_range
+
+
+def hot_queries():
+    """Querysets mirroring the hot list/report views (name -> queryset)."""
+    today = timezone.localdate()
+    since_30 = today - timedelta(days=29)
+    doctor = Doctor.objects.order_by('pk').first()
+    lo, hi = local_day_range(since_30, today)
+    base = Appointment.objects.select_related('doctor', 'patient').order_by('-date', '-time', '-id')
+    # Key of the row 90% deep into the list: a late page via OFFSET vs via keyset
+    depth = int(Appointment.objects.count() * 0.9)
+    deep = base.values_list('date', 'time', 'id')[depth:depth + 1].first() or (today, time(0), 0)
+    ordering = [('date', True), ('time', True), ('id', True)]
+    return {
+        'appointment_list': base[:100],
+        'appointment_list_deep_offset': base[depth:depth + 100],
+        'appointment_list_deep_keyset': base.filter(_keyset_filter(ordering, list(deep), True))[:100],
+        'queue_price': base.filter(service_price__isnull=True)[:200],
+        'queue_cashier': base.filter(service_price__isnull=False, payment__isnull=True)[:200],
+        'doctor_appointments': base.filter(doctor=doctor)[:300],
+        'admin_dashboard_today': Appointment.objects.filter(date=today).values('doctor_id').order_by(),
+        'payments_30d': (Payment.objects.filter(created_at__gte=lo, created_at__lt=hi)
+                         .order_by('-created_at')),
+        'expenses_approved_30d': ExpenseRequest.objects.filter(
+            status=ExpenseStatus.APPROVED, approved_at__gte=lo, approved_at__lt=hi),
+        'expenses_pending': ExpenseRequest.objects.filter(status=ExpenseStatus.PENDING)[:200],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Asosiy so'rovlarning reja (EXPLAIN) va vaqtlarini chiqaradi. "
+        "Indekslarsiz/indekslar bilan solishtirish uchun avval "
+        "'migrate appointments 0005 && migrate payments 0003' bilan, keyin "
+        "to'liq migratsiya bilan ishga tushiring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Avval shuncha sinov qabulini yaratish (masalan 1000000)")
+        parser.add_argument('--repeat', type=int, default=5, help="Har bir so'rov necha marta o'lchansin")
+        parser.add_argument('--no-explain', action='store_true', help="EXPLAIN rejalarini chiqarmaslik")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        self.stdout.write(f"DB: {connection.vendor}, qabullar: {Appointment.objects.count()}")
+        for name, qs in hot_queries().items():
+            if not options['no_explain']:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+                self.stdout.write(qs.explain())
+            timings = []
+            for _ in range(max(1, options['repeat'])):
+                t0 = _time.perf_counter()
+                list(qs.all())
+                timings.append((_time.perf_counter() - t0) * 1000)
+            timings.sort()
+            self.stdout.write(f"{name:<30} min {timings[0]:8.2f} ms   median {timings[len(timings) // 2]:8.2f} ms")
+
+    def seed(self, count):
+        """Generate ``count`` appointments with payments/expenses (see dashboard.synthetic)."""
+        def progress(stats):
+            self.stdout.write(f"  seed: {stats['appointments']}/{count}")
+        synthetic.seed(count, days=730, progress=progress)
@@ -0,0 +1,106 @@
+import gzip
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Output (under static/) -> source files, relative to BASE_DIR, in order.
+# Vendored upstream files (``*.min.*``, kept unmodified in assets/vendor/) are
+# copied as they are, without their source map comments; our own files are
+# minified. static/dist/ is committed, so the site works without a build step.
+BUNDLES = {
+    'dist/app.min.css': [
+        'assets/vendor/bootstrap-5.3.8/bootstrap.min.css',
+        'static/css/fonts.css',
+        'static/css/neo.css',
+    ],
+    'dist/app.min.js': [
+        'assets/vendor/popper-2.11.8/popper.min.js',
+        'assets/vendor/bootstrap-5.3.8/bootstrap.min.js',
+        'static/js/ui-patches.js',
+    ],
+}
+
+_SOURCE_MAP = re.compile(r'^\s*(?://[#@] sourceMappingURL=.*|/\*# sourceMappingURL=.*?\*/)\s*$', re.M)
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*!.*?\*/)|/\*.*?\*/', re.S)
+_CSS_CHARSET = re.compile(r'^@charset\s+"[^"]*";\s*')
+
+
+def _minify_css(text):
+    out = []
+    for part in re.split(_CSS_TOKENS, text):
+        if not part:
+            continue
+        if part[0] in '"\'' or part.startswith('/*!'):
+            out.append(part)
+            continue
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)
+        out.append(part.replace(';}', '}'))
+    return ''.join(out).strip()
+
+
+def _minify_js(text):
+    # Conservative: indentation, blank lines and whole-line // comments only
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+def build(name, sources):
+    base = Path(settings.BASE_DIR)
+    css = name.endswith('.css')
+    parts = []
+    for source in sources:
+        text = (base / source).read_text(encoding='utf-8')
+        if '.min.' in Path(source).name:
+            text = _SOURCE_MAP.sub('', text).strip()
+        else:
+            text = _minify_css(text) if css else _minify_js(text)
+        parts.append(text)
+    if css:
+        # @charset is only valid as the very first rule of the file
+        charset = _CSS_CHARSET.match(parts[0])
+        if charset:
+            parts[0] = parts[0][charset.end():]
+        head = (charset.group(0).strip() + '\n') if charset else ''
+        return f"{head}/* {name}: manage.py build_assets, do not edit */\n" + '\n'.join(parts) + '\n'
+    return f"/* {name}: manage.py build_assets, do not edit */\n" + '\n;\n'.join(parts) + '\n'
+
+
+class Command(BaseCommand):
+    help = (
+        "Bootstrap, Inter shrifti, neo.css va ui-patches.js dan static/dist/app.min.css va "
+        "app.min.js to'plamlarini yig'adi (BUNDLES). --check: fayllar manbalarga mos "
+        "kelmasa xato kodi bilan chiqadi. Keyin collectstatic ularni xeshli nom va "
+        "gzip/brotli nusxalari bilan saqlaydi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help="Yozmasdan, to'plamlar eskirganini tekshirish")
+
+    def handle(self, *args, **options):
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        stale = []
+        for name, sources in BUNDLES.items():
+            content = build(name, sources)
+            target = Path(settings.BASE_DIR) / 'static' / name
+            current = target.read_text(encoding='utf-8') if target.exists() else None
+            if current != content:
+                stale.append(name)
+                if not options['check']:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_text(content, encoding='utf-8')
+            data = content.encode('utf-8')
+            sizes = f"{len(data) / 1024:.1f} KB, gzip {len(gzip.compress(data, 9)) / 1024:.1f} KB"
+            if brotli is not None:
+                sizes += f", brotli {len(brotli.compress(data)) / 1024:.1f} KB"
+            state = ('eskirgan' if options['check'] else 'yangilandi') if name in stale else 'o`zgarmagan'
+            self.stdout.write(f"{name:<18} {sizes}  ({state})")
+        if options['check'] and stale:
+            raise CommandError("To'plamlar eskirgan, manage.py build_assets ni ishga tushiring: " + ', '.join(stale))
@@ -0,0 +1,79 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import importer
+from dashboard.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Bemorlar va qabullarni CSV/XLSX fayldan ommaviy yuklaydi (ustunlar: F.I.Sh., Telefon, Manzil, "
+        "Tug'ilgan sana, Shifokor, Sana, Vaqt, Xizmat narxi). Qatorlar partiyalab yoziladi; "
+        "to'xtab qolgan yuklash shu faylni qayta berilganda oxirgi saqlangan partiyadan davom etadi. "
+        "--pending veb orqali yuklangan, tugallanmagan vazifalarni bajaradi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', help="CSV yoki XLSX fayl")
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--restart', action='store_true',
+                            help="Tugallanmagan vazifani davom ettirmasdan, yangidan boshlash")
+        parser.add_argument('--force', action='store_true', help="Avval to'liq yuklangan faylni yana yuklash")
+        parser.add_argument('--pending', action='store_true',
+                            help="Veb orqali yuklangan navbatdagi/to'xtab qolgan vazifalarni bajarish")
+
+    def handle(self, *args, **options):
+        if options['pending']:
+            self.run_pending(options)
+            return
+        path = options['path']
+        if not path:
+            raise CommandError("Fayl yo'li yoki --pending kerak")
+        if not os.path.isfile(path):
+            raise CommandError(f"Fayl topilmadi: {path}")
+
+        with open(path, 'rb') as fileobj:
+            digest = importer.checksum(fileobj)
+            same = ImportJob.objects.filter(checksum=digest).order_by('-created_at')
+            if not options['force'] and same.filter(status=ImportJob.Status.DONE).exists():
+                raise CommandError("Bu fayl avval to'liq yuklangan (qayta yuklash uchun --force)")
+            job = None
+            if not options['restart']:
+                job = same.exclude(status=ImportJob.Status.DONE).first()
+            if job is None:
+                job = ImportJob.objects.create(source_name=os.path.basename(path), checksum=digest)
+            elif job.rows_done:
+                self.stdout.write(f"#{job.pk}: {job.rows_done} qator avval yuklangan, davom etilmoqda")
+            if not importer.claim(job):
+                raise CommandError(f"#{job.pk} hozir boshqa jarayonda bajarilmoqda")
+            self.run_job(job, fileobj, options)
+
+    def run_pending(self, options):
+        pending = (ImportJob.objects.exclude(status=ImportJob.Status.DONE).exclude(file='')
+                   .order_by('created_at'))
+        for job in pending:
+            if not importer.claim(job):
+                continue
+            with job.file.open('rb') as fileobj:
+                self.run_job(job, fileobj, options)
+
+    def run_job(self, job, fileobj, options):
+        def progress(j):
+            if options['verbosity'] > 0:
+                self.stdout.write(f"  {j.rows_done} qator ({j.rows_failed} xato), "
+                                  f"{j.patients_created} yangi bemor, {j.appointments_created} qabul, "
+                                  f"{j.rows_per_second:.0f} qator/s")
+        try:
+            importer.run(job, fileobj, batch_size=options['batch_size'], progress=progress)
+        except Exception as exc:
+            raise CommandError(f"#{job.pk} to'xtadi ({job.rows_done} qator saqlangan): {exc}")
+        self.stdout.write(self.style.SUCCESS(
+            f"#{job.pk} {job.source_name}: {job.rows_done} qator, {job.rows_failed} xato, "
+            f"{job.patients_created} yangi / {job.patients_matched} mavjud bemor, "
+            f"{job.appointments_created} qabul; {job.elapsed_ms / 1000:.1f} s, {job.rows_per_second:.0f} qator/s"
+        ))
+        for err in job.row_errors[:20]:
+            self.stdout.write(f"  qator {err['row']}: {err['error']}")
+        if job.rows_failed > 20:
+            self.stdout.write(f"  ... yana {job.rows_failed - 20} ta xato (admin panelda ImportJob)")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "RETENTION_POLICIES bo'yicha eski yozuvlarni partiyalab o'chiradi "
+        "(kunlik cron uchun; so'rov yo'lida ishlamaydi)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Bir tranzaksiyada o'chiriladigan qatorlar (default: RETENTION_BATCH_SIZE)")
+        parser.add_argument('--archive-dir', default=None,
+                            help="O'chirishdan oldin JSONL arxiv yoziladigan papka (default: RETENTION_ARCHIVE_DIR)")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat sanash, o'chirmaslik")
+
+    def handle(self, *args, **options):
+        def progress(model, done):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {model._meta.label}: {done}")
+
+        result = retention.run(
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+            dry_run=options['dry_run'],
+            progress=progress,
+        )
+        verb = "topildi" if options['dry_run'] else "o'chirildi"
+        for label, count in result.items():
+            self.stdout.write(self.style.SUCCESS(f"{label}: {count} ta {verb}"))
+        if not result:
+            self.stdout.write("Saqlash siyosati sozlanmagan (RETENTION_POLICIES)")
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Kunlik yig'indilar (DailyRollup) jadvalini xom ma'lumotlardan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="Boshlanish sanasi (YYYY-MM-DD), default: eng eski mavjud yozuv")
+        parser.add_argument('--end', help="Tugash sanasi (YYYY-MM-DD), default: oxirigacha")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start']) if options['start'] else None
+            end = date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f"Noto'g'ri sana: {e}")
+        written = rebuild(start=start, end=end, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{written} ta yig'indi qatori yozildi"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Hisoblagichlarni (bemorlar, shifokorlar soni) jadvallardan qayta hisoblaydi. "
+        "Kuniga bir marta cron orqali ishga tushiring."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Hisoblagichlar (default: {', '.join(counters.COUNTED)})")
+        parser.add_argument('--check', action='store_true',
+                            help="Faqat farqni ko'rsatish; farq bo'lsa xato bilan chiqish")
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(counters.COUNTED)
+        unknown = [n for n in names if n not in counters.COUNTED]
+        if unknown:
+            raise CommandError(f"Noma'lum hisoblagich: {', '.join(unknown)}")
+        drift = counters.drift(names)
+        for name, (stored, actual) in drift.items():
+            self.stdout.write(f"{name}: saqlangan {stored}, haqiqiy {actual}")
+        if options['check']:
+            if drift:
+                raise CommandError(f"{len(drift)} ta hisoblagich mos emas")
+            self.stdout.write(self.style.SUCCESS("Hammasi mos"))
+            return
+        values = counters.reconcile(names)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f"{name}={value}" for name, value in values.items())))
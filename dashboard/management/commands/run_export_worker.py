@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dashboard import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Navbatdagi eksport (PDF) vazifalarini bajaradi. EXPORT_JOBS_BACKEND=worker "
+        "bo'lganda alohida servis sifatida ishga tushiriladi; bir nechta nusxa ishlashi mumkin"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Navbatni bo'shatib, chiqib ketish")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Navbat bo'sh bo'lganda kutish (soniya)")
+        parser.add_argument('--cleanup-interval', type=float, default=600.0,
+                            help="Eski vazifalarni tozalash oralig'i (soniya)")
+
+    def handle(self, *args, **options):
+        last_cleanup = 0.0
+        while True:
+            close_old_connections()
+            if time.monotonic() - last_cleanup >= options['cleanup_interval']:
+                stuck, removed = jobs.cleanup()
+                last_cleanup = time.monotonic()
+                if options['verbosity'] > 1 and (stuck or removed):
+                    self.stdout.write(f"Tozalandi: {removed}, timeout: {stuck}")
+            job = jobs.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+            jobs.run_job(job)
+            self.stdout.write(
+                f"#{job.pk} {job.kind}: {job.status} "
+                f"(navbat {job.queue_ms} ms, tayyorlash {job.render_ms} ms, {job.size or 0} bayt)"
+            )
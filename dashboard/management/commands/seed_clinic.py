@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark uchun sun'iy klinika ma'lumotlarini yaratadi: shifokorlar, bemorlar, qabullar, "
+        "to'lovlar va xarajatlar (10 ming ... 10 million qabul). Mavjud ma'lumotlar o'chirilmaydi, "
+        "qo'shiladi. Faqat sinov bazasida ishlating"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=10000, help="Qabullar soni")
+        parser.add_argument('--days', type=int, default=365, help="Necha kunlik tarix (bugun bilan)")
+        parser.add_argument('--doctors', type=int, default=None,
+                            help="Shifokorlar soni (default: qabullarga qarab 8..200)")
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--random-seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['appointments'] < 1:
+            raise CommandError("--appointments musbat bo'lishi kerak")
+
+        def progress(stats):
+            if options['verbosity'] > 0:
+                rows = stats['patients'] + stats['appointments'] + stats['payments']
+                self.stdout.write(f"  {stats['appointments']}/{options['appointments']} qabul, "
+                                  f"{stats['patients']} bemor, {stats['payments']} to'lov, "
+                                  f"{rows / stats['elapsed']:.0f} qator/s")
+
+        stats = synthetic.seed(options['appointments'], days=options['days'], doctors=options['doctors'],
+                               batch=max(100, options['batch_size']), random_seed=options['random_seed'],
+                               progress=progress)
+        rows = stats['patients'] + stats['appointments'] + stats['payments'] + stats['expenses']
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['doctors']} shifokor, {stats['patients']} yangi bemor, {stats['appointments']} qabul, "
+            f"{stats['payments']} to'lov, {stats['expenses']} xarajat; "
+            f"{stats['elapsed']:.1f} s ({rows / stats['elapsed']:.0f} qator/s)"
+        ))
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:30
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_rollups(apps, schema_editor):
+    """Aggregate existing rows the way ``rollups.rebuild`` does (frozen copy)."""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    Payment = apps.get_model('payments', 'Payment')
+    ExpenseRequest = apps.get_model('payments', 'ExpenseRequest')
+    DailyRollup = apps.get_model('dashboard', 'DailyRollup')
+
+    rows = defaultdict(lambda: {'appointments': 0, 'payments': 0, 'revenue': 0, 'expenses': 0})
+    appts = (Appointment.objects.values('date', 'doctor_id', 'doctor__department')
+             .annotate(n=Count('id')).order_by())
+    for r in appts:
+        rows[(r['date'], r['doctor_id'], r['doctor__department'] or '', '')]['appointments'] += r['n']
+    pays = (Payment.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'appointment__doctor_id', 'appointment__doctor__department', 'method')
+            .annotate(n=Count('id'), total=Sum('amount')).order_by())
+    for r in pays:
+        row = rows[(r['day'], r['appointment__doctor_id'], r['appointment__doctor__department'] or '', r['method'] or '')]
+        row['payments'] += r['n']
+        row['revenue'] += r['total'] or 0
+    exps = (ExpenseRequest.objects.filter(status='approved', approved_at__isnull=False)
+            .annotate(day=TruncDate('approved_at')).values('day')
+            .annotate(total=Sum('amount')).order_by())
+    for r in exps:
+        rows[(r['day'], None, '', '')]['expenses'] += r['total'] or 0
+
+    DailyRollup.objects.bulk_create([
+        DailyRollup(day=day, doctor_id=doctor_id, department=dept, method=method, **values)
+        for (day, doctor_id, dept, method), values in rows.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_setting_last_cleanup'),
+        ('doctors', '0003_doctor_code_prefix_and_receipt_serial'),
+        ('appointments', '0005_remove_appointment_complaint_delete_complaint'),
+        ('payments', '0003_expenserequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Kun')),
+                ('department', models.CharField(blank=True, default='', max_length=255, verbose_name="Bo'lim")),
+                ('method', models.CharField(blank=True, default='', max_length=20, verbose_name="To'lov usuli")),
+                ('appointments', models.IntegerField(default=0, verbose_name='Qabullar soni')),
+                ('payments', models.IntegerField(default=0, verbose_name="To'lovlar soni")),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Tushum')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Xarajat')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='doctors.doctor', verbose_name='Shifokor')),
+            ],
+            options={
+                'verbose_name': "Kunlik yig'indi",
+                'verbose_name_plural': "Kunlik yig'indilar",
+                'constraints': [models.UniqueConstraint(fields=('day', 'doctor', 'department', 'method'), name='dailyrollup_unique_key'), models.UniqueConstraint(condition=models.Q(('doctor__isnull', True)), fields=('day', 'department', 'method'), name='dailyrollup_unique_key_no_doctor')],
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
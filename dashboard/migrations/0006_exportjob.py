@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_dailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50, verbose_name='Turi')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parametrlar')),
+                ('status', models.CharField(choices=[('queued', 'Navbatda'), ('running', 'Tayyorlanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], default='queued', max_length=10, verbose_name='Holat')),
+                ('file', models.FileField(blank=True, upload_to='exports/%Y/%m/%d/', verbose_name='Fayl')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='Fayl nomi')),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('error', models.TextField(blank=True, verbose_name='Xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Boshlangan')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan')),
+                ('queue_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Navbatda kutish (ms)')),
+                ('render_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Tayyorlash (ms)')),
+                ('size', models.PositiveIntegerField(blank=True, null=True, verbose_name='Hajmi (bayt)')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='export_jobs', to=settings.AUTH_USER_MODEL, verbose_name="So'ragan")),
+            ],
+            options={
+                'verbose_name': 'Eksport vazifasi',
+                'verbose_name_plural': 'Eksport vazifalari',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:47
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_ledger(apps, schema_editor):
+    DailyRollup = apps.get_model('dashboard', 'DailyRollup')
+    FinanceLedger = apps.get_model('dashboard', 'FinanceLedger')
+    rev_cum = exp_cum = Decimal('0')
+    rows = []
+    daily = (DailyRollup.objects.values('day')
+             .annotate(rev=Sum('revenue'), exp=Sum('expenses'))
+             .exclude(rev=0, exp=0)
+             .order_by('day'))
+    for r in daily:
+        rev_cum += r['rev'] or 0
+        exp_cum += r['exp'] or 0
+        rows.append(FinanceLedger(day=r['day'], revenue=r['rev'] or 0, expenses=r['exp'] or 0,
+                                  revenue_cum=rev_cum, expenses_cum=exp_cum))
+    FinanceLedger.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='Kun')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Tushum')),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Xarajat')),
+                ('revenue_cum', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Tushum (kumulativ)')),
+                ('expenses_cum', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Xarajat (kumulativ)')),
+            ],
+            options={
+                'verbose_name': 'Moliya daftari',
+                'verbose_name_plural': 'Moliya daftari',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:54
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    Counter = apps.get_model('dashboard', 'Counter')
+    for name, label in (('patients', 'patients.Patient'), ('doctors', 'doctors.Doctor')):
+        Counter.objects.update_or_create(name=name, defaults={'value': apps.get_model(label).objects.count()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_financeledger'),
+        ('doctors', '0003_doctor_code_prefix_and_receipt_serial'),
+        ('patients', '0003_patient_search_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Nomi')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Qiymati')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan')),
+            ],
+            options={
+                'verbose_name': 'Hisoblagich',
+                'verbose_name_plural': 'Hisoblagichlar',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(max_length=255, verbose_name='Manba')),
+                ('checksum', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('file', models.FileField(blank=True, upload_to='imports/%Y/%m/%d/', verbose_name='Fayl')),
+                ('status', models.CharField(choices=[('queued', 'Navbatda'), ('running', 'Yuklanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], default='queued', max_length=10, verbose_name='Holat')),
+                ('rows_done', models.PositiveIntegerField(default=0, verbose_name="O'qilgan qatorlar")),
+                ('rows_failed', models.PositiveIntegerField(default=0, verbose_name='Xato qatorlar')),
+                ('patients_created', models.PositiveIntegerField(default=0, verbose_name='Yangi bemorlar')),
+                ('patients_matched', models.PositiveIntegerField(default=0, verbose_name='Mavjud bemorlar')),
+                ('appointments_created', models.PositiveIntegerField(default=0, verbose_name='Qabullar')),
+                ('first_date', models.DateField(blank=True, null=True, verbose_name='Eng eski qabul')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Eng yangi qabul')),
+                ('elapsed_ms', models.PositiveBigIntegerField(default=0, verbose_name='Ishlash vaqti (ms)')),
+                ('row_errors', models.JSONField(blank=True, default=list, verbose_name='Qator xatolari')),
+                ('error', models.TextField(blank=True, verbose_name='Xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Boshlangan')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Tugagan')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Yuklagan')),
+            ],
+            options={
+                'verbose_name': 'Import vazifasi',
+                'verbose_name_plural': 'Import vazifalari',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
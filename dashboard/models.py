@@ -15,3 +15,160 @@ class Setting(models.Model):
     class Meta:
         verbose_name = "Sozlama"
         verbose_name_plural = "Sozlamalar"
+
+
+class DailyRollup(models.Model):
+    """Pre-aggregated daily totals for the dashboard charts.
+
+    One row per (day, doctor, department, payment method). Appointment counts
+    live on rows with an empty method, payments on rows with the payment
+    method, and approved expenses on rows without a doctor.
+    """
+    day = models.DateField("Kun")
+    doctor = models.ForeignKey('doctors.Doctor', verbose_name="Shifokor", on_delete=models.CASCADE,
+                               null=True, blank=True, related_name='rollups')
+    department = models.CharField("Bo'lim", max_length=255, blank=True, default='')
+    method = models.CharField("To'lov usuli", max_length=20, blank=True, default='')
+    appointments = models.IntegerField("Qabullar soni", default=0)
+    payments = models.IntegerField("To'lovlar soni", default=0)
+    revenue = models.DecimalField("Tushum", max_digits=14, decimal_places=2, default=0)
+    expenses = models.DecimalField("Xarajat", max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.doctor_id or '-'} {self.method or '-'}"
+
+    class Meta:
+        verbose_name = "Kunlik yig'indi"
+        verbose_name_plural = "Kunlik yig'indilar"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'doctor', 'department', 'method'],
+                                    name='dailyrollup_unique_key'),
+            models.UniqueConstraint(fields=['day', 'department', 'method'],
+                                    condition=models.Q(doctor__isnull=True),
+                                    name='dailyrollup_unique_key_no_doctor'),
+        ]
+
+
+class Counter(models.Model):
+    """A named running total (e.g. patient count) kept up to date by signals.
+
+    See ``counters.py``; ``reconcile_counters`` recomputes them from the
+    tables.
+    """
+    name = models.CharField("Nomi", max_length=50, unique=True)
+    value = models.BigIntegerField("Qiymati", default=0)
+    updated_at = models.DateTimeField("Yangilangan", auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+    class Meta:
+        verbose_name = "Hisoblagich"
+        verbose_name_plural = "Hisoblagichlar"
+
+
+class ExportJob(models.Model):
+    """A report (PDF) rendered in the background instead of inside the request."""
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Navbatda'
+        RUNNING = 'running', 'Tayyorlanmoqda'
+        DONE = 'done', 'Tayyor'
+        FAILED = 'failed', 'Xatolik'
+
+    kind = models.CharField("Turi", max_length=50)
+    params = models.JSONField("Parametrlar", default=dict, blank=True)
+    status = models.CharField("Holat", max_length=10, choices=Status.choices, default=Status.QUEUED)
+    requested_by = models.ForeignKey('accounts.User', verbose_name="So'ragan", on_delete=models.SET_NULL,
+                                     null=True, blank=True, related_name='export_jobs')
+    file = models.FileField("Fayl", upload_to='exports/%Y/%m/%d/', blank=True)
+    filename = models.CharField("Fayl nomi", max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    error = models.TextField("Xatolik", blank=True)
+    created_at = models.DateTimeField("Yaratilgan", auto_now_add=True)
+    started_at = models.DateTimeField("Boshlangan", null=True, blank=True)
+    finished_at = models.DateTimeField("Tugagan", null=True, blank=True)
+    queue_ms = models.PositiveIntegerField("Navbatda kutish (ms)", null=True, blank=True)
+    render_ms = models.PositiveIntegerField("Tayyorlash (ms)", null=True, blank=True)
+    size = models.PositiveIntegerField("Hajmi (bayt)", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Eksport vazifasi"
+        verbose_name_plural = "Eksport vazifalari"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='exportjob_status_created_idx'),
+        ]
+
+
+class ImportJob(models.Model):
+    """A bulk import of patients and appointments from a CSV/XLSX file.
+
+    See ``importer.py``. Rows are committed in batches together with
+    ``rows_done``, so an interrupted import continues after the last
+    committed batch.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Navbatda'
+        RUNNING = 'running', 'Yuklanmoqda'
+        DONE = 'done', 'Tayyor'
+        FAILED = 'failed', 'Xatolik'
+
+    source_name = models.CharField("Manba", max_length=255)
+    checksum = models.CharField("SHA-256", max_length=64, db_index=True)
+    file = models.FileField("Fayl", upload_to='imports/%Y/%m/%d/', blank=True)
+    status = models.CharField("Holat", max_length=10, choices=Status.choices, default=Status.QUEUED)
+    requested_by = models.ForeignKey('accounts.User', verbose_name="Yuklagan", on_delete=models.SET_NULL,
+                                     null=True, blank=True, related_name='import_jobs')
+    rows_done = models.PositiveIntegerField("O'qilgan qatorlar", default=0)
+    rows_failed = models.PositiveIntegerField("Xato qatorlar", default=0)
+    patients_created = models.PositiveIntegerField("Yangi bemorlar", default=0)
+    patients_matched = models.PositiveIntegerField("Mavjud bemorlar", default=0)
+    appointments_created = models.PositiveIntegerField("Qabullar", default=0)
+    first_date = models.DateField("Eng eski qabul", null=True, blank=True)
+    last_date = models.DateField("Eng yangi qabul", null=True, blank=True)
+    elapsed_ms = models.PositiveBigIntegerField("Ishlash vaqti (ms)", default=0)
+    row_errors = models.JSONField("Qator xatolari", default=list, blank=True)
+    error = models.TextField("Xatolik", blank=True)
+    created_at = models.DateTimeField("Yaratilgan", auto_now_add=True)
+    started_at = models.DateTimeField("Boshlangan", null=True, blank=True)
+    updated_at = models.DateTimeField("Yangilangan", auto_now=True)
+    finished_at = models.DateTimeField("Tugagan", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.source_name} #{self.pk} ({self.status})"
+
+    @property
+    def rows_per_second(self):
+        return self.rows_done / (self.elapsed_ms / 1000) if self.elapsed_ms else 0
+
+    class Meta:
+        verbose_name = "Import vazifasi"
+        verbose_name_plural = "Import vazifalari"
+        ordering = ['-created_at']
+
+
+class FinanceLedger(models.Model):
+    """Daily revenue/expense totals with running (cumulative) sums.
+
+    One row per day that had any payment or approved expense. ``*_cum`` hold
+    the totals of all days up to and including ``day``, so the cumulative
+    finance series for any range is read from two indexed lookups.
+    """
+    day = models.DateField("Kun", unique=True)
+    revenue = models.DecimalField("Tushum", max_digits=16, decimal_places=2, default=0)
+    expenses = models.DecimalField("Xarajat", max_digits=16, decimal_places=2, default=0)
+    revenue_cum = models.DecimalField("Tushum (kumulativ)", max_digits=18, decimal_places=2, default=0)
+    expenses_cum = models.DecimalField("Xarajat (kumulativ)", max_digits=18, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day}: +{self.revenue} / -{self.expenses}"
+
+    class Meta:
+        verbose_name = "Moliya daftari"
+        verbose_name_plural = "Moliya daftari"
+        ordering = ['day']
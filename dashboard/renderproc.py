@@ -0,0 +1,24 @@
+"""Entry point of the export render processes (``jobs._process_pool``).
+
+A child process unpickles its task by importing this module before Django
+is set up, so nothing here imports models at module level.
+"""
+import tempfile
+
+
+def render_to_file(kind, params):
+    """Render a job; the document is handed back as a temporary file path."""
+    from django.db import close_old_connections
+
+    from . import jobs
+
+    close_old_connections()
+    content, filename, content_type = jobs.render(kind, params)
+    with tempfile.NamedTemporaryFile(prefix='export-', suffix='.part', delete=False) as out:
+        if isinstance(content, bytes):
+            out.write(content)
+        else:
+            with content:
+                for chunk in iter(lambda: content.read(1024 * 1024), b''):
+                    out.write(chunk)
+    return out.name, filename, content_type
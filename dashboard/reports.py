@@ -0,0 +1,140 @@
+"""Report data and PDF renderers used by the statistics page.
+
+The ``*_pdf(params)`` functions are export job renderers (see ``jobs.py``):
+they take the JSON parameters stored on the job and return
+``(content, filename, content_type)``, where content is bytes or an open
+binary file.
+"""
+import re
+import tempfile
+from datetime import date
+
+from django.db.models import Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from accounts.models import Roles
+from klinika_project.exports import iter_rows
+from klinika_project.pdf import PdfDocument
+from payments.models import Payment
+from payments.receipts import weasyprint_available
+from payments.utils import local_day_range
+
+from . import clinic, ledger
+
+
+def clinic_names():
+    """Return (clinic name, filename-safe slug)."""
+    try:
+        clinic_name = clinic.clinic_name()
+    except Exception:
+        clinic_name = 'Klinika'
+    clinic_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', clinic_name).strip('_') or 'Klinika'
+    return clinic_name, clinic_slug
+
+
+def render_pdf(html):
+    """Render HTML with WeasyPrint (raises if it is not installed)."""
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+
+def fallback_pdf(write):
+    """Build a PDF without WeasyPrint: ``write(pdf)`` fills a ``PdfDocument``.
+
+    The document is streamed into a temporary file, which is returned
+    rewound; the export job stores it without loading it into memory.
+    """
+    fh = tempfile.TemporaryFile()
+    with PdfDocument(fh) as pdf:
+        write(pdf)
+    fh.seek(0)
+    return fh
+
+
+# --- Admin 3 payments ---------------------------------------------------------
+
+def admin3_payments(pay_start, pay_end):
+    pay_lo, pay_hi = local_day_range(pay_start, pay_end)
+    return (Payment.objects.select_related('appointment__patient', 'appointment__doctor', 'cashier')
+            .filter(created_at__gte=pay_lo, created_at__lt=pay_hi, cashier__role=Roles.ADMIN3)
+            .order_by('-created_at'))
+
+
+def admin3_payments_pdf(params):
+    pay_start = date.fromisoformat(params['pay_start'])
+    pay_end = date.fromisoformat(params['pay_end'])
+    clinic_name, clinic_slug = clinic_names()
+    qs = admin3_payments(pay_start, pay_end)
+    total = float(qs.aggregate(total=Sum('amount')).get('total') or 0)
+    filename = f"{clinic_slug}_admin3_payments_{pay_start.isoformat()}_{pay_end.isoformat()}.pdf"
+    if weasyprint_available():
+        html = render_to_string('dashboard/admin3_payments_export.html', {
+            'items': qs,
+            'pay_start': pay_start,
+            'pay_end': pay_end,
+            'clinic_name': clinic_name,
+            'total': total,
+        })
+        return render_pdf(html), filename, 'application/pdf'
+
+    def write(pdf):
+        pdf.text(f"{clinic_name} — Admin 3 tasdiqlagan to'lovlar", size=12)
+        pdf.text(f"{pay_start.isoformat()} — {pay_end.isoformat()}  |  Jami: {total}")
+        pdf.gap()
+        pdf.table_header(['Sana', 'Bemor', 'Shifokor', 'Miqdor', 'Usul', 'Kassir', 'Kvitansiya'],
+                         widths=[70, 115, 100, 60, 55, 60, 63], align='lllrlll', size=8)
+        for p in iter_rows(qs):
+            pdf.row([
+                timezone.localtime(p.created_at).strftime('%Y-%m-%d %H:%M'),
+                getattr(p.appointment.patient, 'full_name', ''),
+                getattr(p.appointment.doctor, 'full_name', ''),
+                f"{p.amount}",
+                p.get_method_display(),
+                getattr(p.cashier, 'username', ''),
+                p.receipt_no,
+            ])
+
+    return fallback_pdf(write), filename, 'application/pdf'
+
+
+# --- Finance (revenue vs expenses) --------------------------------------------
+
+def finance_report(fin_start, fin_end):
+    """Daily and cumulative revenue/expenses between two dates (from FinanceLedger)."""
+    rows = ledger.series(fin_start, fin_end)
+    last = rows[-1] if rows else {'rev_cum': ledger.ZERO, 'exp_cum': ledger.ZERO, 'profit_cum': ledger.ZERO}
+    finance = {
+        'labels': [r['date'] for r in rows],
+        'revenue': [r['rev_cum'] for r in rows],
+        'expenses': [r['exp_cum'] for r in rows],
+        'revenue_total': last['rev_cum'],
+        'expenses_total': last['exp_cum'],
+        'profit_total': last['profit_cum'],
+        'fin_start': fin_start.isoformat(),
+        'fin_end': fin_end.isoformat(),
+    }
+    return finance, rows
+
+
+def finance_pdf(params):
+    finance, rows = finance_report(date.fromisoformat(params['fin_start']),
+                                   date.fromisoformat(params['fin_end']))
+    filename = f"finance_{finance['fin_start']}_{finance['fin_end']}.pdf"
+    if weasyprint_available():
+        html = render_to_string('dashboard/finance_export.html', {'finance': finance, 'rows': rows})
+        return render_pdf(html), filename, 'application/pdf'
+
+    def write(pdf):
+        pdf.text(f"Tushum va xarajatlar: {finance['fin_start']} — {finance['fin_end']}", size=12)
+        pdf.gap()
+        pdf.table_header(['Sana', 'Tushum', 'Xarajat', 'Foyda', 'Tushum (k.)', 'Xarajat (k.)', 'Foyda (k.)'],
+                         widths=[67, 72, 72, 72, 80, 80, 80], align='lrrrrrr')
+        for r in rows:
+            pdf.row([r['date'], r['rev'], r['exp'], r['profit'], r['rev_cum'], r['exp_cum'], r['profit_cum']])
+        pdf.end_table()
+        pdf.gap()
+        pdf.text(f"Jami tushum: {finance['revenue_total']}    Jami xarajat: {finance['expenses_total']}    "
+                 f"Foyda: {finance['profit_total']}")
+
+    return fallback_pdf(write), filename, 'application/pdf'
@@ -0,0 +1,225 @@
+"""Incremental maintenance and read helpers for ``DailyRollup``.
+
+Writes to appointments, payments and approved expenses are folded into the
+rollup table by ``dashboard.signals``; the dashboard charts read from here
+instead of aggregating the raw tables on every page load. Revenue and
+expense changes are also posted to the finance ledger (``ledger.py``).
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import ledger
+from .models import DailyRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_FIELDS = ('appointments', 'payments', 'revenue', 'expenses')
+
+
+def local_day(value):
+    """Return the local calendar day of a datetime (or None)."""
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        return timezone.localtime(value).date()
+    return value.date()
+
+
+def _department(doctor_id):
+    if not doctor_id:
+        return ''
+    from doctors.models import Doctor
+    return Doctor.objects.filter(pk=doctor_id).values_list('department', flat=True).first() or ''
+
+
+def bump(day, doctor_id=None, method='', **deltas):
+    """Add ``deltas`` to the rollup row for (day, doctor, method).
+
+    Uses a single ``UPDATE ... SET x = x + delta`` and only inserts when the
+    row does not exist yet, so concurrent writers never lose increments.
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if day is None or not deltas:
+        return
+    key = {
+        'day': day,
+        'doctor_id': doctor_id,
+        'department': _department(doctor_id),
+        'method': method or '',
+    }
+    updates = {k: F(k) + v for k, v in deltas.items()}
+    if DailyRollup.objects.filter(**key).update(**updates):
+        return
+    if any(v < 0 for v in deltas.values()):
+        # Nothing to subtract from (e.g. the row went away with its doctor)
+        return
+    try:
+        with transaction.atomic():
+            DailyRollup.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Another writer created the row in the meantime
+        DailyRollup.objects.filter(**key).update(**updates)
+
+
+# --- Contributions of single objects -------------------------------------
+
+def appointment_entries(ap):
+    if not ap.date or not ap.doctor_id:
+        return []
+    return [(ap.date, ap.doctor_id, '', {'appointments': 1})]
+
+
+def payment_entries(payment):
+    if not payment.appointment_id or payment.created_at is None:
+        return []
+    from appointments.models import Appointment
+    doctor_id = (Appointment.objects.filter(pk=payment.appointment_id)
+                 .values_list('doctor_id', flat=True).first())
+    return [(local_day(payment.created_at), doctor_id, payment.method,
+             {'payments': 1, 'revenue': payment.amount or Decimal('0')})]
+
+
+def expense_entries(expense):
+    from payments.models import ExpenseStatus
+    if expense.status != ExpenseStatus.APPROVED or expense.approved_at is None:
+        return []
+    return [(local_day(expense.approved_at), None, '', {'expenses': expense.amount or Decimal('0')})]
+
+
+def apply(entries, sign=1):
+    from . import charts
+    for day, doctor_id, method, deltas in entries:
+        deltas = {k: v * sign for k, v in deltas.items()}
+        bump(day, doctor_id, method, **deltas)
+        if deltas.get('revenue') or deltas.get('expenses'):
+            ledger.post(day, revenue=deltas.get('revenue'), expenses=deltas.get('expenses'))
+    if entries:
+        charts.touch([day for day, *_ in entries])
+
+
+def sync_department(doctor):
+    """Re-key a doctor's rows after the doctor's department changed."""
+    (DailyRollup.objects
+     .filter(doctor=doctor)
+     .exclude(department=doctor.department or '')
+     .update(department=doctor.department or ''))
+
+
+# --- Full rebuild ----------------------------------------------------------
+
+def rebuild(start=None, end=None, batch_size=1000):
+    """Recompute rollup rows from the raw tables for [start, end] (inclusive).
+
+    Without ``start`` the rebuild begins at the oldest raw row still present,
+    so history whose raw rows were removed by the retention purge is kept.
+    Returns the number of rows written.
+    """
+    from appointments.models import Appointment
+    from payments.models import Payment, ExpenseRequest, ExpenseStatus
+
+    if start is None:
+        firsts = [
+            Appointment.objects.aggregate(m=Min('date'))['m'],
+            local_day(Payment.objects.aggregate(m=Min('created_at'))['m']),
+            local_day(ExpenseRequest.objects.filter(status=ExpenseStatus.APPROVED)
+                      .aggregate(m=Min('approved_at'))['m']),
+        ]
+        firsts = [d for d in firsts if d]
+        if firsts:
+            start = min(firsts)
+
+    def _range(qs, field):
+        if start:
+            qs = qs.filter(**{f'{field}__gte': start})
+        if end:
+            qs = qs.filter(**{f'{field}__lte': end})
+        return qs
+
+    rows = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    appts = (_range(Appointment.objects.all(), 'date')
+             .values('date', 'doctor_id', 'doctor__department')
+             .annotate(n=Count('id'))
+             .order_by())
+    for r in appts:
+        rows[(r['date'], r['doctor_id'], r['doctor__department'] or '', '')]['appointments'] += r['n']
+
+    pays = (_range(Payment.objects.annotate(day=TruncDate('created_at')), 'day')
+            .values('day', 'appointment__doctor_id', 'appointment__doctor__department', 'method')
+            .annotate(n=Count('id'), total=Sum('amount'))
+            .order_by())
+    for r in pays:
+        row = rows[(r['day'], r['appointment__doctor_id'], r['appointment__doctor__department'] or '', r['method'] or '')]
+        row['payments'] += r['n']
+        row['revenue'] += r['total'] or 0
+
+    exps = (_range(ExpenseRequest.objects.filter(status=ExpenseStatus.APPROVED, approved_at__isnull=False)
+                   .annotate(day=TruncDate('approved_at')), 'day')
+            .values('day')
+            .annotate(total=Sum('amount'))
+            .order_by())
+    for r in exps:
+        rows[(r['day'], None, '', '')]['expenses'] += r['total'] or 0
+
+    objs = [
+        DailyRollup(day=day, doctor_id=doctor_id, department=dept, method=method, **values)
+        for (day, doctor_id, dept, method), values in rows.items()
+    ]
+    with transaction.atomic():
+        _range(DailyRollup.objects.all(), 'day').delete()
+        DailyRollup.objects.bulk_create(objs, batch_size=batch_size)
+        # Running totals of every later day depend on the rebuilt days
+        ledger.rebuild(start)
+        from . import charts
+        charts.touch()
+    return len(objs)
+
+
+# --- Read helpers for the dashboard -----------------------------------------
+
+def _between(start, end):
+    qs = DailyRollup.objects.all()
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    return qs
+
+
+def appointments_by_day(start, end=None):
+    rows = (_between(start, end)
+            .values('day')
+            .annotate(total=Sum('appointments'))
+            .order_by())
+    return {r['day']: r['total'] or 0 for r in rows}
+
+
+def appointments_total(start, end=None):
+    return _between(start, end).aggregate(total=Sum('appointments'))['total'] or 0
+
+
+async def aappointments_total(start, end=None):
+    return (await _between(start, end).aaggregate(total=Sum('appointments')))['total'] or 0
+
+
+def appointments_by_department(start, end=None):
+    return (_between(start, end)
+            .filter(doctor__isnull=False)
+            .values('department')
+            .annotate(total=Sum('appointments'))
+            .filter(total__gt=0)
+            .order_by('-total'))
+
+
+def appointments_by_doctor(start, end=None):
+    return (_between(start, end)
+            .filter(doctor__isnull=False)
+            .values('doctor__id', 'doctor__full_name', 'doctor__department')
+            .annotate(total=Sum('appointments'))
+            .filter(total__gt=0))
@@ -0,0 +1,141 @@
+"""Keep ``DailyRollup`` in step with appointment, payment and expense writes,
+the dashboard ``Counter`` rows with patient/doctor creates and deletes, and
+the cached clinic settings (``clinic.py``) in step with ``Setting``."""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from doctors.models import Doctor
+from patients.models import Patient
+from payments.models import ExpenseRequest, Payment
+
+from . import clinic, counters, rollups
+from .models import Setting
+
+logger = logging.getLogger(__name__)
+
+# model -> (function returning its rollup entries, fields that affect them)
+TRACKED = {
+    Appointment: (rollups.appointment_entries, {'date', 'doctor', 'doctor_id'}),
+    Payment: (rollups.payment_entries, {'amount', 'method', 'created_at', 'appointment', 'appointment_id'}),
+    ExpenseRequest: (rollups.expense_entries, {'amount', 'status', 'approved_at'}),
+}
+
+
+_local = threading.local()
+
+
+@contextmanager
+def signals_suspended():
+    """Skip rollup maintenance and queue feed events (``appointments/signals.py``)
+    for writes in this block (current thread only).
+
+    Used by the retention purge: deleting old raw rows must not erase the
+    history already aggregated in ``DailyRollup``, and rows that old were
+    never on a live queue page.
+    """
+    previous = getattr(_local, 'suspended', False)
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = previous
+
+
+def is_suspended():
+    return getattr(_local, 'suspended', False)
+
+
+def _tracked(sender, update_fields):
+    if is_suspended():
+        return None
+    entries, fields = TRACKED[sender]
+    if update_fields is not None and not (set(update_fields) & fields):
+        return None
+    return entries
+
+
+def _remember(sender, instance, update_fields=None, **kwargs):
+    entries = _tracked(sender, update_fields)
+    instance._rollup_old = None
+    if entries is None:
+        return
+    try:
+        old = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+        instance._rollup_old = entries(old) if old else []
+    except Exception:
+        logger.exception("Rollup: failed to read previous %s state", sender.__name__)
+
+
+def _apply_change(sender, instance, update_fields=None, **kwargs):
+    old = getattr(instance, '_rollup_old', None)
+    if old is None:
+        return
+    entries = TRACKED[sender][0]
+    try:
+        new = entries(instance)
+        if new != old:
+            rollups.apply(old, -1)
+            rollups.apply(new, +1)
+    except Exception:
+        logger.exception("Rollup: failed to apply %s change", sender.__name__)
+    instance._rollup_old = None
+
+
+def _apply_delete(sender, instance, **kwargs):
+    if is_suspended():
+        return
+    try:
+        rollups.apply(TRACKED[sender][0](instance), -1)
+    except Exception:
+        logger.exception("Rollup: failed to apply %s delete", sender.__name__)
+
+
+for _model in TRACKED:
+    pre_save.connect(_remember, sender=_model, dispatch_uid=f'rollup_pre_{_model.__name__}')
+    post_save.connect(_apply_change, sender=_model, dispatch_uid=f'rollup_post_{_model.__name__}')
+    post_delete.connect(_apply_delete, sender=_model, dispatch_uid=f'rollup_del_{_model.__name__}')
+
+
+@receiver(post_save, sender=Doctor, dispatch_uid='rollup_doctor_department')
+def _doctor_department(sender, instance, created, **kwargs):
+    if created:
+        return
+    try:
+        rollups.sync_department(instance)
+    except Exception:
+        logger.exception("Rollup: failed to sync department for doctor %s", instance.pk)
+
+
+def _count_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    try:
+        counters.bump(counters.model_counter(sender), +1)
+    except Exception:
+        logger.exception("Counter: failed to count new %s", sender.__name__)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    try:
+        counters.bump(counters.model_counter(sender), -1)
+    except Exception:
+        logger.exception("Counter: failed to count deleted %s", sender.__name__)
+
+
+for _model in (Patient, Doctor):
+    post_save.connect(_count_created, sender=_model, dispatch_uid=f'counter_post_{_model.__name__}')
+    post_delete.connect(_count_deleted, sender=_model, dispatch_uid=f'counter_del_{_model.__name__}')
+
+
+@receiver(post_save, sender=Setting, dispatch_uid='clinic_setting_saved')
+@receiver(post_delete, sender=Setting, dispatch_uid='clinic_setting_deleted')
+def _setting_changed(sender, instance, update_fields=None, **kwargs):
+    # The receipt counter is not part of the cached snapshot
+    if update_fields is not None and set(update_fields) <= {'receipt_serial'}:
+        return
+    clinic.invalidate()
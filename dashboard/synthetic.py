@@ -0,0 +1,267 @@
+"""Synthetic clinic data for benchmarks (``manage.py seed_clinic``).
+
+Generates doctors, patients, appointments, payments and expense requests
+that look like a working clinic: Uzbek names and phone numbers, fewer
+visits on Sundays, office hours, department prices, returning patients,
+per-doctor ``doc_no`` in date order, most past visits priced and paid, and
+today's queue still open. Days are generated oldest first and written with
+``bulk_create`` in batches, one transaction per batch.
+
+``bulk_create`` sends no signals, so the dashboard counters and daily
+rollups are recomputed at the end.
+"""
+import random
+import time as _time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+FIRST_NAMES_M = (
+    'Aziz', 'Bekzod', 'Jamshid', 'Sardor', 'Otabek', 'Javlon', 'Dilshod', 'Rustam', 'Sherzod', 'Ulugbek',
+    'Akmal', 'Bobur', 'Farrux', 'Nodir', 'Shoxrux', 'Timur', 'Anvar', 'Sanjar', 'Islom', 'Doniyor',
+)
+FIRST_NAMES_F = (
+    'Dilnoza', 'Malika', 'Nodira', 'Gulnora', 'Zarina', 'Madina', 'Shahnoza', 'Feruza', 'Kamola', 'Nilufar',
+    'Sevara', 'Mohira', 'Umida', 'Dildora', 'Nargiza', 'Zuhra', 'Lola', 'Munisa', 'Sabina', 'Yulduz',
+)
+SURNAME_ROOTS = (
+    'Karim', 'Rahim', 'Aliy', 'Tosh', 'Yusup', 'Ergash', 'Nazar', 'Umar', 'Saidov', 'Xolmat',
+    'Abdull', 'Qodir', 'Sobir', 'Jalil', 'Hamid', 'Ismoil', 'Mirzay', 'Normat', 'Rasul', 'Sharip',
+)
+DISTRICTS = (
+    'Chilonzor', 'Yunusobod', 'Mirzo Ulug\'bek', 'Yakkasaroy', 'Shayxontohur', 'Olmazor',
+    'Sergeli', 'Uchtepa', 'Bektemir', 'Yashnobod', 'Mirobod', 'Yangihayot',
+)
+# department -> (share of visits, price range in thousands of so'm)
+DEPARTMENTS = {
+    'Terapiya': (0.22, (80, 150)),
+    'Pediatriya': (0.16, (70, 120)),
+    'Kardiologiya': (0.10, (150, 300)),
+    'Nevrologiya': (0.09, (120, 250)),
+    'Stomatologiya': (0.12, (100, 600)),
+    'LOR': (0.08, (90, 180)),
+    'Ginekologiya': (0.09, (120, 250)),
+    'Urologiya': (0.05, (120, 250)),
+    'Dermatologiya': (0.05, (100, 200)),
+    'UZI': (0.04, (60, 150)),
+}
+EXPENSE_COMMENTS = (
+    'Kanselyariya buyumlari', 'Tozalash vositalari', 'Dori-darmon', 'Kommunal to\'lovlar',
+    'Tibbiy asboblar', 'Internet va aloqa', 'Ta\'mirlash ishlari', 'Laboratoriya reagentlari',
+)
+SEED_USERS = (
+    ('seed_qabul', 'staff'), ('seed_narx', 'admin2'), ('seed_kassir', 'admin3'), ('seed_menejer', 'admin1'),
+)
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Let bulk inserts keep their own ``created_at`` instead of auto_now_add."""
+    fields = [m._meta.get_field('created_at') for m in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class _Names:
+    def __init__(self, rnd):
+        from patients.search import normalize_name
+        self.rnd = rnd
+        self.normalize = normalize_name
+        self.keys = {}
+
+    def person(self):
+        rnd = self.rnd
+        female = rnd.random() < 0.55
+        first = rnd.choice(FIRST_NAMES_F if female else FIRST_NAMES_M)
+        root = rnd.choice(SURNAME_ROOTS)
+        surname = root + ('ova' if female else 'ov') if not root.endswith('ov') else root + ('a' if female else '')
+        father = rnd.choice(FIRST_NAMES_M)
+        name = f"{surname} {first} {father} {'qizi' if female else 'o‘g‘li'}"
+        key = self.keys.get(name)
+        if key is None:
+            key = self.keys[name] = self.normalize(name)
+        return name, key
+
+    def phone(self):
+        rnd = self.rnd
+        return f"+998{rnd.choice((90, 91, 93, 94, 95, 97, 98, 99, 33, 88))}{rnd.randint(0, 9999999):07d}"
+
+
+def _daily_counts(total, start, days, rnd):
+    """Split ``total`` visits over ``days`` days: weekday pattern, slow growth."""
+    weekday = (1.0, 1.05, 1.0, 0.95, 0.95, 0.7, 0.25)
+    weights = [weekday[(start + timedelta(days=i)).weekday()] * (0.8 + 0.4 * i / max(1, days - 1))
+               * rnd.uniform(0.85, 1.15) for i in range(days)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    # Largest remainders get the visits lost to rounding
+    rest = sorted(range(days), key=lambda i: weights[i] * scale - counts[i], reverse=True)
+    for i in rest[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _users():
+    from accounts.models import User
+
+    users = {}
+    for username, role in SEED_USERS:
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            user = User(username=username, role=role)
+            user.set_unusable_password()
+            user.save()
+        users[role] = user
+    return users
+
+
+def _doctors(count, rnd):
+    from doctors.models import Doctor
+    from doctors.utils import next_code_prefix
+
+    doctors = list(Doctor.objects.order_by('pk'))
+    used = {d.code_prefix for d in doctors}
+    names = _Names(rnd)
+    depts = list(DEPARTMENTS)
+    new = []
+    for i in range(len(doctors), count):
+        prefix = next_code_prefix(used)
+        used.add(prefix)
+        new.append(Doctor(full_name=names.person()[0], department=depts[i % len(depts)],
+                          phone=names.phone(), room_number=str(100 + i), code_prefix=prefix))
+    Doctor.objects.bulk_create(new)
+    doctors = list(Doctor.objects.order_by('pk'))[:max(count, 1)]
+    weights = [DEPARTMENTS.get(d.department, (0.05, None))[0] for d in doctors]
+    return doctors, weights
+
+
+def seed(appointments, days=365, doctors=None, batch=10000, random_seed=42, progress=None):
+    """Generate ``appointments`` visits over the last ``days`` days (today included).
+
+    Returns a dict of row counts and the elapsed seconds. ``progress(stats)``
+    is called after every committed batch.
+    """
+    from appointments.models import Appointment, AppointmentStatus
+    from doctors.models import Doctor
+    from patients.models import Patient
+    from payments.models import ExpenseRequest, ExpenseStatus, Payment, PaymentMethod
+
+    rnd = random.Random(random_seed)
+    names = _Names(rnd)
+    t0 = _time.perf_counter()
+    tz = timezone.get_current_timezone()
+    now = timezone.now()
+    today = timezone.localdate()
+    days = max(1, days)
+    start = today - timedelta(days=days - 1)
+    users = _users()
+    doctor_count = doctors or max(8, min(200, appointments // 5000))
+    doctor_list, doctor_weights = _doctors(doctor_count, rnd)
+    serials = {d.pk: d.receipt_serial for d in doctor_list}
+    departments = {d.pk: d.department for d in doctor_list}
+    patient_ids = array('q', Patient.objects.values_list('pk', flat=True).order_by('pk'))
+    stats = {'doctors': len(doctor_list), 'patients': 0, 'appointments': 0, 'payments': 0, 'expenses': 0}
+
+    def flush(pending_patients, visits):
+        with transaction.atomic(), explicit_created_at(Patient, Appointment, Payment):
+            Patient.objects.bulk_create([p for p in pending_patients])
+            for p in pending_patients:
+                patient_ids.append(p.pk)
+            appts = []
+            for v in visits:
+                patient = v.pop('patient')
+                v['patient_id'] = patient.pk if isinstance(patient, Patient) else patient
+                appts.append(Appointment(**{k: val for k, val in v.items() if k != 'paid_at'}))
+            Appointment.objects.bulk_create(appts)
+            payments = [
+                Payment(appointment_id=a.pk, amount=a.service_price, cashier=users['admin3'],
+                        method=PaymentMethod.CASH if rnd.random() < 0.7 else PaymentMethod.CARD,
+                        receipt_no=f"S{a.pk}", created_at=v['paid_at'])
+                for a, v in zip(appts, visits) if v['paid_at']
+            ]
+            Payment.objects.bulk_create(payments)
+        stats['patients'] += len(pending_patients)
+        stats['appointments'] += len(appts)
+        stats['payments'] += len(payments)
+        stats['elapsed'] = _time.perf_counter() - t0
+        if progress:
+            progress(stats)
+
+    pending_patients, visits = [], []
+    for offset, count in enumerate(_daily_counts(appointments, start, days, rnd)):
+        day = start + timedelta(days=offset)
+        past = day < today
+        minutes = sorted(rnd.randint(8 * 60, 17 * 60 + 59) for _ in range(count))
+        chosen = rnd.choices(doctor_list, weights=doctor_weights, k=count) if count else []
+        for minute, doctor in zip(minutes, chosen):
+            at = time(minute // 60, minute % 60)
+            seen_at = timezone.make_aware(datetime.combine(day, at), tz)
+            if patient_ids and rnd.random() < 0.6:
+                patient = patient_ids[rnd.randrange(len(patient_ids))]
+            elif pending_patients and rnd.random() < 0.1:
+                patient = rnd.choice(pending_patients)
+            else:
+                name, key = names.person()
+                patient = Patient(full_name=name, search_name=key, phone=names.phone(),
+                                  address=f"Toshkent, {rnd.choice(DISTRICTS)} tumani",
+                                  birth_date=day - timedelta(days=rnd.randint(365, 85 * 365)),
+                                  created_at=seen_at - timedelta(minutes=5))
+                pending_patients.append(patient)
+            priced = rnd.random() < (0.95 if past else 0.6)
+            low, high = DEPARTMENTS.get(departments[doctor.pk], (0, (80, 200)))[1]
+            price = Decimal(rnd.randint(low, high) * 1000) if priced else None
+            paid_at = None
+            if priced and rnd.random() < (0.93 if past else 0.5):
+                paid_at = min(seen_at + timedelta(minutes=rnd.randint(5, 40)), now)
+            serials[doctor.pk] += 1
+            if past:
+                status = AppointmentStatus.DONE
+            else:
+                status = rnd.choice((AppointmentStatus.WAITING, AppointmentStatus.IN_PROGRESS, AppointmentStatus.DONE))
+            visits.append({
+                'doctor_id': doctor.pk, 'patient': patient, 'date': day, 'time': at, 'status': status,
+                'doc_no': serials[doctor.pk], 'service_price': price, 'created_by_id': users['staff'].pk,
+                'created_at': min(seen_at - timedelta(minutes=rnd.randint(0, 30)), now), 'paid_at': paid_at,
+            })
+            if len(visits) >= batch:
+                flush(pending_patients, visits)
+                pending_patients, visits = [], []
+    if visits or pending_patients:
+        flush(pending_patients, visits)
+
+    for pk, serial in serials.items():
+        Doctor.objects.filter(pk=pk, receipt_serial__lt=serial).update(receipt_serial=serial)
+
+    expenses = []
+    for _ in range(max(20, appointments // 100)):
+        created = timezone.make_aware(datetime.combine(start + timedelta(days=rnd.randrange(days)),
+                                                       time(rnd.randint(9, 17), rnd.randint(0, 59))), tz)
+        created = min(created, now)
+        roll = rnd.random()
+        status = (ExpenseStatus.APPROVED if roll < 0.75 else
+                  ExpenseStatus.REJECTED if roll < 0.85 else ExpenseStatus.PENDING)
+        decided = status != ExpenseStatus.PENDING
+        expenses.append(ExpenseRequest(
+            amount=Decimal(rnd.randint(5, 500) * 1000), comment=rnd.choice(EXPENSE_COMMENTS),
+            requested_by=users['admin1'], status=status, created_at=created,
+            approved_by=users['admin1'] if decided else None,
+            approved_at=min(created + timedelta(hours=rnd.randint(1, 48)), now) if decided else None,
+        ))
+    with explicit_created_at(ExpenseRequest):
+        ExpenseRequest.objects.bulk_create(expenses, batch_size=batch)
+    stats['expenses'] = len(expenses)
+
+    from . import counters, rollups
+    counters.reconcile()
+    rollups.rebuild(start)
+    stats['elapsed'] = _time.perf_counter() - t0
+    return stats
@@ -0,0 +1,639 @@
+import copy
+import glob
+import io
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from datetime import time as dtime
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from klinika_project import pdf, replica
+from patients.models import Patient
+
+from . import charts, counters, importer, jobs, rollups
+from .models import DailyRollup, ExportJob, FinanceLedger, ImportJob
+
+
+def rollup_state():
+    """DailyRollup and FinanceLedger contents, leaving out the all-zero rows
+    that incremental updates keep after deletes and a rebuild does not write."""
+    daily = sorted(
+        ((r.day, r.doctor_id, r.department, r.method, r.appointments, r.payments, r.revenue, r.expenses)
+         for r in DailyRollup.objects.all() if r.appointments or r.payments or r.revenue or r.expenses),
+        key=lambda row: (row[0], row[1] or 0, row[2], row[3]),
+    )
+    ledger = list(FinanceLedger.objects.exclude(revenue=0, expenses=0)
+                  .values_list('day', 'revenue', 'expenses', 'revenue_cum', 'expenses_cum'))
+    return daily, ledger
+
+
+class CounterTests(TestCase):
+
+    def test_create_and_delete_bump_counter(self):
+        counters.reconcile(['patients'])
+        patient = Patient.objects.create(full_name='Hisob Bemor', phone='')
+        self.assertEqual(counters.get('patients'), {'patients': 1})
+        patient.delete()
+        self.assertEqual(counters.get('patients'), {'patients': 0})
+
+    def test_rolled_back_create_leaves_counter(self):
+        counters.reconcile(['patients'])
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Patient.objects.create(full_name='Hisob Bemor', phone='')
+            raise RuntimeError
+        self.assertEqual(counters.get('patients'), {'patients': 0})
+
+    def test_reconcile_catches_up_bulk_create(self):
+        counters.reconcile(['patients'])
+        Patient.objects.bulk_create([Patient(full_name=f'Hisob {i}', phone='') for i in range(3)])
+        self.assertEqual(counters.drift(['patients']), {'patients': (0, 3)})
+        with self.assertLogs('dashboard.counters', 'INFO'):
+            self.assertEqual(counters.reconcile(['patients']), {'patients': 3})
+        self.assertEqual(counters.drift(['patients']), {})
+
+
+
+
+class RollupConsistencyTests(TestCase):
+    """Signal-maintained DailyRollup and FinanceLedger rows equal a
+    ``rollups.rebuild()`` from the raw rows after every kind of write."""
+
+    def setUp(self):
+        from accounts.models import User
+        from doctors.models import Doctor
+
+        self.user = User.objects.create(username='test_rollups', role='creator')
+        self.doctors = [
+            Doctor.objects.create(full_name=f'Yig\'indi Shifokor {i}', department=department,
+                                  phone='+998900000000', room_number=str(i))
+            for i, department in enumerate(['Terapiya', 'Jarrohlik'])
+        ]
+        self.patient = Patient.objects.create(full_name='Yig\'indi Bemor', phone='')
+        self.today = timezone.localdate()
+
+    def assertMatchesRebuild(self):
+        state = rollup_state()
+        # From a fixed day: without a start the rebuild keeps the days before
+        # the oldest raw row left, which is where a deleted row may have been
+        rollups.rebuild(self.today - timedelta(days=30))
+        self.assertEqual(rollup_state(), state)
+
+    def appointment(self, doctor, days_ago, price='50000'):
+        from appointments.models import Appointment
+        return Appointment.objects.create(doctor=doctor, patient=self.patient, time=dtime(9, 0),
+                                          date=self.today - timedelta(days=days_ago), service_price=Decimal(price))
+
+    def test_appointments(self):
+        first = self.appointment(self.doctors[0], 2)
+        second = self.appointment(self.doctors[0], 2)
+        self.appointment(self.doctors[1], 0)
+        self.assertMatchesRebuild()
+        first.date = self.today - timedelta(days=5)
+        first.save()
+        second.doctor = self.doctors[1]
+        second.save(update_fields=['doctor'])
+        self.assertMatchesRebuild()
+        self.doctors[1].department = 'Kardiologiya'
+        self.doctors[1].save()
+        first.delete()
+        self.assertMatchesRebuild()
+
+    def test_payments(self):
+        from payments.models import Payment
+
+        visits = [self.appointment(self.doctors[i % 2], i) for i in range(3)]
+        payments = [Payment.objects.create(appointment=ap, amount=ap.service_price, method='cash', cashier=self.user)
+                    for ap in visits]
+        self.assertMatchesRebuild()
+        payments[0].amount = Decimal('45000.50')
+        payments[0].method = 'card'
+        payments[0].save()
+        payments[1].created_at -= timedelta(days=3)
+        payments[1].save()
+        self.assertMatchesRebuild()
+        payments[2].delete()
+        visits[1].delete()  # takes its payment along
+        self.assertMatchesRebuild()
+
+    def test_approved_expenses(self):
+        from payments.models import ExpenseRequest, ExpenseStatus
+
+        self.appointment(self.doctors[0], 0)
+        pending = ExpenseRequest.objects.create(amount=Decimal('120000'), requested_by=self.user)
+        old = ExpenseRequest.objects.create(amount=Decimal('30000'), requested_by=self.user,
+                                            status=ExpenseStatus.APPROVED, approved_by=self.user,
+                                            approved_at=timezone.now() - timedelta(days=7))
+        self.assertMatchesRebuild()
+        pending.status = ExpenseStatus.APPROVED
+        pending.approved_by = self.user
+        pending.approved_at = timezone.now()
+        pending.save()
+        old.amount = Decimal('35000')
+        old.save()
+        self.assertMatchesRebuild()
+        pending.status = ExpenseStatus.REJECTED
+        pending.save(update_fields=['status'])
+        old.delete()
+        self.assertMatchesRebuild()
+
+
+class _Interrupted(Exception):
+    pass
+
+
+class ImportResumeTests(TestCase):
+    """An import stopped after a committed batch continues where it stopped
+    when the same job is run again."""
+
+    def setUp(self):
+        from doctors.models import Doctor
+
+        self.doctor = Doctor.objects.create(full_name='Import Shifokor', department='Terapiya',
+                                            phone='+998900000000', room_number='1')
+        day = timezone.localdate() - timedelta(days=10)
+        self.days = (day, day + timedelta(days=1))
+        self.csv = '\n'.join([
+            "F.I.Sh.;Telefon;Shifokor;Sana;Vaqt;Xizmat narxi",
+            f"ALIYEV VALI;901234567;Import Shifokor;{self.days[0]:%d.%m.%Y};09:00;50000",
+            f"Karimova Dilnoza;+998 90 111 22 33;Import Shifokor;{self.days[1]};10:00;",
+            f"aliyev  vali;;Import Shifokor;{self.days[1]};11:00;70 000",
+            f"Noma'lum Bemor;;Yo'q Shifokor;{self.days[1]};;",
+            "Ergashev Bobur;8 90 555 44 33;;;;",
+        ]).encode()
+        self.job = ImportJob.objects.create(source_name='bemorlar.csv', checksum='-')
+        counters.reconcile(['patients'])
+
+    def run_import(self, progress=None):
+        self.assertTrue(importer.claim(self.job))
+        with self.assertLogs('dashboard', 'INFO'):
+            return importer.run(self.job, io.BytesIO(self.csv), batch_size=2, progress=progress)
+
+    def test_rerun_after_interrupted_batch(self):
+        from appointments.models import Appointment
+
+        def stop(job):
+            raise _Interrupted
+
+        with self.assertRaises(_Interrupted):
+            self.run_import(stop)
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.rows_done), (ImportJob.Status.FAILED, 2))
+        self.assertEqual(Appointment.objects.count(), 2)
+
+        job = self.run_import()
+        self.assertEqual(job.status, ImportJob.Status.DONE)
+        self.assertEqual((job.rows_done, job.rows_failed), (5, 1))
+        self.assertEqual((job.patients_created, job.patients_matched, job.appointments_created), (3, 1, 3))
+        self.assertEqual(job.row_errors[0]['row'], 5)
+
+        self.assertEqual(sorted(Patient.objects.values_list('full_name', flat=True)),
+                         ['Aliyev Vali', 'Ergashev Bobur', 'Karimova Dilnoza'])
+        self.assertEqual(sorted(Appointment.objects.values_list('doc_no', flat=True)), [1, 2, 3])
+        self.assertEqual(Appointment.objects.filter(patient__full_name='Aliyev Vali').count(), 2)
+        self.assertEqual(counters.drift(['patients']), {})
+        self.assertEqual(rollups.appointments_by_day(*self.days), {self.days[0]: 1, self.days[1]: 2})
+        state = rollup_state()
+        rollups.rebuild()
+        self.assertEqual(rollup_state(), state)
+
+    def test_finished_job_is_not_run_again(self):
+        self.run_import()
+        self.job.file.name = 'imports/bemorlar.csv'
+        self.assertFalse(importer.resumable(self.job))
+        self.assertFalse(importer.claim(self.job))
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'chart-range-tests'}})
+class ChartRangeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.first = self.today - timedelta(days=400)
+        DailyRollup.objects.create(day=self.first, appointments=1)
+
+    def test_range_is_clamped_to_days_with_data(self):
+        self.assertEqual(charts.parse_range('last30', '0001-01-01', '9999-12-31'), (self.first, self.today))
+        data = charts.get('last30', date(1, 1, 1), date(9999, 12, 31))
+        self.assertEqual((data['start'], data['end']), (self.first.isoformat(), self.today.isoformat()))
+
+    def test_default_range_is_kept_without_data(self):
+        DailyRollup.objects.all().delete()
+        start = self.today - timedelta(days=29)
+        self.assertEqual(charts.parse_range('last30', '0001-01-01', '9999-12-31'), (start, self.today))
+
+
+class ServerTimingTests(TestCase):
+
+    def timing(self, role=None, **fields):
+        from accounts.models import User
+        self.client.logout()
+        if role:
+            self.client.force_login(User.objects.create(username=f'timing_{role}', role=role, **fields))
+        response = self.client.get(reverse('accounts:login'), secure=True)
+        self.assertLess(response.status_code, 400)
+        return response.get('Server-Timing')
+
+    def test_header_only_for_staff_and_creators(self):
+        self.assertIsNone(self.timing())
+        self.assertIsNone(self.timing('doctor'))
+        self.assertIn('db;dur=', self.timing('creator'))
+        self.assertIn('db;dur=', self.timing('admin1', is_staff=True))
+
+    @override_settings(DEBUG=True)
+    def test_header_for_everyone_in_debug(self):
+        self.assertIn('db;dur=', self.timing())
+
+
+class StreamingCsvTests(TestCase):
+
+    def setUp(self):
+        from accounts.models import User
+        from appointments.models import Appointment
+        from doctors.models import Doctor
+
+        self.doctor = Doctor.objects.create(full_name='Eksport Shifokor', department='Terapiya',
+                                            phone='+998900000000', room_number='1')
+        patient = Patient.objects.create(full_name='Eksport Bemor', phone='')
+        Appointment.objects.bulk_create([
+            Appointment(doctor=self.doctor, patient=patient, date=timezone.localdate(), time=dtime(8 + i // 60, i % 60))
+            for i in range(300)
+        ])
+        self.user = User.objects.create(username='test_export', role='creator')
+        self.url = f'/admin/doctors/{self.doctor.pk}/appointments/?export=csv'
+
+    def test_wsgi_streams_sync_iterator(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, secure=True)
+        self.assertTrue(response.streaming)
+        self.assertFalse(response.is_async)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 301)
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, secure=True)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)  # header first, then the rows
+        self.assertEqual(len(b''.join(chunks).decode().splitlines()), 301)
+
+
+
+class _InlineExecutor:
+    """Runs submitted calls at once (the process pool's interface)."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class ExportJobTests(TestCase):
+
+    def setUp(self):
+        from doctors.models import Doctor
+
+        self.media = tempfile.mkdtemp(prefix='klinika-jobs-')
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.doctor = Doctor.objects.create(full_name='Eksport Shifokor', department='Terapiya',
+                                            phone='+998900000000', room_number='1')
+
+    def run_job(self, executor=None):
+        job = ExportJob.objects.create(kind='doctor_appointments', params={'doctor': self.doctor.pk})
+        with self.settings(MEDIA_ROOT=self.media), self.assertLogs('dashboard.jobs', 'INFO') as logs:
+            job = jobs.run_job(job, executor)
+            self.assertEqual(job.status, ExportJob.Status.DONE, job.error)
+            with job.file.open('rb') as f:
+                self.assertEqual(f.read(5), b'%PDF-')
+        return job, logs.output[-1]
+
+    def test_render_in_executor_hands_file_back(self):
+        parts = set(glob.glob(os.path.join(tempfile.gettempdir(), 'export-*.part')))
+        job, _ = self.run_job(_InlineExecutor())
+        self.assertGreater(job.size, 0)
+        self.assertEqual(set(glob.glob(os.path.join(tempfile.gettempdir(), 'export-*.part'))), parts)
+
+    def test_log_without_queue_time(self):
+        _, line = self.run_job()
+        self.assertIn('queue=- ', line)
+
+
+
+
+@skipUnless(pdf.default_font_path(), "no TrueType font for the built-in PDF writer")
+class PdfFontTests(TestCase):
+    """The built-in PDF writer embeds only the glyphs a document uses."""
+
+    text = "To‘lovlar — G‘ulomov Ўзбекистон é"
+
+    def render(self):
+        out = io.BytesIO()
+        with pdf.PdfDocument(out) as doc:
+            doc.text(self.text)
+            doc.table_header(['Sana', 'Bemor'], widths=[100, 200])
+            for i in range(100):
+                doc.row([f'2026-01-{i % 28 + 1:02d}', f'Bemor {i} o‘g‘li'])
+        return out.getvalue()
+
+    def font_program(self, data):
+        m = re.search(rb'<< /Length (\d+) /Length1 (\d+) /Filter /FlateDecode >>\nstream\n', data)
+        font = zlib.decompress(data[m.end():m.end() + int(m.group(1))])
+        self.assertEqual(len(font), int(m.group(2)))
+        return font
+
+    def test_subset_is_small(self):
+        data = self.render()
+        self.assertLess(len(data), 40 * 1024)
+        self.assertLess(len(self.font_program(data)), os.path.getsize(pdf.default_font_path()) // 4)
+
+    def test_subset_keeps_used_glyphs(self):
+        try:
+            from fontTools.pens.boundsPen import BoundsPen
+            from fontTools.ttLib import TTFont
+        except ImportError:
+            self.skipTest("fontTools is not installed")
+        full = pdf.load_font(pdf.default_font_path())
+        subset = TTFont(io.BytesIO(self.font_program(self.render())))
+        glyphs, order = subset.getGlyphSet(), subset.getGlyphOrder()
+
+        def bounds(char):
+            pen = BoundsPen(glyphs)
+            glyphs[order[full.cmap[ord(char)]]].draw(pen)
+            return pen.bounds
+
+        for char in set(self.text) - {' '}:
+            self.assertIsNotNone(bounds(char), char)
+        self.assertIsNone(bounds('Q'))
+
+@skipUnless(connection.vendor == 'postgresql', "needs concurrent writers and row locks (PostgreSQL)")
+class ConcurrentCounterTests(TransactionTestCase):
+    """Parallel creates and deletes, some rolled back, keep the counter equal to the table."""
+
+    ops = 400
+    threads = 16
+    rollback_every = 10
+
+    def test_counter_matches_table(self):
+        counters.reconcile(['patients'])
+        errors = []
+        barrier = threading.Barrier(self.threads)
+
+        class Rollback(Exception):
+            pass
+
+        def work(i):
+            rnd = random.Random(i)
+            try:
+                if i < barrier.parties:
+                    barrier.wait(timeout=30)
+                try:
+                    with transaction.atomic():
+                        victim = None
+                        if rnd.random() < 0.4:
+                            # Lock the victim: two transactions deleting the same
+                            # row would both send post_delete (see counters.py)
+                            victim = (Patient.objects.select_for_update(skip_locked=True)
+                                      .order_by('?').first())
+                        if victim is not None:
+                            victim.delete()
+                        else:
+                            Patient.objects.create(full_name=f'Stress counter {i}', phone='')
+                        if i % self.rollback_every == 0:
+                            raise Rollback
+                except Rollback:
+                    pass
+            except Exception as e:  # collect and report, do not stop other workers
+                errors.append(repr(e))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            list(pool.map(work, range(self.ops)))
+        self.assertEqual(errors, [])
+        self.assertEqual(counters.get('patients')['patients'], Patient.objects.count())
+
+
+@skipUnless(connection.vendor == 'postgresql', "terminates its own PostgreSQL backends")
+class ReconnectTests(TransactionTestCase):
+    """A connection the server dropped (restart, PgBouncer or network cut) is
+    replaced on the next request instead of failing it: CONN_HEALTH_CHECKS,
+    and in DB_POOL=psycopg the pool's own check."""
+
+    rounds = 5
+
+    def request(self):
+        """One request cycle as the handlers run it; returns the backend pid."""
+        request_started.send(sender=self.__class__)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_backend_pid()')
+                return cursor.fetchone()[0]
+        finally:
+            request_finished.send(sender=self.__class__)
+
+    def test_request_after_backend_terminated(self):
+        # A driver connection outside Django's connection (and its pool)
+        killer = connection.Database.connect(**connection.get_connection_params())
+        killer.autocommit = True
+        self.addCleanup(killer.close)
+        seen = set()
+        for _ in range(self.rounds):
+            seen.add(self.request())
+            with killer.cursor() as cursor:
+                cursor.execute(
+                    'SELECT count(*) FROM pg_stat_activity '
+                    'WHERE pid = ANY(%s) AND pg_terminate_backend(pid)',
+                    [sorted(seen)],
+                )
+                self.assertGreater(cursor.fetchone()[0], 0)
+            pid = self.request()
+            self.assertNotIn(pid, seen)
+            seen.add(pid)
+
+
+PRIMARY_DOCTOR = 'Asosiy baza shifokori'
+REPLICA_DOCTOR = 'Replika shifokori'
+PRIMARY_PATIENT = 'Asosiy baza bemori'
+REPLICA_PATIENT = 'Replika bemori'
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'report-replica-tests'}})
+class ReportReplicaTests(TransactionTestCase):
+    """Report pages and exports read the ``replica`` database inside
+    ``replica.report()``; writes and every other read use the primary.
+
+    The replica is a second test database of the primary's engine, with the
+    same ids but different names on its rows, so each page shows which
+    database it read.
+    """
+
+    # Resolved in setUpClass, once the stand-in replica alias exists
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        databases = connections.settings
+        saved = databases.get(replica.REPLICA)
+        default = databases[DEFAULT_DB_ALIAS]
+        stand_in = copy.deepcopy(default)
+        stand_in['TEST'] = {
+            **stand_in['TEST'],
+            'MIRROR': None,
+            'NAME': None if connection.vendor == 'sqlite' else f"{connection.settings_dict['NAME']}_replica",
+        }
+        if saved is not None:
+            del connections[replica.REPLICA]
+        databases[replica.REPLICA] = stand_in
+        old_name = connections[replica.REPLICA].creation.create_test_db(verbosity=0, autoclobber=True)
+
+        def restore():
+            connections[replica.REPLICA].creation.destroy_test_db(old_name, verbosity=0)
+            del connections[replica.REPLICA]
+            if saved is None:
+                databases.pop(replica.REPLICA, None)
+            else:
+                databases[replica.REPLICA] = saved
+            replica._down_until = 0.0
+
+        cls.addClassCleanup(restore)
+        cls.media = tempfile.mkdtemp(prefix='klinika-replica-')
+        cls.addClassCleanup(shutil.rmtree, cls.media, ignore_errors=True)
+        super().setUpClass()
+
+    def setUp(self):
+        from accounts.models import User
+        from appointments.models import Appointment
+        from doctors.models import Doctor
+
+        replica._down_until = 0.0
+        counters.reconcile()
+        today = timezone.localdate()
+        self.doctor = Doctor.objects.create(full_name=PRIMARY_DOCTOR, department='Terapiya',
+                                            phone='+998900000000', room_number='1')
+        # bulk_create sends no signals, so nothing is written back to the primary
+        for alias, doctor_name, patient_name in ((DEFAULT_DB_ALIAS, PRIMARY_DOCTOR, PRIMARY_PATIENT),
+                                                 (replica.REPLICA, REPLICA_DOCTOR, REPLICA_PATIENT)):
+            if alias != DEFAULT_DB_ALIAS:
+                Doctor.objects.using(alias).bulk_create([Doctor(
+                    pk=self.doctor.pk, full_name=doctor_name, department='Terapiya',
+                    phone='+998900000000', room_number='1')])
+            Patient.objects.using(alias).bulk_create([Patient(full_name=patient_name, phone='')])
+            patient = Patient.objects.using(alias).get(full_name=patient_name)
+            Appointment.objects.using(alias).bulk_create([
+                Appointment(doctor_id=self.doctor.pk, patient=patient, date=today, time=dtime(9, i))
+                for i in range(3)
+            ])
+            DailyRollup.objects.using(alias).filter(day=today).delete()
+            DailyRollup.objects.using(alias).bulk_create([
+                DailyRollup(day=today, doctor_id=self.doctor.pk, department='Terapiya', appointments=3)
+            ])
+        self.client.force_login(User.objects.create(username='test_replica', role='creator'))
+
+    def page(self, url):
+        cache.clear()
+        response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200, url)
+        if response.streaming:
+            return b''.join(response.streaming_content).decode()
+        return response.content.decode()
+
+    def assertReads(self, text, expected, other):
+        self.assertIn(expected, text)
+        self.assertNotIn(other, text)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        from doctors.models import Doctor
+
+        with replica.report() as alias:
+            names = set(Doctor.objects.values_list('full_name', flat=True))
+            Patient.objects.create(full_name='Yozuv tekshiruvi', phone='')
+        self.assertEqual(alias, replica.REPLICA)
+        self.assertEqual(names, {REPLICA_DOCTOR})
+        self.assertEqual(set(Doctor.objects.values_list('full_name', flat=True)), {PRIMARY_DOCTOR})
+        self.assertTrue(Patient.objects.using(DEFAULT_DB_ALIAS).filter(full_name='Yozuv tekshiruvi').exists())
+        self.assertFalse(Patient.objects.using(replica.REPLICA).filter(full_name='Yozuv tekshiruvi').exists())
+
+    def test_report_pages_and_exports_read_replica(self):
+        self.assertReads(self.page('/admin/dashboard/'), REPLICA_DOCTOR, PRIMARY_DOCTOR)
+        self.assertReads(self.page('/admin/dashboard/stats/charts/doctors/'), REPLICA_DOCTOR, PRIMARY_DOCTOR)
+        self.assertReads(self.page(f'/admin/doctors/{self.doctor.pk}/appointments/?export=csv'),
+                         REPLICA_PATIENT, PRIMARY_PATIENT)
+        with self.settings(MEDIA_ROOT=self.media):
+            job = jobs.run_job(ExportJob.objects.create(kind='doctor_appointments',
+                                                        params={'doctor': self.doctor.pk}))
+        self.assertEqual(job.status, ExportJob.Status.DONE, job.error)
+        self.assertIn('Replika', job.filename)
+
+    @override_settings(STATS_CACHE_LIVE_TTL=60, STATS_CACHE_HISTORY_TTL=86400)
+    def test_replica_results_are_cached_briefly(self):
+        end = timezone.localdate() - timedelta(days=1)
+
+        def ttl():
+            with mock.patch.object(charts, 'cache', wraps=cache) as wrapped:
+                charts.get('last30', end - timedelta(days=29), end)
+            return [call.args[2] for call in wrapped.set.call_args_list
+                    if call.args[0].startswith('stats:last30:')]
+
+        cache.clear()
+        with replica.report():
+            self.assertEqual(ttl(), [60])
+        cache.clear()
+        self.assertEqual(ttl(), [86400])
+
+    @skipUnless(connection.vendor == 'postgresql', "REPEATABLE READ READ ONLY is set on PostgreSQL only")
+    def test_report_reads_one_read_only_snapshot(self):
+        from doctors.models import Doctor
+
+        def insert():
+            try:
+                Doctor.objects.using(replica.REPLICA).create(
+                    pk=self.doctor.pk + 1000, full_name='Parallel yozuv', department='Terapiya',
+                    phone='', room_number='2')
+            finally:
+                connections.close_all()
+
+        with replica.report() as alias:
+            before = Doctor.objects.count()
+            writer = threading.Thread(target=insert)
+            writer.start()
+            writer.join()
+            self.assertEqual(Doctor.objects.count(), before)
+            with self.assertRaises(DatabaseError), transaction.atomic(using=alias):
+                Doctor.objects.using(alias).filter(pk=self.doctor.pk).update(room_number='0')
+        self.assertEqual(Doctor.objects.using(replica.REPLICA).count(), before + 1)
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        conn = connections[replica.REPLICA]
+        with mock.patch.object(conn, 'ensure_connection', side_effect=OperationalError('down')), \
+                self.assertLogs(replica.__name__, 'WARNING'):
+            self.assertEqual(replica.report_alias(), DEFAULT_DB_ALIAS)
+            self.assertGreater(replica._down_until, time.monotonic())
+        # Still within REPLICA_RETRY_SECONDS: the primary without trying the replica
+        self.assertReads(self.page('/admin/dashboard/'), PRIMARY_DOCTOR, REPLICA_DOCTOR)
+
+    def test_without_replica_reads_primary(self):
+        databases = connections.settings
+        stand_in = databases.pop(replica.REPLICA)
+        try:
+            self.assertEqual(replica.report_alias(), DEFAULT_DB_ALIAS)
+            text = self.page('/admin/dashboard/')
+        finally:
+            databases[replica.REPLICA] = stand_in
+        self.assertReads(text, PRIMARY_DOCTOR, REPLICA_DOCTOR)
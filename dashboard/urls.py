@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import admin_dashboard, stats_view, settings_view, users_manage, make_admin, make_admin1, make_admin2, make_admin3, remove_admin, toggle_active, reset_doc_counter, user_add, clear_patients
+from .views import admin_dashboard, stats_view, stats_chart, settings_view, users_manage, make_admin, make_admin1, make_admin2, make_admin3, remove_admin, toggle_active, reset_doc_counter, user_add, clear_patients, export_job, export_job_download, request_metrics, import_data, import_job
 
 urlpatterns = [
     path('', admin_dashboard, name='admin_dashboard'),
     path('stats/', stats_view, name='stats'),
+    path('stats/charts/<slug:name>/', stats_chart, name='stats_chart'),
     path('settings/', settings_view, name='settings'),
     path('settings/clear-patients/', clear_patients, name='clear_patients'),
     path('users/add/', user_add, name='user_add'),
@@ -15,4 +16,9 @@ urlpatterns = [
     path('users/<int:pk>/remove_admin/', remove_admin, name='remove_admin'),
     path('users/<int:pk>/toggle_active/', toggle_active, name='toggle_active'),
     path('settings/reset-doc-counter/', reset_doc_counter, name='reset_doc_counter'),
+    path('exports/<int:pk>/', export_job, name='export_job'),
+    path('exports/<int:pk>/download/', export_job_download, name='export_job_download'),
+    path('metrics/', request_metrics, name='request_metrics'),
+    path('import/', import_data, name='import_data'),
+    path('import/<int:pk>/', import_job, name='import_job'),
 ]
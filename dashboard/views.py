@@ -1,9 +1,10 @@
 from datetime import date, timedelta
 import json
-import re
-from django.db.models import Count, Sum, Min
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Sum
 from django.db.models.functions import TruncDay, TruncMonth
 from django.shortcuts import render, redirect
+from django.template.response import TemplateResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
@@ -17,10 +18,13 @@ try:
 except Exception:
     ExpenseRequest = None
     ExpenseStatus = None
-from .models import Setting
-from .forms import SettingForm
+from .models import ExportJob, ImportJob, Setting
+from .forms import ImportForm, SettingForm
+from . import charts, counters, jobs, reports, rollups
 from accounts.models import User, Roles
+from klinika_project import replica
 from django.db import transaction
+from django.utils import timezone
 from django.utils.timezone import localdate
 
 
@@ -41,16 +45,17 @@ def admin_dashboard(request):
     except Exception:
         end_date = start_date
 
-    doctors_count = Doctor.objects.count()
-    patients_count = Patient.objects.count()
-    range_qs = Appointment.objects.filter(date__gte=start_date, date__lte=end_date)
-    range_total = range_qs.count()
-    per_doctor = (
-        range_qs.values('doctor__id', 'doctor__full_name', 'doctor__department')
-        .annotate(total=Count('id'))
-        .order_by('-total', 'doctor__full_name')
-    )
-    total_in_range = sum([row['total'] for row in per_doctor]) if per_doctor else 0
+    # Counters may be reconciled (written) on first use: read them first
+    totals = counters.get('doctors', 'patients')
+    doctors_count = totals['doctors']
+    patients_count = totals['patients']
+    with replica.report():
+        per_doctor = list(
+            rollups.appointments_by_doctor(start_date, end_date)
+            .order_by('-total', 'doctor__full_name')
+        )
+    total_in_range = sum(row['total'] for row in per_doctor)
+    range_total = total_in_range
     return render(request, 'dashboard/admin_dashboard.html', {
         'doctors_count': doctors_count,
         'patients_count': patients_count,
@@ -62,26 +67,26 @@ def admin_dashboard(request):
     })
 
 
-def home(request):
-    # Simple role-aware landing
-    if request.user.is_authenticated and request.user.role in ('creator', 'admin'):
-        # Fall through to functional home with cards instead of redirecting
-        pass
-    # For others, show a basic home with quick links
-    today = date.today()
+async def home(request):
+    # Async view: the card queries run on the async ORM under ASGI
+    # (SERVER_MODE=asgi); the template is rendered by Django in a thread
+    today = localdate()
+    totals = await counters.aget('patients', 'doctors')
     stats = {
-        'patients': Patient.objects.count(),
-        'doctors': Doctor.objects.count(),
-        'today_appointments': Appointment.objects.filter(date=today).count(),
+        'patients': totals['patients'],
+        'doctors': totals['doctors'],
+        'today_appointments': await rollups.aappointments_total(today, today),
     }
     try:
-        setting = Setting.objects.first()
+        from asgiref.sync import sync_to_async
+        from .clinic import get_setting
+        setting = await sync_to_async(get_setting)()
     except Exception:
         setting = None
-    latest = (Appointment.objects
-              .select_related('doctor', 'patient')
-              .order_by('-date', '-time')[:8])
-    return render(request, 'home.html', {
+    latest = [a async for a in (Appointment.objects
+                                .select_related('doctor', 'patient')
+                                .order_by('-date', '-time')[:8])]
+    return TemplateResponse(request, 'home.html', {
         'stats': stats,
         'setting': setting,
         'latest_appointments': latest,
@@ -195,7 +200,8 @@ def settings_view(request):
     if request.method == 'POST':
         form = SettingForm(request.POST, instance=setting)
         if form.is_valid():
-            form.save()
+            # Keep receipt_serial out of the UPDATE (allocated concurrently)
+            form.save(commit=False).save(update_fields=form.Meta.fields)
             messages.success(request, "Sozlamalar saqlandi")
             return redirect('/admin/dashboard/settings/')
     else:
@@ -368,7 +374,9 @@ def reset_doc_counter(request):
     setting, _ = Setting.objects.get_or_create(pk=1)
     if request.method == 'POST':
         setting.receipt_serial = 0
-        setting.save()
+        setting.save(update_fields=['receipt_serial'])
+        from payments.utils import receipt_number_allocator
+        receipt_number_allocator().reset(setting.pk)
         messages.success(request, 'Hujjat raqami 0 dan boshlashga qayta o‘rnatildi')
         return redirect('/admin/dashboard/settings/')
     # Safety fallback
@@ -378,509 +386,103 @@ def reset_doc_counter(request):
 @login_required
 @role_required(['creator'])
 def stats_view(request):
-    today = date.today()
-
-    # 30 kunlik qabul soni (har kun)
-    since_30 = today - timedelta(days=29)
-    agg30 = (
-        Appointment.objects.filter(date__gte=since_30)
-        .annotate(day=TruncDay('date'))
-        .values('day')
-        .annotate(total=Count('id'))
-    )
-    # On some DB backends TruncDay returns date, on others datetime
-    counts30 = {
-        (row['day'].date() if hasattr(row['day'], 'date') else row['day']): row['total']
-        for row in agg30
-    }
-    days30 = [since_30 + timedelta(days=i) for i in range(30)]
-    last30_labels = [d.strftime('%Y-%m-%d') for d in days30]
-    last30_data = [counts30.get(d, 0) for d in days30]
-
-    # Bo'limlar bo'yicha tashriflar (oxirgi 30 kun) — pie chart ma'lumotlari
-    by_department = (
-        Appointment.objects.filter(date__gte=since_30)
-        .values('doctor__department')
-        .annotate(total=Count('id'))
-        .order_by('-total')
-    )
-    dept_labels = [d['doctor__department'] or "Noma'lum" for d in by_department]
-    dept_data = [d['total'] for d in by_department]
-
-    # 1 hafta davomida noyob bemorlar soni (har kun)
-    since_7 = today - timedelta(days=6)
-    weekly = (
-        Appointment.objects.filter(date__gte=since_7)
-        .values('date')
-        .annotate(total=Count('patient', distinct=True))
-        .order_by('date')
-    )
-    w_counts = {row['date']: row['total'] for row in weekly}
-    week_days = [since_7 + timedelta(days=i) for i in range(7)]
-    week_labels = [d.strftime('%Y-%m-%d') for d in week_days]
-    week_data = [w_counts.get(d, 0) for d in week_days]
-
-    # Har bir shifokorning (oxirgi 30 kun) JAMI QABULLARI soni
-    per_doctor_week = (
-        Appointment.objects.filter(date__gte=since_30)
-        .values('doctor__id', 'doctor__full_name')
-        .annotate(total=Count('id'))
-        .order_by('doctor__full_name')
-    )
-
     # Admin 3 (Kassir) tasdiqlagan to'lovlar uchun sana oralig'i (default: oxirgi 30 kun)
-    pay_start_param = request.GET.get('pay_start')
-    pay_end_param = request.GET.get('pay_end')
-    try:
-        pay_start = date.fromisoformat(pay_start_param) if pay_start_param else since_30
-    except Exception:
-        pay_start = since_30
-    try:
-        pay_end = date.fromisoformat(pay_end_param) if pay_end_param else today
-    except Exception:
-        pay_end = today
-    if pay_end < pay_start:
-        pay_start, pay_end = pay_end, pay_start
-
-    admin3_qs = Payment.objects.select_related('appointment__patient', 'appointment__doctor', 'cashier') \
-        .filter(created_at__date__gte=pay_start, created_at__date__lte=pay_end, cashier__role=Roles.ADMIN3) \
-        .order_by('-created_at')
-
-    # Jami summa (filtr bo'yicha)
-    from django.db.models import Sum as _Sum
-    total_row = admin3_qs.aggregate(total=_Sum('amount'))
-    admin3_total = float(total_row.get('total') or 0)
+    pay_start, pay_end = charts.parse_range('admin3', request.GET.get('pay_start'), request.GET.get('pay_end'))
+    admin3_qs = reports.admin3_payments(pay_start, pay_end)
 
     # Export handlers (CSV/PDF)
     export = request.GET.get('export')
     # Klinik nomi slugini fayl nomi uchun tayyorlash
-    try:
-        clinic_name = Setting.objects.first().clinic_name or 'Klinika'
-    except Exception:
-        clinic_name = 'Klinika'
-    clinic_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', clinic_name).strip('_') or 'Klinika'
+    clinic_name, clinic_slug = reports.clinic_names()
 
     if export == 'csv':
-        from django.http import HttpResponse
-        import csv
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = (
-            f"attachment; filename={clinic_slug}_admin3_payments_{pay_start.isoformat()}_{pay_end.isoformat()}.csv"
+        from klinika_project.exports import iter_rows, streaming_csv_response
+
+        def admin3_rows():
+            total = 0
+            for p in iter_rows(admin3_qs):
+                total += p.amount or 0
+                yield [
+                    timezone.localtime(p.created_at).strftime('%Y-%m-%d %H:%M'),
+                    getattr(p.appointment.patient, 'full_name', ''),
+                    getattr(p.appointment.doctor, 'full_name', ''),
+                    f"{p.amount}",
+                    p.get_method_display(),
+                    getattr(p.cashier, 'username', ''),
+                    p.receipt_no,
+                ]
+            # Jami qator (oqim davomida yig'ilgan summa)
+            yield []
+            yield ['Jami', '', '', f"{float(total)}", '', '', '']
+
+        return streaming_csv_response(
+            replica.report_rows(admin3_rows),
+            f"{clinic_slug}_admin3_payments_{pay_start.isoformat()}_{pay_end.isoformat()}.csv",
+            header=['Sana', 'Bemor', 'Shifokor', 'Miqdor', 'Usul', 'Kassir', 'Kvitansiya'],
+            request=request,
         )
-        writer = csv.writer(response)
-        writer.writerow(['Sana', 'Bemor', 'Shifokor', 'Miqdor', 'Usul', 'Kassir', 'Kvitansiya'])
-        for p in admin3_qs:
-            writer.writerow([
-                p.created_at.strftime('%Y-%m-%d %H:%M'),
-                getattr(p.appointment.patient, 'full_name', ''),
-                getattr(p.appointment.doctor, 'full_name', ''),
-                f"{p.amount}",
-                p.get_method_display(),
-                getattr(p.cashier, 'username', ''),
-                p.receipt_no,
-            ])
-        # Jami qator
-        writer.writerow([])
-        writer.writerow(['Jami', '', '', f"{admin3_total}", '', '', ''])
-        return response
-    elif export == 'pdf':
-        from django.http import HttpResponse
-        from django.template.loader import render_to_string
-        export_ctx = {
-            'items': admin3_qs,
-            'pay_start': pay_start,
-            'pay_end': pay_end,
-            'clinic_name': clinic_name,
-            'total': admin3_total,
-        }
-        html = render_to_string('dashboard/admin3_payments_export.html', export_ctx)
-        try:
-            from weasyprint import HTML
-            pdf = HTML(string=html).write_pdf()
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = (
-                f"attachment; filename={clinic_slug}_admin3_payments_{pay_start.isoformat()}_{pay_end.isoformat()}.pdf"
-            )
-            return response
-        except Exception:
-            # Fallback: build a minimal PDF without external libs
-            def _esc(s: str) -> str:
-                return (s or '').replace('\\', r'\\').replace('(', r'\(').replace(')', r'\)')
-
-            def build_simple_pdf(title: str, subtitle: str, rows):
-                # Basic A4 page
-                width, height = 595, 842
-                margin = 36
-                lh = 14
-                max_lines = int((height - margin*2) / lh) - 2
-
-                pages = []
-                lines = []
-                lines.append(title)
-                lines.append(subtitle)
-                header = 'Sana | Bemor | Shifokor | Miqdor | Usul | Kassir | Kvitansiya'
-                lines.append(header)
-                lines.append('-' * min(len(header), 120))
-                for r in rows:
-                    line = ' | '.join([
-                        r.get('date',''), r.get('patient',''), r.get('doctor',''),
-                        r.get('amount',''), r.get('method',''), r.get('cashier',''), r.get('receipt','')
-                    ])
-                    lines.append(line)
-
-                # Paginate
-                for i in range(0, len(lines), max_lines):
-                    page_lines = lines[i:i+max_lines]
-                    y = height - margin
-                    text = []
-                    text.append('BT')
-                    text.append('/F1 10 Tf')
-                    text.append(f'{margin} {y} Td')
-                    text.append(f'{lh} TL')
-                    for idx, ln in enumerate(page_lines):
-                        if idx == 0:
-                            text.append('/F1 12 Tf')
-                        elif idx == 1:
-                            text.append('/F1 10 Tf')
-                        esc = _esc(ln)[:180]
-                        text.append(f'({esc}) Tj')
-                        text.append('T*')
-                    text.append('ET')
-                    stream = '\n'.join(text).encode('utf-8')
-                    pages.append(stream)
-
-                # Build PDF objects
-                objects = []
-                xref = []
-                def add_obj(data: bytes) -> int:
-                    offset = sum(len(o) for o in objects)
-                    xref.append(offset)
-                    objects.append(data)
-                    return len(xref)  # object number (1-based)
-
-                # Font
-                font_obj_num = add_obj(b"1 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n")
-                # Pages container (placeholder; we will fill kids later)
-                kids_refs = []
-                # Build page + content objects
-                page_nums = []
-                for stream in pages:
-                    contents_str = b"stream\n" + stream + b"\nendstream"
-                    cont_obj_num = add_obj((f"{0} 0 obj\n<< /Length {len(stream)} >>\n".encode('ascii') + contents_str + b"\nendobj\n"))
-                    page_dict = (
-                        f"{0} 0 obj\n<< /Type /Page /Parent {0} 0 R /MediaBox [0 0 595 842] ".encode('ascii') +
-                        f"/Resources << /Font << /F1 {font_obj_num} 0 R >> >> ".encode('ascii') +
-                        f"/Contents {cont_obj_num} 0 R >>\nendobj\n".encode('ascii')
-                    )
-                    page_num = add_obj(page_dict)
-                    kids_refs.append(f"{page_num} 0 R")
-                    page_nums.append(page_num)
-
-                # Now add Pages object
-                pages_obj_num = add_obj((
-                    f"{0} 0 obj\n<< /Type /Pages /Count {len(page_nums)} /Kids [".encode('ascii') +
-                    ' '.join(kids_refs).encode('ascii') + b"] >>\nendobj\n"
-                ))
-
-                # Patch parent refs in page dicts (not fully patching; rebuild pages with correct parent)
-                objects_fixed = []
-                xref = []
-                def add_obj2(s: bytes) -> int:
-                    offset = sum(len(o) for o in objects_fixed)
-                    xref.append(offset)
-                    objects_fixed.append(s)
-                    return len(xref)
-
-                font_obj_num = add_obj2(b"1 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>\nendobj\n")
-                page_nums = []
-                for stream in pages:
-                    cont_num = add_obj2((
-                        f"{0} 0 obj\n<< /Length {len(stream)} >>\n".encode('ascii') + b"stream\n" + stream + b"\nendstream\nendobj\n"
-                    ))
-                    page_num = add_obj2((
-                        f"{0} 0 obj\n<< /Type /Page /Parent {0} 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 {font_obj_num} 0 R >> >> /Contents {cont_num} 0 R >>\nendobj\n".encode('ascii')
-                    ))
-                    page_nums.append(page_num)
-                pages_obj_num = add_obj2((
-                    f"{0} 0 obj\n<< /Type /Pages /Count {len(page_nums)} /Kids [".encode('ascii') +
-                    ' '.join([f"{n} 0 R" for n in page_nums]).encode('ascii') + b"] >>\nendobj\n"
-                ))
-                catalog_num = add_obj2((
-                    f"{0} 0 obj\n<< /Type /Catalog /Pages {pages_obj_num} 0 R >>\nendobj\n".encode('ascii')
-                ))
-
-                # Assemble file
-                pdf = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
-                pdf.extend(objects_fixed)
-                xref_offset = sum(len(p) for p in pdf)
-                pdf.append(b"xref\n0 " + str(len(objects_fixed)+1).encode('ascii') + b"\n")
-                pdf.append(b"0000000000 65535 f \n")
-                pos = 0
-                for o in objects_fixed:
-                    pdf.append(str(pos).zfill(10).encode('ascii') + b" 00000 n \n")
-                    pos += len(o)
-                pdf.append(b"trailer\n<< /Size " + str(len(objects_fixed)+1).encode('ascii') + b" /Root " + str(catalog_num).encode('ascii') + b" 0 R >>\nstartxref\n" + str(xref_offset).encode('ascii') + b"\n%%EOF")
-                return b''.join(pdf)
-
-            # Build rows from queryset
-            rows = []
-            for p in admin3_qs:
-                rows.append({
-                    'date': p.created_at.strftime('%Y-%m-%d %H:%M'),
-                    'patient': getattr(p.appointment.patient, 'full_name', ''),
-                    'doctor': getattr(p.appointment.doctor, 'full_name', ''),
-                    'amount': f"{p.amount}",
-                    'method': p.get_method_display(),
-                    'cashier': getattr(p.cashier, 'username', ''),
-                    'receipt': p.receipt_no,
-                })
-            title = f"{clinic_name} — Admin 3 tasdiqlagan to'lovlar"
-            subtitle = f"{pay_start.isoformat()} — {pay_end.isoformat()}  |  Jami: {admin3_total}"
-            pdf_bytes = build_simple_pdf(title, subtitle, rows)
-            response = HttpResponse(pdf_bytes, content_type='application/pdf')
-            response['Content-Disposition'] = (
-                f"attachment; filename={clinic_slug}_admin3_payments_{pay_start.isoformat()}_{pay_end.isoformat()}.pdf"
-            )
-            return response
 
-    # Finance range: revenue (payments) vs expenses (approved requests)
-    try:
-        fin_start_param = request.GET.get('fin_start')
-        fin_end_param = request.GET.get('fin_end')
-    except Exception:
-        fin_start_param = fin_end_param = None
-    from datetime import timedelta as _td
-    today = date.today()
-    # Default to full history: earliest of payments/expenses -> today
-    if not fin_start_param:
-        try:
-            pmin = Payment.objects.aggregate(m=Min('created_at'))['m']
-        except Exception:
-            pmin = None
-        try:
-            emin = ExpenseRequest.objects.aggregate(m=Min('approved_at'))['m'] if ExpenseRequest else None
-        except Exception:
-            emin = None
-        first = None
-        for d in [pmin, emin]:
-            if d and (first is None or d.date() < first):
-                first = d.date()
-        fin_start = first or (today - _td(days=30))
-    else:
-        fin_start = date.fromisoformat(fin_start_param)
-    fin_end = date.fromisoformat(fin_end_param) if fin_end_param else today
-
-    # Aggregate daily
-    from collections import defaultdict
-    rev_daily = defaultdict(float)
-    for row in (Payment.objects
-                .filter(created_at__date__gte=fin_start, created_at__date__lte=fin_end)
-                .annotate(day=TruncDay('created_at'))
-                .values('day')
-                .annotate(total=Sum('amount'))
-                .order_by('day')):
-        rev_daily[row['day'].date()] = float(row['total'] or 0)
-
-    exp_daily = defaultdict(float)
-    if ExpenseRequest and ExpenseStatus:
-        for row in (ExpenseRequest.objects
-                    .filter(status=ExpenseStatus.APPROVED,
-                            approved_at__date__gte=fin_start,
-                            approved_at__date__lte=fin_end)
-                    .annotate(day=TruncDay('approved_at'))
-                    .values('day')
-                    .annotate(total=Sum('amount'))
-                    .order_by('day')):
-            exp_daily[row['day'].date()] = float(row['total'] or 0)
-
-    # Build cumulative series
-    labels = []
-    rev_series = []
-    exp_series = []
-    rows = []
-    r_sum = 0.0
-    e_sum = 0.0
-    d = fin_start
-    while d <= fin_end:
-        labels.append(d.strftime('%Y-%m-%d'))
-        day_rev = round(rev_daily.get(d, 0.0), 2)
-        day_exp = round(exp_daily.get(d, 0.0), 2)
-        day_profit = round(day_rev - day_exp, 2)
-        r_sum = round(r_sum + day_rev, 2)
-        e_sum = round(e_sum + day_exp, 2)
-        rev_series.append(r_sum)
-        exp_series.append(e_sum)
-        rows.append({
-            'date': d.strftime('%Y-%m-%d'),
-            'rev': day_rev,
-            'exp': day_exp,
-            'profit': day_profit,
-            'rev_cum': r_sum,
-            'exp_cum': e_sum,
-            'profit_cum': round(r_sum - e_sum, 2),
+    if export == 'pdf':
+        return export_job_response(request, 'admin3_payments', {
+            'pay_start': pay_start.isoformat(), 'pay_end': pay_end.isoformat(),
         })
-        d += _td(days=1)
-
-    finance = {
-        'labels': labels,
-        'revenue': rev_series,
-        'expenses': exp_series,
-        'revenue_total': round(r_sum, 2),
-        'expenses_total': round(e_sum, 2),
-        'profit_total': round(r_sum - e_sum, 2),
-        'fin_start': fin_start.isoformat(),
-        'fin_end': fin_end.isoformat(),
-    }
+
+    # Finance range: revenue (payments) vs expenses (approved requests);
+    # default to full history: earliest ledger day -> today
+    fin_start, fin_end = charts.parse_range('finance', request.GET.get('fin_start'), request.GET.get('fin_end'))
 
     # Finance exports (CSV / PDF)
     fin_export = request.GET.get('fin_export')
     if fin_export == 'csv':
-        import csv
-        from io import StringIO
-        sio = StringIO()
-        writer = csv.writer(sio)
-        writer.writerow(['Sana', 'Tushum', 'Xarajat', 'Foyda', 'Tushum (kumul.)', 'Xarajat (kumul.)', 'Foyda (kumul.)'])
-        for r in rows:
-            writer.writerow([r['date'], r['rev'], r['exp'], r['profit'], r['rev_cum'], r['exp_cum'], r['profit_cum']])
-        from django.http import HttpResponse
-        resp = HttpResponse(sio.getvalue(), content_type='text/csv; charset=utf-8')
-        resp['Content-Disposition'] = f"attachment; filename=finance_{finance['fin_start']}_{finance['fin_end']}.csv"
-        return resp
+        from klinika_project.exports import streaming_csv_response
+        with replica.report():
+            finance = charts.get('finance', fin_start, fin_end)
+        return streaming_csv_response(
+            ([r['date'], r['rev'], r['exp'], r['profit'], r['rev_cum'], r['exp_cum'], r['profit_cum']]
+             for r in finance['rows']),
+            f"finance_{finance['fin_start']}_{finance['fin_end']}.csv",
+            header=['Sana', 'Tushum', 'Xarajat', 'Foyda', 'Tushum (kumul.)', 'Xarajat (kumul.)', 'Foyda (kumul.)'],
+            request=request,
+        )
     if fin_export == 'pdf':
-        # Try WeasyPrint first; if not available, generate a minimal PDF bytes fallback
-        try:
-            from weasyprint import HTML
-            # Simple HTML rendering via WeasyPrint
-            table_rows = ''.join([
-                f"<tr><td>{r['date']}</td><td style='text-align:right'>{r['rev']}</td><td style='text-align:right'>{r['exp']}</td><td style='text-align:right'>{r['profit']}</td>"
-                f"<td style='text-align:right'>{r['rev_cum']}</td><td style='text-align:right'>{r['exp_cum']}</td><td style='text-align:right'>{r['profit_cum']}</td></tr>"
-                for r in rows
-            ])
-            html = f"""
-            <html><head><meta charset='utf-8'><style>
-            body{{ font-family: DejaVu Sans, Arial, sans-serif; font-size:12px; }}
-            h3{{ margin:0 0 8px 0; }} table{{ width:100%; border-collapse:collapse; }}
-            th,td{{ border:1px solid #000; padding:4px; }} th{{ background:#f2f2f2; }}
-            </style></head><body>
-            <h3>Tushum va xarajatlar: {finance['fin_start']} — {finance['fin_end']}</h3>
-            <table>
-              <thead><tr>
-                <th>Sana</th><th>Tushum</th><th>Xarajat</th><th>Foyda</th>
-                <th>Tushum (kumul.)</th><th>Xarajat (kumul.)</th><th>Foyda (kumul.)</th>
-              </tr></thead>
-              <tbody>{table_rows}</tbody>
-            </table>
-            <p><strong>Jami tushum:</strong> {finance['revenue_total']} &nbsp; 
-               <strong>Jami xarajat:</strong> {finance['expenses_total']} &nbsp; 
-               <strong>Foyda:</strong> {finance['profit_total']}</strong></p>
-            </body></html>
-            """
-            pdf = HTML(string=html).write_pdf()
-            from django.http import HttpResponse
-            response = HttpResponse(pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f"attachment; filename=finance_{finance['fin_start']}_{finance['fin_end']}.pdf"
-            return response
-        except Exception:
-            pass
-
-        # Minimal PDF fallback (no external dependencies)
-        def _esc(s: str) -> str:
-            # Escape for PDF string syntax and force ASCII-friendly characters
-            s = (s or '').replace('\u2014', '-').replace('\u2013', '-')  # dashes
-            s = s.replace('—', '-').replace('–', '-')
-            return s.replace('\\', r'\\\\').replace('(', r'\\(').replace(')', r'\\)')
-
-        # Build fixed-width table in plain text
-        def fmt_row(d):
-            return f"{d['date']:<12} {d['rev']:>12} {d['exp']:>12} {d['profit']:>12} {d['rev_cum']:>14} {d['exp_cum']:>14} {d['profit_cum']:>14}"
-
-        lines = [
-            f"Tushum va xarajatlar: {finance['fin_start']} - {finance['fin_end']}",
-            "",
-            "Sana         Tushum       Xarajat       Foyda       Tushum(k)     Xarajat(k)      Foyda(k)",
-            "---------------------------------------------------------------------------------------------",
-        ]
-        lines += [fmt_row(r) for r in rows[:800]]  # cap
-        lines += [
-            "",
-            f"Jami tushum: {finance['revenue_total']}    Jami xarajat: {finance['expenses_total']}    Foyda: {finance['profit_total']}",
-        ]
-
-        # Create a simple one-page PDF with Helvetica
-        width, height = 595, 842  # A4 portrait
-        y = height - 60
-        leading = 14
-        # Use monospaced font for neat columns
-        content_lines = ["BT /F1 11 Tf {} TL 40 {} Td".format(leading, y)]
-        for i, text in enumerate(lines):
-            content_lines.append(f"({_esc(text)}) Tj")
-            content_lines.append("T*")
-        content_lines.append("ET")
-        content = "\n".join(content_lines).encode('latin-1', 'replace')
-
-        objects = []
-        def obj(data):
-            objects.append(data)
-            return len(objects)
-
-        # 1. Font
-        font_obj = obj(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier >>")
-        # 2. Contents
-        stream = b"<< /Length " + str(len(content)).encode('ascii') + b" >>\nstream\n" + content + b"\nendstream"
-        contents_obj = obj(stream)
-        # 3. Page
-        page_obj = obj(b"<< /Type /Page /Parent 0 0 R /MediaBox [0 0 595 842] /Contents " + str(contents_obj).encode('ascii') + b" 0 R /Resources << /Font << /F1 " + str(font_obj).encode('ascii') + b" 0 R >> >> >>")
-        # 4. Pages
-        pages_obj = obj(b"<< /Type /Pages /Kids [ " + str(page_obj).encode('ascii') + b" 0 R ] /Count 1 >>")
-        # 5. Catalog
-        catalog_obj = obj(b"<< /Type /Catalog /Pages " + str(pages_obj).encode('ascii') + b" 0 R >>")
-
-        # Assemble PDF
-        xref = [b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"]
-        offsets = [0]
-        for i, o in enumerate(objects, 1):
-            offsets.append(sum(len(p) for p in xref))
-            xref.append(f"{i} 0 obj\n".encode('ascii'))
-            xref.append(o + b"\nendobj\n")
-        xref_pos = sum(len(p) for p in xref)
-        xref.append(b"xref\n0 " + str(len(objects)+1).encode('ascii') + b"\n")
-        xref.append(b"0000000000 65535 f \n")
-        pos = 0
-        for i in range(1, len(objects)+1):
-            # simple incremental; we already captured offsets above, but compute now
-            xref.append(str(offsets[i]).zfill(10).encode('ascii') + b" 00000 n \n")
-        xref.append(b"trailer\n<< /Size " + str(len(objects)+1).encode('ascii') + b" /Root " + str(catalog_obj).encode('ascii') + b" 0 R >>\nstartxref\n" + str(xref_pos).encode('ascii') + b"\n%%EOF")
-        pdf_bytes = b"".join(xref)
-        from django.http import HttpResponse
-        response = HttpResponse(pdf_bytes, content_type='application/pdf')
-        response['Content-Disposition'] = f"attachment; filename=finance_{finance['fin_start']}_{finance['fin_end']}.pdf"
-        return response
+        return export_job_response(request, 'finance', {
+            'fin_start': fin_start.isoformat(), 'fin_end': fin_end.isoformat(),
+        })
 
+    # Jadvallar sahifa bilan chiziladi; grafiklar ma'lumoti alohida JSON
+    # so'rovlar bilan parallel yuklanadi (stats_chart). Hammasi keshlangan.
+    with replica.report():
+        finance = charts.get('finance', fin_start, fin_end)
+        admin3 = charts.get('admin3', pay_start, pay_end)
     ctx = {
-        'last30_labels': json.dumps(last30_labels),
-        'last30_data': json.dumps(last30_data),
-        'dept_labels': json.dumps(dept_labels),
-        'dept_data': json.dumps(dept_data),
-        'week_labels': json.dumps(week_labels),
-        'week_data': json.dumps(week_data),
-        'per_doctor_week': list(per_doctor_week),
-        'admin3_payments': admin3_qs,
+        'admin3_payments': admin3['rows'],
+        'admin3_total': admin3['total'],
         'pay_start': pay_start.isoformat(),
         'pay_end': pay_end.isoformat(),
-        'admin3_total': admin3_total,
-        'finance_labels': json.dumps(finance['labels']),
-        'finance_rev': json.dumps(finance['revenue']),
-        'finance_exp': json.dumps(finance['expenses']),
         'finance_rev_total': finance['revenue_total'],
         'finance_exp_total': finance['expenses_total'],
         'finance_profit_total': finance['profit_total'],
         'fin_start': finance['fin_start'],
         'fin_end': finance['fin_end'],
-        'finance_rows': rows,
+        'finance_rows': finance['rows'],
     }
     return render(request, 'dashboard/stats.html', ctx)
 
 
+@login_required
+@role_required(['creator'])
+def stats_chart(request, name):
+    """One chart of the statistics page as JSON (``?start=&end=``, ISO dates)."""
+    from django.http import Http404, JsonResponse
+    if name not in charts.CHARTS:
+        raise Http404
+    with replica.report():
+        data = charts.get(name, *charts.parse_range(name, request.GET.get('start'), request.GET.get('end')))
+    response = JsonResponse(data, encoder=DjangoJSONEncoder)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 # Additional role assignment helpers for Creator
 @login_required
 @role_required(['creator'])
@@ -958,3 +560,151 @@ def remove_admin(request, pk):
 
 
 
+
+
+# --- Background exports (PDF) ---
+
+def _wants_json(request):
+    return (request.headers.get('x-requested-with') == 'XMLHttpRequest'
+            or 'application/json' in request.headers.get('accept', '')
+            or request.GET.get('format') == 'json')
+
+
+def _job_payload(job):
+    from django.urls import reverse
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'status_url': reverse('export_job', args=[job.pk]),
+        'download_url': reverse('export_job_download', args=[job.pk]) if job.status == ExportJob.Status.DONE else None,
+        'filename': job.filename,
+        'error': job.error,
+        'queue_ms': job.queue_ms,
+        'render_ms': job.render_ms,
+        'size': job.size,
+    }
+
+
+def export_job_response(request, kind, params):
+    """Queue a report export and answer with the job (JSON) or its status page."""
+    job = jobs.enqueue(kind, params, request.user)
+    if _wants_json(request):
+        from django.http import JsonResponse
+        return JsonResponse(_job_payload(job), status=202)
+    return redirect('export_job', pk=job.pk)
+
+
+def _get_job_for(request, pk):
+    from django.shortcuts import get_object_or_404
+    job = get_object_or_404(ExportJob, pk=pk)
+    user = request.user
+    if job.requested_by_id != user.pk and not (user.is_superuser or user.role == Roles.CREATOR):
+        from django.http import Http404
+        raise Http404
+    return job
+
+
+@login_required
+def export_job(request, pk):
+    job = _get_job_for(request, pk)
+    if _wants_json(request):
+        from django.http import JsonResponse
+        return JsonResponse(_job_payload(job))
+    return render(request, 'dashboard/export_job.html', {'job': job, 'job_json': _job_payload(job)})
+
+
+@login_required
+def export_job_download(request, pk):
+    job = _get_job_for(request, pk)
+    if job.status != ExportJob.Status.DONE or not job.file:
+        return redirect('export_job', pk=job.pk)
+    from django.http import FileResponse
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=job.filename,
+                        content_type=job.content_type or None)
+
+
+@login_required
+@role_required(['creator'])
+def request_metrics(request):
+    from django.conf import settings
+    from klinika_project import metrics
+    if request.method == 'POST':
+        metrics.reset()
+        messages.success(request, "So'rov statistikasi tozalandi")
+        return redirect('request_metrics')
+    return render(request, 'dashboard/request_metrics.html', {
+        'rows': metrics.summary(),
+        'pools': metrics.pool_stats(),
+        'buffer': getattr(settings, 'REQUEST_METRICS_BUFFER', 500),
+        'slow_ms': getattr(settings, 'REQUEST_SLOW_MS', 500),
+    })
+
+
+def _import_payload(job):
+    return {
+        'id': job.pk,
+        'status': job.status,
+        'rows_done': job.rows_done,
+        'rows_failed': job.rows_failed,
+        'patients_created': job.patients_created,
+        'patients_matched': job.patients_matched,
+        'appointments_created': job.appointments_created,
+        'rows_per_second': round(job.rows_per_second),
+        'error': job.error,
+    }
+
+
+@login_required
+@role_required(['creator'])
+def import_data(request):
+    """Upload a CSV/XLSX file of patients/appointments; it is imported in the background."""
+    from . import importer
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            digest = importer.checksum(upload)
+            same = ImportJob.objects.filter(checksum=digest)
+            pending = same.exclude(status=ImportJob.Status.DONE).order_by('-pk').first()
+            if same.filter(status=ImportJob.Status.DONE).exists():
+                form.add_error('file', "Bu fayl avval to'liq yuklangan")
+            elif pending is not None:
+                # Same file again: continue that job instead of importing it twice
+                messages.info(request, "Bu fayl avval yuklana boshlagan, o'sha yuklash ochildi")
+                return redirect('import_job', pk=pending.pk)
+            else:
+                job = ImportJob(source_name=upload.name[:255], checksum=digest, requested_by=request.user)
+                job.file.save(upload.name, upload, save=False)
+                job.save()
+                transaction.on_commit(lambda: importer.start_thread(job.pk))
+                return redirect('import_job', pk=job.pk)
+    else:
+        form = ImportForm()
+    from django.conf import settings
+    return render(request, 'dashboard/import.html', {
+        'form': form,
+        'jobs': ImportJob.objects.select_related('requested_by')[:20],
+        'batch_size': getattr(settings, 'IMPORT_BATCH_SIZE', 1000),
+    })
+
+
+@login_required
+@role_required(['creator'])
+def import_job(request, pk):
+    """Progress of an import; POST resumes a failed or interrupted one."""
+    from django.shortcuts import get_object_or_404
+    from . import importer
+    job = get_object_or_404(ImportJob, pk=pk)
+    resumable = importer.resumable(job)
+    if request.method == 'POST':
+        if resumable:
+            importer.start_thread(job.pk)
+            messages.info(request, f"Yuklash {job.rows_done}-qatordan davom ettirilmoqda")
+        return redirect('import_job', pk=job.pk)
+    if _wants_json(request):
+        from django.http import JsonResponse
+        return JsonResponse(_import_payload(job))
+    return render(request, 'dashboard/import_job.html', {
+        'job': job, 'job_json': _import_payload(job), 'resumable': resumable,
+    })
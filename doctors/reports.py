@@ -0,0 +1,58 @@
+"""Export job renderer for a doctor's appointment list (see dashboard/jobs.py)."""
+import re
+from datetime import date
+
+from django.template.loader import render_to_string
+
+from appointments.models import Appointment
+from dashboard.reports import clinic_names, fallback_pdf, render_pdf
+from klinika_project.exports import iter_rows
+from payments.receipts import weasyprint_available
+
+from .models import Doctor
+
+
+def doctor_appointments_queryset(doc, q='', start='', end=''):
+    qs = Appointment.objects.select_related('patient').filter(doctor=doc)
+    if start:
+        qs = qs.filter(date__gte=date.fromisoformat(start))
+    if end:
+        qs = qs.filter(date__lte=date.fromisoformat(end))
+    if q:
+        qs = qs.filter(patient__full_name__icontains=q)
+    return qs.order_by('-date', '-time')
+
+
+def doctor_appointments_pdf(params):
+    doc = Doctor.objects.get(pk=params['doctor'])
+    start, end, q = params.get('start', ''), params.get('end', ''), params.get('q', '')
+    clinic_name, clinic_slug = clinic_names()
+    doc_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', doc.full_name).strip('_') or 'Doctor'
+    qs = doctor_appointments_queryset(doc, q, start, end)
+    filename = f"{clinic_slug}_{doc_slug}_appointments_{start or 'all'}_{end or 'all'}.pdf"
+    if weasyprint_available():
+        html = render_to_string('doctors/doctor_appointments_export.html', {
+            'clinic_name': clinic_name,
+            'doctor': doc,
+            'items': qs,
+            'start': start,
+            'end': end,
+        })
+        return render_pdf(html), filename, 'application/pdf'
+
+    def write(pdf):
+        pdf.text(f"{clinic_name} — {doc.full_name} qabullari ({start or '...'} — {end or '...'})", size=12)
+        pdf.gap()
+        pdf.table_header(['Sana', 'Vaqt', 'Bemor', 'Narx', 'Holat', 'Kod'],
+                         widths=[70, 45, 200, 70, 78, 60], align='lllrll')
+        for a in iter_rows(qs):
+            pdf.row([
+                a.date.isoformat(),
+                a.time.strftime('%H:%M'),
+                a.patient.full_name,
+                f"{a.service_price or ''}",
+                a.get_status_display(),
+                f"{doc.code_prefix}{(a.doc_no or 0):03d}",
+            ])
+
+    return fallback_pdf(write), filename, 'application/pdf'
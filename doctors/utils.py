@@ -27,3 +27,23 @@ def next_code_prefix(used_prefixes=None):
                 return cand
         n += 1
 
+
+
+_doc_numbers = None
+
+
+def doc_number_allocator():
+    """Process-wide allocator for ``Doctor.receipt_serial`` (Appointment.doc_no)."""
+    global _doc_numbers
+    if _doc_numbers is None:
+        from django.conf import settings
+        from klinika_project.sequences import SequenceAllocator
+        from .models import Doctor
+        _doc_numbers = SequenceAllocator(Doctor, 'receipt_serial',
+                                         block=getattr(settings, 'SEQUENCE_BLOCK_SIZE', 1))
+    return _doc_numbers
+
+
+def next_doc_no(doctor_id):
+    """Return the next document number for the given doctor."""
+    return doc_number_allocator().next(doctor_id)
@@ -62,7 +62,9 @@ def doctor_update(request, pk):
     if request.method == 'POST':
         form = DoctorForm(request.POST, instance=doctor)
         if form.is_valid():
-            form.save()
+            # Save only the edited fields so a stale receipt_serial never
+            # overwrites numbers allocated meanwhile
+            form.save(commit=False).save(update_fields=form.Meta.fields)
             messages.success(request, 'Shifokor ma\'lumotlari yangilandi')
             return redirect('doctors:list')
     else:
@@ -95,6 +97,8 @@ def doctor_reset_counter(request, pk):
     if request.method == 'POST':
         doc.receipt_serial = 0
         doc.save(update_fields=['receipt_serial'])
+        from .utils import doc_number_allocator
+        doc_number_allocator().reset(doc.pk)
         messages.success(request, "Kvitansiya sanog'i 0 dan boshlandi")
     # Redirect back to edit page if available, else list
     try:
@@ -111,7 +115,7 @@ def doctor_appointments(request, pk):
     start = request.GET.get('start', '')
     end = request.GET.get('end', '')
 
-    qs = Appointment.objects.select_related('patient', 'complaint').filter(doctor=doc)
+    qs = Appointment.objects.select_related('patient').filter(doctor=doc)
     # Date filters (optional)
     from datetime import date
     try:
@@ -126,10 +130,9 @@ def doctor_appointments(request, pk):
             qs = qs.filter(date__lte=e)
     except Exception:
         end = ''
-    # Search by patient or complaint
+    # Search by patient (complaints were removed from appointments)
     if q:
-        from django.db.models import Q
-        qs = qs.filter(Q(patient__full_name__icontains=q) | Q(complaint__name__icontains=q))
+        qs = qs.filter(patient__full_name__icontains=q)
 
     export = request.GET.get('export')
     qs = qs.order_by('-date', '-time')
@@ -137,68 +140,49 @@ def doctor_appointments(request, pk):
     # Exports (CSV/PDF)
     if export in ('csv', 'pdf'):
         # Clinic name for filename
-        from dashboard.models import Setting
+        from dashboard.reports import clinic_names
         import re
-        try:
-            clinic_name = (Setting.objects.first().clinic_name or 'Klinika')
-        except Exception:
-            clinic_name = 'Klinika'
-        clinic_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', clinic_name).strip('_') or 'Klinika'
+        clinic_name, clinic_slug = clinic_names()
         doc_slug = re.sub(r'[^A-Za-z0-9_-]+', '_', doc.full_name).strip('_') or 'Doctor'
 
         if export == 'csv':
-            from django.http import HttpResponse
-            import csv
-            response = HttpResponse(content_type='text/csv; charset=utf-8')
-            response['Content-Disposition'] = (
-                f"attachment; filename={clinic_slug}_{doc_slug}_appointments_{start or 'all'}_{end or 'all'}.csv"
+            from klinika_project.exports import iter_rows, streaming_csv_response
+            from klinika_project.replica import report_rows
+
+            def rows():
+                for a in iter_rows(qs):
+                    yield [
+                        a.date.isoformat(),
+                        a.time.strftime('%H:%M'),
+                        a.patient.full_name,
+                        '',
+                        f"{a.service_price or ''}",
+                        a.get_status_display(),
+                        f"{doc.code_prefix}{(a.doc_no or 0):03d}",
+                    ]
+
+            return streaming_csv_response(
+                report_rows(rows),
+                f"{clinic_slug}_{doc_slug}_appointments_{start or 'all'}_{end or 'all'}.csv",
+                header=['Sana', 'Vaqt', 'Bemor', 'Shikoyat', 'Narx', 'Holat', 'Kod'],
+                request=request,
             )
-            writer = csv.writer(response)
-            writer.writerow(['Sana', 'Vaqt', 'Bemor', 'Shikoyat', 'Narx', 'Holat', 'Kod'])
-            for a in qs.iterator():
-                code = f"{doc.code_prefix}{(a.doc_no or 0):03d}"
-                writer.writerow([
-                    a.date.isoformat(),
-                    a.time.strftime('%H:%M'),
-                    a.patient.full_name,
-                    getattr(a.complaint, 'name', ''),
-                    f"{a.service_price or ''}",
-                    a.get_status_display(),
-                    code,
-                ])
-            return response
         else:
-            from django.http import HttpResponse
-            from django.template.loader import render_to_string
-            context = {
-                'clinic_name': clinic_name,
-                'doctor': doc,
-                'items': qs,
-                'start': start,
-                'end': end,
-            }
-            html = render_to_string('doctors/doctor_appointments_export.html', context)
-            try:
-                from weasyprint import HTML
-                pdf = HTML(string=html).write_pdf()
-                response = HttpResponse(pdf, content_type='application/pdf')
-                response['Content-Disposition'] = (
-                    f"attachment; filename={clinic_slug}_{doc_slug}_appointments_{start or 'all'}_{end or 'all'}.pdf"
-                )
-                return response
-            except Exception:
-                # Fallback: deliver HTML as download if PDF backend unavailable
-                resp = HttpResponse(html, content_type='text/html; charset=utf-8')
-                resp['Content-Disposition'] = (
-                    f"attachment; filename={clinic_slug}_{doc_slug}_appointments_{start or 'all'}_{end or 'all'}.html"
-                )
-                return resp
-
-    # Non-export HTML view (limit rows for speed)
-    items = qs[:300]
+            # PDF is rendered in the background; the job page polls until it is ready
+            from dashboard.views import export_job_response
+            return export_job_response(request, 'doctor_appointments', {
+                'doctor': doc.pk, 'q': q, 'start': start, 'end': end,
+            })
+
+    # Non-export HTML view, one page at a time
+    from klinika_project.pagination import keyset_page
+    from django.db.models import F
+    # Payment state in the same query (the cashier link is decided per row)
+    page = keyset_page(request, qs.annotate(payment_pk=F('payment__id')), ('-date', '-time', '-id'), per_page=300)
     return render(request, 'doctors/doctor_appointments.html', {
         'doctor': doc,
-        'items': items,
+        'items': page,
+        'page': page,
         'q': q,
         'start': start,
         'end': end,
@@ -0,0 +1,22 @@
+# Gunicorn sozlamalari (Procfile, scripts/start.sh va render.yaml shu faylni ishlatadi)
+#
+# SERVER_MODE=wsgi (default): klinika_project.wsgi, gthread ishchilar
+#   (har ishchida GUNICORN_THREADS ta oqim; SSE navbat oqimlari oqim band qiladi).
+# SERVER_MODE=asgi: klinika_project.asgi, uvicorn ishchilar (uvicorn-worker).
+#   Async ko'rinishlar (bosh sahifa, navbatlar, bemor qidiruvi, SSE) ishchini
+#   band qilmasdan kutadi. Taqqoslash: python manage.py bench_concurrency.
+import os
+
+mode = os.getenv('SERVER_MODE', 'wsgi').strip().lower()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '3'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+if mode == 'asgi':
+    wsgi_app = 'klinika_project.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'klinika_project.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '8'))
@@ -1,7 +1,10 @@
+"""ASGI entry point (SERVER_MODE=asgi, served by uvicorn workers; see gunicorn.conf.py).
+
+Local run: uvicorn klinika_project.asgi:application --port 8000
+"""
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'klinika_project.settings')
 
 application = get_asgi_application()
-
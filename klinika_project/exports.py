@@ -0,0 +1,94 @@
+"""Streaming file exports shared by the report views.
+
+Rows are produced lazily (querysets via ``.iterator()``, which uses a
+server-side cursor on PostgreSQL) and encoded one at a time into a
+``StreamingHttpResponse``, so memory stays flat and the first bytes reach the
+browser before the whole report has been read from the database.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Iterate a queryset in chunks without caching the result."""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def csv_lines(rows, header=None):
+    writer = csv.writer(_Echo())
+    if header:
+        yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _buffered(lines, size=64 * 1024):
+    """Group small CSV lines into ~64 KB chunks to cut per-chunk overhead.
+
+    The first line (the header) is sent on its own so the download starts
+    before the first database chunk has been fetched.
+    """
+    lines = iter(lines)
+    for line in lines:
+        yield line
+        break
+    buf, length = [], 0
+    for line in lines:
+        buf.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buf)
+            buf, length = [], 0
+    if buf:
+        yield ''.join(buf)
+
+
+async def _achunks(chunks):
+    """Serve a sync iterator to ASGI one chunk at a time.
+
+    Django reads a sync iterator to the end before sending anything under
+    ASGI. Each ``next()`` runs in the request's sync thread
+    (``thread_sensitive``), the same one for every chunk, so the database
+    connection and the report transaction (``replica.report_rows``) stay
+    on one thread.
+    """
+    from asgiref.sync import sync_to_async
+
+    done = object()
+    step = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await step(chunks, done)
+            if chunk is done:
+                break
+            yield chunk
+    finally:
+        # Client went away: end the generator (and its transaction) in its thread
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_csv_response(rows, filename, header=None, request=None):
+    """Return a CSV download that is written while ``rows`` is consumed.
+
+    Pass ``request`` so the rows are streamed as they are read under ASGI too.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+
+    chunks = _buffered(csv_lines(rows, header))
+    if isinstance(request, ASGIRequest):
+        chunks = _achunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f"attachment; filename={filename}"
+    return response
@@ -0,0 +1,255 @@
+"""Per-request instrumentation: query count, DB time, render time, size.
+
+``RequestMetricsMiddleware`` measures every request and
+
+* adds a ``Server-Timing`` header (``db``, ``render``, ``total``) that shows
+  up in the browser dev tools, in DEBUG or for staff and creators only;
+* logs one JSON line to the ``klinika.requests`` logger (WARNING when the
+  request took longer than ``REQUEST_SLOW_MS``);
+* keeps the last ``REQUEST_METRICS_BUFFER`` samples per URL name in an
+  in-memory ring buffer, summarised by ``summary()`` for the creator-only
+  metrics page. The buffers are per worker process and reset on restart.
+
+Queries are counted by an execute wrapper installed on every database
+connection as it is opened (connections are per thread, and under ASGI the
+async ORM runs queries in worker threads). The middleware works in both
+sync and async chains. Render time is the time spent in Django template ``render()``
+calls made by the view. For streaming responses only the time until the
+first byte is measured and the size is not known.
+
+``pool_stats()`` reports the psycopg connection pool of every database
+alias that uses one (``DB_POOL=psycopg``) on the same page.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger('klinika.requests')
+
+_current = ContextVar('request_metrics', default=None)
+_lock = threading.Lock()
+_buffers = {}
+
+
+class _Sample:
+    __slots__ = ('queries', 'db', 'render')
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.render = 0.0
+
+
+def _count_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.db += time.perf_counter() - t0
+        sample.queries += 1
+
+
+def _instrument(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+_render_patched = False
+
+
+def _patch_template_render():
+    """Time top-level template renders (what render()/render_to_string() call)."""
+    global _render_patched
+    if _render_patched:
+        return
+    from django.template.backends.django import Template
+
+    original = Template.render
+
+    def render(self, context=None, request=None):
+        sample = _current.get()
+        if sample is None:
+            return original(self, context, request)
+        t0 = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            sample.render += time.perf_counter() - t0
+
+    Template.render = render
+    _render_patched = True
+
+
+def record(route, total, sample, size):
+    with _lock:
+        buf = _buffers.get(route)
+        if buf is None:
+            buf = _buffers[route] = deque(maxlen=getattr(settings, 'REQUEST_METRICS_BUFFER', 500))
+        buf.append((total, sample.db, sample.render, sample.queries, size))
+
+
+def _pct(sorted_values, p):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def summary():
+    """Per-route percentiles (ms) and averages, slowest p95 first."""
+    with _lock:
+        snapshot = {route: list(buf) for route, buf in _buffers.items()}
+    rows = []
+    for route, samples in snapshot.items():
+        totals = sorted(s[0] for s in samples)
+        dbs = sorted(s[1] for s in samples)
+        queries = [s[3] for s in samples]
+        sizes = [s[4] for s in samples if s[4] is not None]
+        n = len(samples)
+        rows.append({
+            'route': route,
+            'count': n,
+            'p50': _pct(totals, 0.50) * 1000,
+            'p95': _pct(totals, 0.95) * 1000,
+            'p99': _pct(totals, 0.99) * 1000,
+            'db_p95': _pct(dbs, 0.95) * 1000,
+            'render_avg': sum(s[2] for s in samples) / n * 1000,
+            'queries_avg': sum(queries) / n,
+            'queries_max': max(queries),
+            'size_avg': sum(sizes) / len(sizes) if sizes else None,
+        })
+    rows.sort(key=lambda r: r['p95'], reverse=True)
+    return rows
+
+
+# psycopg_pool.ConnectionPool.get_stats() keys shown on the metrics page;
+# counters that never moved are missing from get_stats() and shown as 0
+POOL_STATS = (
+    'pool_min', 'pool_max', 'pool_size', 'pool_available', 'requests_waiting',
+    'requests_num', 'requests_queued', 'requests_wait_ms', 'requests_errors',
+    'connections_num', 'connections_errors', 'connections_lost', 'returns_bad',
+)
+
+
+def pool_stats():
+    """``{alias: stats}`` for the database connections that use a pool.
+
+    Counters are per worker process, since it started.
+    """
+    result = {}
+    for alias in connections:
+        try:
+            pool = getattr(connections[alias], 'pool', None)
+            if pool is None:
+                continue
+            stats = pool.get_stats()
+        except Exception:
+            logger.exception('pool stats failed for %s', alias)
+            continue
+        result[alias] = {key: stats.get(key, 0) for key in POOL_STATS}
+    return result
+
+
+def reset():
+    with _lock:
+        _buffers.clear()
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'REQUEST_SLOW_MS', 500)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        _patch_template_render()
+        connection_created.connect(_instrument, dispatch_uid='klinika_request_metrics')
+        for alias in connections:
+            _instrument(connections[alias])
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample = _Sample()
+        token = _current.set(sample)
+        t0 = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, sample, time.perf_counter() - t0)
+        return response
+
+    async def __acall__(self, request):
+        sample = _Sample()
+        token = _current.set(sample)
+        t0 = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, sample, time.perf_counter() - t0)
+        return response
+
+    def _finish(self, request, response, sample, total):
+        try:
+            self.finish(request, response, sample, total)
+        except Exception:
+            # Instrumentation must never break a response
+            logger.exception('request metrics failed')
+
+    def shows_timing(self, request):
+        """Server-Timing only in DEBUG or for staff and creators: timings
+        would tell anyone else which pages are expensive to request."""
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        if self.is_async and isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            # No user lookup on the event loop: only one the view already loaded
+            user = getattr(request, '_acached_user', None)
+        if user is None or not user.is_authenticated:
+            return False
+        return user.is_staff or getattr(user, 'role', None) == 'creator'
+
+    def finish(self, request, response, sample, total):
+        match = getattr(request, 'resolver_match', None)
+        route = (match.view_name or match._func_path) if match else '<unresolved>'
+        size = None if response.streaming else len(response.content)
+        if self.shows_timing(request):
+            response['Server-Timing'] = (
+                f'db;dur={sample.db * 1000:.1f};desc="{sample.queries} queries", '
+                f'render;dur={sample.render * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        record(route, total, sample, size)
+        total_ms = total * 1000
+        level = logging.WARNING if total_ms >= self.slow_ms else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'route': route,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(sample.db * 1000, 1),
+                'queries': sample.queries,
+                'render_ms': round(sample.render * 1000, 1),
+                'bytes': size,
+            }))
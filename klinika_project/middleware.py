@@ -1,31 +1,37 @@
-from datetime import timedelta
-from django.utils import timezone
+"""WhiteNoise static file serving usable in an async middleware chain.
 
+``WhiteNoiseMiddleware`` is synchronous only. Django runs such a middleware
+in a thread under ASGI and then has to call everything below it, async
+views included, through ``async_to_sync`` in that thread, so one sync
+middleware at the top of ``MIDDLEWARE`` takes away what the async views
+gain. Looking a path up in WhiteNoise's file table does not block, so this
+subclass does it on the event loop and only reads a file (in a thread) when
+the request is for a static file.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
 
-class CleanupOldAppointmentsMiddleware:
-    """
-    Deletes appointments older than 30 days once per day on first request.
-    Lightweight approach that avoids external schedulers.
-    """
 
-    def __init__(self, get_response):
-        self.get_response = get_response
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    sync_capable = True
+    async_capable = True
 
-    def __call__(self, request):
-        try:
-            from dashboard.models import Setting
-            from appointments.models import Appointment
-            today = timezone.localdate()
-            setting, _ = Setting.objects.get_or_create(pk=1)
-            if setting.last_cleanup != today:
-                cutoff = timezone.now() - timedelta(days=30)
-                Appointment.objects.filter(created_at__lt=cutoff).delete()
-                setting.last_cleanup = today
-                setting.save(update_fields=["last_cleanup"])
-        except Exception:
-            # Silently continue; never block the request path due to cleanup
-            pass
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
 
-        response = self.get_response(request)
-        return response
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
 
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
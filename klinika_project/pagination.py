@@ -0,0 +1,144 @@
+"""Keyset ("cursor") pagination for the long list pages.
+
+Instead of ``OFFSET n`` (which reads and throws away n rows, so deep pages
+get slower and slower) each page remembers the sort key of its first and
+last row. The next page is fetched with ``WHERE (date, time, id) < (last
+row's values) ORDER BY -date, -time, -id LIMIT n + 1``, which an index on the
+ordering columns answers by seeking straight to that key, at any depth.
+
+Usage in a view::
+
+    page = keyset_page(request, qs, ('-date', '-time', '-id'), per_page=100)
+    render(..., {'appointments': page, 'page': page})
+
+and ``{% include 'includes/keyset_pager.html' %}`` in the template (async views
+use ``await akeyset_page(...)``). The ordering must end with a unique field
+(the primary key) so that rows with equal dates are neither skipped nor
+repeated.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 50
+
+
+def _encode(values, direction):
+    raw = json.dumps([direction, values], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    direction, values = json.loads(raw)
+    if direction not in ('n', 'p') or not isinstance(values, list):
+        raise ValueError(cursor)
+    return direction, values
+
+
+def _keyset_filter(ordering, values, forward):
+    """Rows strictly after (forward) or before the key ``values``."""
+    # (a, b, c) > (x, y, z)  ==  a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+    condition = None
+    for (name, desc), value in reversed(list(zip(ordering, values))):
+        after = 'lt' if desc == forward else 'gt'
+        strict = Q(**{f'{name}__{after}': value})
+        condition = strict if condition is None else strict | (Q(**{name: value}) & condition)
+    # Redundant bound on the leading column: lets the database start an
+    # index range scan at the key instead of evaluating the OR for each row
+    name, desc = ordering[0]
+    bound = 'lte' if desc == forward else 'gte'
+    return Q(**{f'{name}__{bound}': values[0]}) & condition
+
+
+class KeysetPage(list):
+    """The rows of one page plus links to its neighbours."""
+
+    has_next = False
+    has_previous = False
+    next_url = ''
+    previous_url = ''
+    first_url = ''
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _prepare(request, queryset, ordering, per_page, param):
+    """Parse the cursor; returns (state, sliced queryset to evaluate)."""
+    model = queryset.model
+    ordering = [(o.lstrip('-'), o.startswith('-')) for o in ordering]
+    fields = [model._meta.pk if name == 'pk' else model._meta.get_field(name) for name, _ in ordering]
+
+    direction, values = 'n', None
+    cursor = request.GET.get(param)
+    if cursor:
+        try:
+            direction, raw = _decode(cursor)
+            if len(raw) != len(fields):
+                raise ValueError(cursor)
+            values = [f.to_python(v) for f, v in zip(fields, raw)]
+        except (ValueError, TypeError, ValidationError):
+            direction, values = 'n', None
+
+    forward = direction == 'n'
+    order_by = [('-' if desc == forward else '') + name for name, desc in ordering]
+    qs = queryset
+    if values is not None:
+        qs = qs.filter(_keyset_filter(ordering, values, forward))
+    return (fields, values, forward), qs.order_by(*order_by)[:per_page + 1]
+
+
+def _finish(request, state, rows, per_page, param):
+    fields, values, forward = state
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    page = KeysetPage(rows)
+    if forward:
+        page.has_next = more
+        page.has_previous = values is not None
+    else:
+        page.has_next = True
+        page.has_previous = more
+
+    def key(obj):
+        return [f.value_to_string(obj) for f in fields]
+
+    def url(cursor_value):
+        params = request.GET.copy()
+        params.pop(param, None)
+        if cursor_value:
+            params[param] = cursor_value
+        query = params.urlencode()
+        return f'?{query}' if query else '?'
+
+    if rows:
+        if page.has_next:
+            page.next_url = url(_encode(key(rows[-1]), 'n'))
+        if page.has_previous:
+            page.previous_url = url(_encode(key(rows[0]), 'p'))
+    page.first_url = url(None)
+    return page
+
+
+def keyset_page(request, queryset, ordering, per_page=DEFAULT_PER_PAGE, param='cursor'):
+    """Return the page of ``queryset`` selected by ``request.GET[param]``.
+
+    ``ordering`` is a sequence like ``('-date', '-time', '-id')``. An invalid
+    or stale cursor silently yields the first page.
+    """
+    state, qs = _prepare(request, queryset, ordering, per_page, param)
+    return _finish(request, state, list(qs), per_page, param)
+
+
+async def akeyset_page(request, queryset, ordering, per_page=DEFAULT_PER_PAGE, param='cursor'):
+    """``keyset_page`` for async views (rows are fetched with the async ORM)."""
+    state, qs = _prepare(request, queryset, ordering, per_page, param)
+    rows = [obj async for obj in qs]
+    return _finish(request, state, rows, per_page, param)
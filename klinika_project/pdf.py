@@ -0,0 +1,530 @@
+"""Minimal streaming PDF writer for text reports.
+
+Used by the exports when WeasyPrint is not available. Objects are written to
+the output stream as soon as they are complete and their byte offsets are
+recorded on the way, so a document is produced in a single linear pass: a
+100 000-row report costs 100 times a 1 000-row one, with memory bounded by
+one page.
+
+Text is drawn with a TrueType font embedded as a CID font (Identity-H), so
+any Unicode text the font covers — Uzbek ``o‘``/``g‘``, Cyrillic — comes out
+as written. Only the glyphs the document uses are embedded — a few KB, where
+the whole of DejaVu Sans adds ~370 KB to every file; they keep their glyph
+ids, so pages can be written before the set of glyphs is known. The font
+is taken from ``settings.PDF_FONT_PATH`` or the first of ``FONT_CANDIDATES``
+that exists; without one the writer falls back to the built-in Courier font
+and Latin-1 text.
+
+Usage::
+
+    with PdfDocument(fh) as pdf:
+        pdf.text("Sarlavha", size=12)
+        pdf.table_header(['Sana', 'Miqdor'], widths=[100, 80], align='lr')
+        for row in rows:
+            pdf.row(row)
+"""
+import hashlib
+import logging
+import os
+import struct
+import zlib
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+A4 = (595, 842)
+
+FONT_CANDIDATES = [
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/TTF/DejaVuSans.ttf',
+    '/usr/local/share/fonts/DejaVuSans.ttf',
+    '/Library/Fonts/Arial Unicode.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+]
+
+# Characters commonly found in Uzbek/Russian text that Latin-1 lacks
+_LATIN1_FALLBACK = str.maketrans({
+    '\u02bb': "'", '\u02bc': "'", '\u2018': "'", '\u2019': "'",
+    '\u201c': '"', '\u201d': '"', '\u2013': '-', '\u2014': '-', '\u2026': '...',
+})
+
+
+def _pdf_string(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _sfnt(tables):
+    """Assemble a TrueType file from {tag: table data}."""
+    tags = sorted(tables)
+    entry_selector = len(tags).bit_length() - 1
+    search_range = 16 << entry_selector
+    header = struct.pack('>IHHHH', 0x00010000, len(tags), search_range, entry_selector,
+                         16 * len(tags) - search_range)
+    offset = 12 + 16 * len(tags)
+    records, body = [], []
+    for tag in tags:
+        data = tables[tag]
+        padded = data + b'\0' * (-len(data) % 4)
+        checksum = sum(struct.unpack(f'>{len(padded) // 4}I', padded)) & 0xFFFFFFFF
+        records.append(struct.pack('>4sIII', tag.encode('latin-1'), checksum, offset, len(data)))
+        body.append(padded)
+        offset += len(padded)
+    return header + b''.join(records) + b''.join(body)
+
+
+class TrueTypeFont:
+    """The few tables of a .ttf file needed to embed it and measure text."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            self.data = fh.read()
+        data = self.data
+        if data[:4] not in (b'\x00\x01\x00\x00', b'true'):
+            raise ValueError(f"{path}: only TrueType outlines (.ttf) are supported")
+        num_tables = struct.unpack('>H', data[4:6])[0]
+        self.tables = {}
+        for i in range(num_tables):
+            tag, _, offset, length = struct.unpack('>4sIII', data[12 + 16 * i:28 + 16 * i])
+            self.tables[tag.decode('latin-1')] = (offset, length)
+
+        head = self._table('head')
+        self.units_per_em = struct.unpack('>H', head[18:20])[0]
+        x_min, y_min, x_max, y_max = struct.unpack('>hhhh', head[36:44])
+        hhea = self._table('hhea')
+        ascent, descent = struct.unpack('>hh', hhea[4:8])
+        num_hmetrics = struct.unpack('>H', hhea[34:36])[0]
+        scale = 1000.0 / self.units_per_em
+        self.bbox = [int(v * scale) for v in (x_min, y_min, x_max, y_max)]
+        self.ascent = int(ascent * scale)
+        self.descent = int(descent * scale)
+
+        hmtx = self._table('hmtx')
+        advances = struct.unpack(f'>{num_hmetrics * 2}h', hmtx[:num_hmetrics * 4])[0::2]
+        self.widths = [int((a & 0xFFFF) * scale) for a in advances]
+        self.num_hmetrics = num_hmetrics
+        self.num_glyphs = struct.unpack('>H', self._table('maxp')[4:6])[0]
+        self._loca = None
+        self.cmap = self._read_cmap()
+        self.name = ''.join(ch for ch in os.path.splitext(os.path.basename(path))[0] if ch.isalnum()) or 'Font'
+
+    def _table(self, tag):
+        offset, length = self.tables[tag]
+        return self.data[offset:offset + length]
+
+    def _read_cmap(self):
+        cmap = self._table('cmap')
+        num = struct.unpack('>H', cmap[2:4])[0]
+        subtables = {}
+        for i in range(num):
+            platform, encoding, offset = struct.unpack('>HHI', cmap[4 + 8 * i:12 + 8 * i])
+            subtables[(platform, encoding)] = offset
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3), (0, 1), (0, 0)):
+            if key in subtables:
+                offset = subtables[key]
+                fmt = struct.unpack('>H', cmap[offset:offset + 2])[0]
+                if fmt == 12:
+                    return self._cmap_format12(cmap, offset)
+                if fmt == 4:
+                    return self._cmap_format4(cmap, offset)
+        raise ValueError("Font has no Unicode cmap")
+
+    @staticmethod
+    def _cmap_format4(cmap, offset):
+        seg_count = struct.unpack('>H', cmap[offset + 6:offset + 8])[0] // 2
+        ends_at = offset + 14
+        starts_at = ends_at + 2 * seg_count + 2
+        deltas_at = starts_at + 2 * seg_count
+        ranges_at = deltas_at + 2 * seg_count
+        ends = struct.unpack(f'>{seg_count}H', cmap[ends_at:ends_at + 2 * seg_count])
+        starts = struct.unpack(f'>{seg_count}H', cmap[starts_at:starts_at + 2 * seg_count])
+        deltas = struct.unpack(f'>{seg_count}h', cmap[deltas_at:deltas_at + 2 * seg_count])
+        ranges = struct.unpack(f'>{seg_count}H', cmap[ranges_at:ranges_at + 2 * seg_count])
+        result = {}
+        for i in range(seg_count):
+            if starts[i] == 0xFFFF:
+                continue
+            for code in range(starts[i], ends[i] + 1):
+                if ranges[i] == 0:
+                    gid = (code + deltas[i]) & 0xFFFF
+                else:
+                    at = ranges_at + 2 * i + ranges[i] + 2 * (code - starts[i])
+                    gid = struct.unpack('>H', cmap[at:at + 2])[0]
+                    if gid:
+                        gid = (gid + deltas[i]) & 0xFFFF
+                if gid:
+                    result[code] = gid
+        return result
+
+    @staticmethod
+    def _cmap_format12(cmap, offset):
+        groups = struct.unpack('>I', cmap[offset + 12:offset + 16])[0]
+        result = {}
+        for i in range(groups):
+            start, end, gid = struct.unpack('>III', cmap[offset + 16 + 12 * i:offset + 28 + 12 * i])
+            for code in range(start, end + 1):
+                result[code] = gid + code - start
+        return result
+
+    def _glyph_offsets(self):
+        """Start of every glyph in ``glyf`` (``loca``, numGlyphs + 1 entries)."""
+        if self._loca is None:
+            loca = self._table('loca')
+            count = self.num_glyphs + 1
+            if struct.unpack('>h', self._table('head')[50:52])[0]:
+                self._loca = struct.unpack(f'>{count}I', loca[:4 * count])
+            else:
+                self._loca = [v * 2 for v in struct.unpack(f'>{count}H', loca[:2 * count])]
+        return self._loca
+
+    @staticmethod
+    def _components(glyph):
+        """Glyph ids a composite glyph is built from."""
+        if len(glyph) < 10 or struct.unpack('>h', glyph[:2])[0] >= 0:
+            return []
+        found = []
+        pos = 10
+        while True:
+            flags, gid = struct.unpack('>HH', glyph[pos:pos + 4])
+            found.append(gid)
+            pos += 8 if flags & 0x0001 else 6  # ARG_1_AND_2_ARE_WORDS
+            if flags & 0x0008:  # WE_HAVE_A_SCALE
+                pos += 2
+            elif flags & 0x0040:  # WE_HAVE_AN_X_AND_Y_SCALE
+                pos += 4
+            elif flags & 0x0080:  # WE_HAVE_A_TWO_BY_TWO
+                pos += 8
+            if not flags & 0x0020:  # MORE_COMPONENTS
+                return found
+
+    def subset(self, gids):
+        """Font program with only ``gids`` (and the glyphs they are built from).
+
+        Glyph ids are unchanged, the other glyphs are left empty; the file
+        has just the tables a PDF viewer reads from an embedded TrueType font.
+        """
+        glyf = self._table('glyf')
+        offsets = self._glyph_offsets()
+        keep = set()
+        todo = [0] + [gid for gid in gids if gid < self.num_glyphs]
+        while todo:
+            gid = todo.pop()
+            if gid not in keep:
+                keep.add(gid)
+                todo.extend(self._components(glyf[offsets[gid]:offsets[gid + 1]]))
+        count = max(keep) + 1
+
+        hmtx = self._table('hmtx')
+        last_advance = hmtx[4 * self.num_hmetrics - 4:4 * self.num_hmetrics - 2]
+        glyphs, loca, metrics = [], [], []
+        at = 0
+        for gid in range(count):
+            loca.append(at)
+            if gid not in keep:
+                metrics.append(b'\0\0\0\0')
+                continue
+            glyph = glyf[offsets[gid]:offsets[gid + 1]]
+            glyph += b'\0' * (-len(glyph) % 4)
+            glyphs.append(glyph)
+            at += len(glyph)
+            if gid < self.num_hmetrics:
+                metrics.append(hmtx[4 * gid:4 * gid + 4])
+            else:
+                lsb_at = 4 * self.num_hmetrics + 2 * (gid - self.num_hmetrics)
+                metrics.append(last_advance + hmtx[lsb_at:lsb_at + 2])
+        loca.append(at)
+
+        head, hhea, maxp = self._table('head'), self._table('hhea'), self._table('maxp')
+        tables = {
+            # checkSumAdjustment left 0; long loca offsets
+            'head': head[:8] + b'\0\0\0\0' + head[12:50] + struct.pack('>h', 1) + head[52:],
+            'hhea': hhea[:34] + struct.pack('>H', count) + hhea[36:],
+            'maxp': maxp[:4] + struct.pack('>H', count) + maxp[6:],
+            'loca': struct.pack(f'>{count + 1}I', *loca),
+            'glyf': b''.join(glyphs),
+            'hmtx': b''.join(metrics),
+        }
+        for tag in ('cvt ', 'fpgm', 'prep'):  # hinting programs
+            if tag in self.tables:
+                tables[tag] = self._table(tag)
+        return _sfnt(tables)
+
+    def width(self, gid):
+        return self.widths[gid] if gid < len(self.widths) else self.widths[-1]
+
+
+@lru_cache(maxsize=4)
+def load_font(path):
+    return TrueTypeFont(path)
+
+
+def default_font_path():
+    try:
+        from django.conf import settings
+        configured = getattr(settings, 'PDF_FONT_PATH', '')
+    except Exception:
+        configured = ''
+    for path in ([configured] if configured else []) + FONT_CANDIDATES:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+class _GlyphTable(dict):
+    """Lazy code point -> value map (usable with ``str.translate``)."""
+
+    def __init__(self, doc, value):
+        super().__init__()
+        self.doc = doc
+        self.value = value
+
+    def __missing__(self, code):
+        gid = self.doc.font.cmap.get(code, 0)
+        self.doc._used.setdefault(gid, chr(code))
+        value = self[code] = self.value(gid)
+        return value
+
+
+class PdfDocument:
+    """Write a paginated text/table document to a binary stream."""
+
+    def __init__(self, out, font_path=None, page_size=A4, margin=36, compress=True):
+        self.out = out
+        self.width, self.height = page_size
+        self.margin = margin
+        self.compress = compress
+        self._pos = 0
+        self._offsets = {}
+        self._next_id = 1
+        self._pages = []
+        self._ops = []
+        self._y = None
+        self._header = None
+        self._columns = None
+        self._used = {}
+
+        if font_path is None:
+            font_path = default_font_path()
+        self.font = None
+        if font_path:
+            try:
+                self.font = load_font(font_path)
+            except Exception:
+                logger.exception("PDF: cannot use font %s, falling back to Courier", font_path)
+        if self.font is not None:
+            # code point -> glyph id in hex / advance width, filled on first use
+            self._hex = _GlyphTable(self, lambda gid: '%04X' % gid)
+            self._advance = _GlyphTable(self, self.font.width)
+
+        # Fixed object numbers, written when the document is closed
+        self._pages_id = self._alloc()
+        self._font_id = self._alloc()
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    # --- low level --------------------------------------------------------
+
+    def _alloc(self):
+        num = self._next_id
+        self._next_id += 1
+        return num
+
+    def _write(self, data):
+        self.out.write(data)
+        self._pos += len(data)
+
+    def _object(self, num, body):
+        self._offsets[num] = self._pos
+        self._write(b'%d 0 obj\n' % num + body + b'\nendobj\n')
+        return num
+
+    def _stream(self, num, data, extra=b''):
+        if self.compress:
+            data = zlib.compress(data, 6)
+            extra += b' /Filter /FlateDecode'
+        return self._object(num, b'<< /Length %d%s >>\nstream\n' % (len(data), extra) + data + b'\nendstream')
+
+    # --- text -------------------------------------------------------------
+
+    def _operand(self, text):
+        """Text as a PDF string operand for ``Tj``."""
+        if self.font is None:
+            raw = text.translate(_LATIN1_FALLBACK).encode('latin-1', 'replace').decode('latin-1')
+            return f'({_pdf_string(raw)})'.encode('latin-1')
+        return b'<%s>' % text.translate(self._hex).encode('ascii')
+
+    def _width(self, text):
+        """Advance width of ``text`` in 1/1000 of the font size."""
+        if self.font is None:
+            return 600 * len(text.translate(_LATIN1_FALLBACK))
+        return sum(map(self._advance.__getitem__, map(ord, text)))
+
+    def _fit(self, text, max_width, size):
+        """Return (operand, width) of ``text``, cut with '…' to fit ``max_width`` points."""
+        limit = max_width * 1000.0 / size
+        width = self._width(text)
+        if width <= limit or not text:
+            return self._operand(text), width
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._width(text[:mid] + '…') <= limit:
+                lo = mid
+            else:
+                hi = mid - 1
+        text = text[:lo] + '…'
+        return self._operand(text), self._width(text)
+
+    def _draw(self, x, text, size, max_width, align='l'):
+        operand, width = self._fit(str(text), max_width, size)
+        if align == 'r':
+            x += max(0.0, max_width - width * size / 1000.0)
+        self._ops.append(b'BT /F1 %d Tf %.2f %.2f Td %s Tj ET' % (size, x, self._y, operand))
+
+    def _ensure_room(self, line_height):
+        if self._y is None or self._y - line_height < self.margin:
+            self._new_page()
+            if self._header is not None:
+                self._draw_row(self._header, self._columns['size'], rule=True)
+        self._y -= line_height
+
+    def _new_page(self):
+        self._flush_page()
+        self._y = self.height - self.margin
+
+    def _flush_page(self):
+        if self._y is None:
+            return
+        content_id = self._stream(self._alloc(), b'\n'.join(self._ops))
+        page_id = self._object(self._alloc(), (
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+            % (self._pages_id, self.width, self.height, self._font_id, content_id)
+        ))
+        self._pages.append(page_id)
+        self._ops = []
+
+    # --- public API -------------------------------------------------------
+
+    def text(self, text, size=10):
+        """Write one line of text (cut to the page width)."""
+        self._ensure_room(size * 1.4)
+        self._draw(self.margin, text, size, self.width - 2 * self.margin)
+
+    def gap(self, points=8):
+        if self._y is not None:
+            self._y -= points
+
+    def table_header(self, cells, widths, align=None, size=9):
+        """Start a table: remember column layout and repeat the header on every page."""
+        self._columns = {'widths': widths, 'align': align or 'l' * len(widths), 'size': size}
+        self._header = None
+        self._draw_row(cells, size, rule=True)
+        self._header = list(cells)
+
+    def end_table(self):
+        self._header = None
+
+    def row(self, cells, size=None):
+        self._draw_row(cells, size or self._columns['size'])
+
+    def _draw_row(self, cells, size, rule=False):
+        # Hot path of large exports: one BT block per row with relative moves
+        self._ensure_room(size * 1.5)
+        ops = [b'BT /F1 %d Tf' % size]
+        scale = size / 1000.0
+        measure, encode = self._width, self._operand
+        x = self.margin
+        at = 0.0
+        y = self._y
+        for cell, width, align in zip(cells, self._columns['widths'], self._columns['align']):
+            text = '' if cell is None else str(cell)
+            if text:
+                limit = width - 4
+                text_width = measure(text) * scale
+                if text_width <= limit:
+                    operand = encode(text)
+                else:
+                    operand, text_width = self._fit(text, limit, size)
+                    text_width *= scale
+                target = x + limit - text_width if align == 'r' else x
+                ops.append(b'%.2f %.2f Td %s Tj' % (target - at, y, operand))
+                at, y = target, 0
+            x += width
+        ops.append(b'ET')
+        self._ops.append(b' '.join(ops))
+        if rule:
+            y = self._y - size * 0.4
+            self._ops.append(b'0.5 w %.2f %.2f m %.2f %.2f l S' % (self.margin, y, x, y))
+
+    def close(self):
+        """Finish pages, fonts, xref and trailer. The stream is not closed."""
+        if self._y is None:
+            self._new_page()
+        self._flush_page()
+        kids = b' '.join(b'%d 0 R' % p for p in self._pages)
+        self._object(self._pages_id, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self._pages)))
+        self._write_font()
+        xref_at = self._pos
+        count = self._next_id
+        lines = [b'xref\n0 %d\n' % count, b'0000000000 65535 f \n']
+        lines.extend(b'%010d 00000 n \n' % self._offsets[num] for num in range(1, count))
+        self._write(b''.join(lines))
+        self._write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                    % (count, self._catalog_id, xref_at))
+
+    def _write_font(self):
+        catalog_id = self._alloc()
+        self._object(catalog_id, b'<< /Type /Catalog /Pages %d 0 R >>' % self._pages_id)
+        self._catalog_id = catalog_id
+        if self.font is None:
+            self._object(self._font_id, b'<< /Type /Font /Subtype /Type1 /BaseFont /Courier '
+                                        b'/Encoding /WinAnsiEncoding >>')
+            return
+        font = self.font
+        used = sorted(self._used)
+        # A subset font's name starts with a tag of six capitals and '+'
+        digest = hashlib.md5(repr(used).encode('ascii')).digest()
+        name = (''.join(chr(65 + b % 26) for b in digest[:6]) + '+' + font.name).encode('ascii')
+        data = font.subset(used)
+        file_id = self._stream(self._alloc(), data, b' /Length1 %d' % len(data))
+        descriptor_id = self._object(self._alloc(), (
+            b'<< /Type /FontDescriptor /FontName /%s /Flags 32 /FontBBox [%d %d %d %d] '
+            b'/ItalicAngle 0 /Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>'
+            % (name, *font.bbox, font.ascent, font.descent, font.ascent, file_id)
+        ))
+        widths = b' '.join(b'%d [%d]' % (gid, font.width(gid)) for gid in used)
+        cid_id = self._object(self._alloc(), (
+            b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s '
+            b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+            b'/FontDescriptor %d 0 R /DW 1000 /W [%s] /CIDToGIDMap /Identity >>'
+            % (name, descriptor_id, widths)
+        ))
+        to_unicode_id = self._stream(self._alloc(), self._to_unicode(used))
+        self._object(self._font_id, (
+            b'<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H '
+            b'/DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>' % (name, cid_id, to_unicode_id)
+        ))
+
+    def _to_unicode(self, used):
+        """CMap that maps glyph ids back to text, so the PDF can be searched and copied."""
+        out = [b'/CIDInit /ProcSet findresource begin 12 dict begin begincmap',
+               b'/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def',
+               b'/CMapName /Adobe-Identity-UCS def /CMapType 2 def',
+               b'1 begincodespacerange <0000> <FFFF> endcodespacerange']
+        used = [gid for gid in used if gid]
+        for i in range(0, len(used), 100):
+            chunk = used[i:i + 100]
+            out.append(b'%d beginbfchar' % len(chunk))
+            for gid in chunk:
+                out.append(b'<%04X> <%s>' % (gid, self._used[gid].encode('utf-16-be').hex().upper().encode('ascii')))
+            out.append(b'endbfchar')
+        out.append(b'endcmap CMapName currentdict /CMap defineresource pop end end')
+        return b'\n'.join(out)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        return False
@@ -0,0 +1,108 @@
+"""Report queries on a read replica, each report in one snapshot.
+
+The statistics page, the admin dashboard totals and the report exports scan
+whole date ranges of appointments, payments and the ledger. Inside
+``report()`` every ORM read is routed (``ReportRouter``) to the ``replica``
+database when ``REPLICA_DATABASE_URL`` is set, so these scans no longer
+compete with bookings and payments on the primary. Writes always go to the
+primary.
+
+``report()`` also runs the report in a single transaction; on PostgreSQL it
+is ``REPEATABLE READ READ ONLY``, so all totals of a page come from the same
+snapshot even while payments are being taken. Inside an already open
+transaction on that database (benchmarks, checks) the report simply reads
+in it. Keep writes (export jobs, counter reconciling) outside ``report()``:
+without a replica the snapshot is on the primary and is read-only.
+
+Without a replica, or for ``REPLICA_RETRY_SECONDS`` after it failed to
+connect, reports read the primary. A replica may lag a little behind the
+primary, so a payment taken a moment ago can be missing from a report.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+REPLICA = 'replica'
+
+_alias = ContextVar('report_alias', default=None)
+_down_until = 0.0
+
+
+def report_alias():
+    """The database reports read from now: ``replica`` if it is usable, else ``default``."""
+    global _down_until
+    if REPLICA not in connections or time.monotonic() < _down_until:
+        return DEFAULT_DB_ALIAS
+    try:
+        connections[REPLICA].ensure_connection()
+    except Exception:
+        logger.warning("Replica unavailable, reports read the primary", exc_info=True)
+        _down_until = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', 30)
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+def current_alias():
+    """The database ``report()`` reads from in this context, or None outside a report."""
+    return _alias.get()
+
+
+@contextmanager
+def _snapshot(alias):
+    connection = connections[alias]
+    if connection.in_atomic_block:
+        yield
+        return
+    with transaction.atomic(using=alias):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+        yield
+
+
+@contextmanager
+def report():
+    """Route the reads of the block to the report database, in one transaction.
+
+    Yields the alias used. Nested calls join the outer report.
+    """
+    current = _alias.get()
+    if current is not None:
+        yield current
+        return
+    alias = report_alias()
+    token = _alias.set(alias)
+    try:
+        with _snapshot(alias):
+            yield alias
+    finally:
+        _alias.reset(token)
+
+
+def report_rows(make_rows):
+    """Iterate ``make_rows()`` inside ``report()``.
+
+    For streaming responses, whose rows are read after the view returned.
+    """
+    with report():
+        yield from make_rows()
+
+
+class ReportRouter:
+    """Sends reads made inside ``report()`` to its database; everything else is left to Django."""
+
+    def db_for_read(self, model, **hints):
+        return _alias.get()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        dbs = {DEFAULT_DB_ALIAS, REPLICA}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
@@ -0,0 +1,94 @@
+"""Race-free counters stored in an integer column of an existing row.
+
+Used for ``Doctor.receipt_serial`` (per-doctor ``Appointment.doc_no``) and
+``Setting.receipt_serial`` (``Payment.receipt_no``).
+
+Every allocation is a single atomic ``UPDATE ... SET n = n + k``. On
+PostgreSQL and SQLite >= 3.35 the new value comes back via ``RETURNING`` in
+the same statement; other backends read it back inside the same transaction
+while the UPDATE still holds the row lock. Two concurrent callers can
+therefore never receive the same number, and the lock is held only for the
+length of the caller's transaction, not for a Python read-modify-write.
+
+With ``block > 1`` a worker reserves ``block`` numbers at once and hands them
+out from memory. That removes the DB round trip for most calls at the cost of
+gaps (unused numbers of a worker that exits) and numbers that are not
+ordered across workers; the default block of 1 is gap-free.
+"""
+import sqlite3
+import threading
+
+from django.db import connections, router, transaction
+from django.db.models import F
+
+
+def _supports_returning(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def reserve(model, pk, field, count=1):
+    """Atomically add ``count`` to ``model.field`` of row ``pk``.
+
+    Returns the new (highest reserved) value, or None if the row does not exist.
+    The reserved numbers are ``value - count + 1 .. value``.
+    """
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if _supports_returning(connection):
+        qn = connection.ops.quote_name
+        opts = model._meta
+        column = opts.get_field(field).column
+        sql = (
+            f"UPDATE {qn(opts.db_table)} SET {qn(column)} = COALESCE({qn(column)}, 0) + %s "
+            f"WHERE {qn(opts.pk.column)} = %s RETURNING {qn(column)}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [count, pk])
+            row = cursor.fetchone()
+        return row[0] if row else None
+    with transaction.atomic(using=using):
+        if not model._default_manager.using(using).filter(pk=pk).update(**{field: F(field) + count}):
+            return None
+        return (model._default_manager.using(using)
+                .filter(pk=pk).values_list(field, flat=True).get())
+
+
+class SequenceAllocator:
+    """Hands out numbers from ``model.field``, optionally in per-worker blocks."""
+
+    def __init__(self, model, field, block=1):
+        self.model = model
+        self.field = field
+        self.block = max(1, int(block or 1))
+        self._lock = threading.Lock()
+        self._ranges = {}  # pk -> [next, last]
+
+    def next(self, pk):
+        """Return the next number for row ``pk`` (None if the row is missing)."""
+        using = router.db_for_write(self.model)
+        if self.block == 1 or connections[using].in_atomic_block:
+            # A block reserved inside the caller's transaction could be rolled
+            # back while its numbers stay cached, so reserve exactly one.
+            return reserve(self.model, pk, self.field, 1)
+        with self._lock:
+            current = self._ranges.get(pk)
+            if current is None or current[0] > current[1]:
+                last = reserve(self.model, pk, self.field, self.block)
+                if last is None:
+                    return None
+                current = self._ranges[pk] = [last - self.block + 1, last]
+            value = current[0]
+            current[0] += 1
+            return value
+
+    def reset(self, pk=None):
+        """Drop this worker's cached block(s), e.g. after a counter reset."""
+        with self._lock:
+            if pk is None:
+                self._ranges.clear()
+            else:
+                self._ranges.pop(pk, None)
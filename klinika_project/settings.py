@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url # type: ignore
@@ -34,11 +35,14 @@ INSTALLED_APPS = [
 # --- Middleware ---
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, async-capable so the chain stays async under ASGI
+    'klinika_project.middleware.StaticFilesMiddleware',
+    'klinika_project.metrics.RequestMetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Loads request.user from a per-process cache (accounts.usercache)
+    'accounts.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -64,13 +68,70 @@ TEMPLATES = [
 WSGI_APPLICATION = 'klinika_project.wsgi.application'
 
 # --- Database ---
+# SERVER_MODE=asgi (see gunicorn.conf.py): the async ORM runs each request's
+# queries in a fresh worker thread, so connections kept open per thread would
+# pile up; Django recommends CONN_MAX_AGE=0 under ASGI.
+#
+# DB_POOL selects how PostgreSQL connections are reused:
+#   off (default) - one persistent connection per worker thread, kept
+#                   DB_CONN_MAX_AGE seconds (not under ASGI);
+#   psycopg       - Django's psycopg 3 pool, one per process: DB_POOL_MIN_SIZE
+#                   connections are opened up front and at most
+#                   DB_POOL_MAX_SIZE are used; a request waits up to
+#                   DB_POOL_TIMEOUT seconds for a free one. Connections idle
+#                   longer than DB_POOL_MAX_IDLE or older than
+#                   DB_POOL_MAX_LIFETIME seconds are replaced;
+#   pgbouncer     - behind PgBouncer in transaction mode: no server-side
+#                   cursors and no LISTEN (the queue feed polls instead).
+# In every mode a reused connection is checked first (CONN_HEALTH_CHECKS), so
+# one the server has closed is replaced instead of failing the request.
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi").strip().lower()
+DB_POOL = os.getenv("DB_POOL", "off").strip().lower()
+DB_CONN_MAX_AGE = 0 if SERVER_MODE == "asgi" or DB_POOL == "psycopg" else int(os.getenv("DB_CONN_MAX_AGE", "600"))
 DATABASES = {
     "default": dj_database_url.config(
         default=os.getenv("DATABASE_URL", "sqlite:///db.sqlite3"),
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
         ssl_require=not DEBUG,
     )
 }
+# REPLICA_DATABASE_URL (optional): a read replica of the same database. The
+# statistics page, the admin dashboard totals and the report exports read
+# from it (klinika_project/replica.py); without it, or while it cannot be
+# reached, they read the primary. Under `manage.py test` it mirrors the
+# primary (dashboard/tests.py sets up its own stand-in replica).
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL", "").strip()
+if REPLICA_DATABASE_URL:
+    DATABASES["replica"] = dj_database_url.parse(
+        REPLICA_DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+        ssl_require=not DEBUG,
+        test_options={"MIRROR": "default"},
+    )
+# Seconds to read reports from the primary after the replica failed to connect
+REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+DATABASE_ROUTERS = ["klinika_project.replica.ReportRouter"]
+for _db in DATABASES.values():
+    if _db["ENGINE"] != "django.db.backends.postgresql":
+        continue
+    if DB_POOL == "psycopg":
+        _db.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+        }
+    elif DB_POOL == "pgbouncer":
+        _db["DISABLE_SERVER_SIDE_CURSORS"] = True
+
+# Numbers reserved per worker at once for Appointment.doc_no / Payment.receipt_no.
+# 1 = strictly sequential without gaps; larger values save a DB round trip per
+# booking but may leave gaps and interleave numbers between workers (a counter
+# reset reaches other workers only once their current block is used up).
+SEQUENCE_BLOCK_SIZE = int(os.getenv("SEQUENCE_BLOCK_SIZE", "1"))
 
 # --- Authentication ---
 AUTH_USER_MODEL = "accounts.User"
@@ -85,11 +146,99 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [BASE_DIR / "static"]
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# collectstatic stores every file under a content-hashed name (linked by
+# {% static %}) with .gz and, with the Brotli package, .br copies; WhiteNoise
+# serves hashed names with "Cache-Control: immutable" (one year) and picks
+# the compressed copy the browser accepts. Bootstrap, the Inter font,
+# neo.css and ui-patches.js are bundled into static/dist/ by
+# `manage.py build_assets`; Chart.js is loaded only by the statistics page.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+# `manage.py test` renders pages without running collectstatic first
+if sys.argv[1:2] == ["test"]:
+    STORAGES["staticfiles"] = {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Rendered PDF receipts are cached in MEDIA_ROOT/receipts/ and, when a payment
+# is saved, pre-rendered in a background thread
+RECEIPT_CACHE_ENABLED = os.getenv("RECEIPT_CACHE_ENABLED", "True").lower() == "true"
+RECEIPT_CACHE_WARMUP = os.getenv("RECEIPT_CACHE_WARMUP", "True").lower() == "true"
+
+# Report PDFs are rendered as background jobs (dashboard.jobs):
+# "thread" - one daemon thread per web process hands the rendering to
+# EXPORT_JOB_PROCESSES child processes (0 = render in the thread itself);
+# "worker" - a separate `python manage.py run_export_worker` service picks
+# the jobs up (its files must reach the web service: shared MEDIA_ROOT)
+EXPORT_JOBS_BACKEND = os.getenv("EXPORT_JOBS_BACKEND", "thread")
+EXPORT_JOB_PROCESSES = int(os.getenv("EXPORT_JOB_PROCESSES", "1"))
+EXPORT_JOB_TTL_HOURS = int(os.getenv("EXPORT_JOB_TTL_HOURS", "24"))
+EXPORT_JOB_TIMEOUT_MINUTES = int(os.getenv("EXPORT_JOB_TIMEOUT_MINUTES", "15"))
+# TrueType font embedded by the built-in PDF writer (used without WeasyPrint);
+# empty = first font found in klinika_project.pdf.FONT_CANDIDATES
+PDF_FONT_PATH = os.getenv("PDF_FONT_PATH", "")
+
+# Per-request metrics (klinika_project.metrics): Server-Timing header (in
+# DEBUG or for staff and creators), one log line per request (WARNING above
+# REQUEST_SLOW_MS) and the last REQUEST_METRICS_BUFFER samples per URL name
+# for /admin/dashboard/metrics/
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "True").lower() == "true"
+REQUEST_SLOW_MS = int(os.getenv("REQUEST_SLOW_MS", "500"))
+REQUEST_METRICS_BUFFER = int(os.getenv("REQUEST_METRICS_BUFFER", "500"))
+
+# Cache shared by all web workers when REDIS_URL is set (needs the `redis`
+# package); otherwise each process has its own in-memory cache
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+
+# Statistics page data (dashboard.charts), cached per chart and date range:
+# seconds for ranges including today and for closed past ranges. A write to
+# an older day (backdated payment, import, retention purge from cron) is only
+# seen by workers sharing the cache, so past ranges are kept a day only with
+# REDIS_URL; otherwise as long as live ones
+STATS_CACHE_LIVE_TTL = int(os.getenv("STATS_CACHE_LIVE_TTL", "60"))
+STATS_CACHE_HISTORY_TTL = int(os.getenv(
+    "STATS_CACHE_HISTORY_TTL", "86400" if os.getenv("REDIS_URL") else str(STATS_CACHE_LIVE_TTL)))
+
+# Sessions: SESSION_MODE=db (default, one SELECT per request), cached_db
+# (read from the cache, written through to the database) or signed_cookies
+# (no session table; the data is signed but readable by the browser, and a
+# session can only be revoked by a password change or a new SECRET_KEY)
+SESSION_MODE = os.getenv("SESSION_MODE", "db").lower()
+SESSION_ENGINE = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}.get(SESSION_MODE, "django.contrib.sessions.backends.db")
+
+# Logged-in users cached per process (accounts.usercache). A user change
+# (role, blocking) reaches other workers only through a shared cache, so it
+# is on by default only with REDIS_URL; forced on without one, other workers
+# keep the old user for up to AUTH_USER_CACHE_TTL seconds
+AUTH_USER_CACHE = os.getenv("AUTH_USER_CACHE", str(bool(os.getenv("REDIS_URL")))).lower() == "true"
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+
+# Clinic settings snapshot (dashboard.clinic): version check interval and
+# maximum age in seconds
+SETTING_CACHE_CHECK_SECONDS = float(os.getenv("SETTING_CACHE_CHECK_SECONDS", "2"))
+SETTING_CACHE_TTL = float(os.getenv("SETTING_CACHE_TTL", "60"))
+
+# Live queue pages (appointments.feed): an SSE stream lasts at most
+# QUEUE_FEED_MAX_SECONDS, then the browser reconnects; without PostgreSQL
+# LISTEN/NOTIFY (or with QUEUE_FEED_LISTEN=False, the default behind
+# PgBouncer) the event table is polled every QUEUE_FEED_POLL_SECONDS
+QUEUE_FEED_MAX_SECONDS = int(os.getenv("QUEUE_FEED_MAX_SECONDS", "30"))
+QUEUE_FEED_POLL_SECONDS = float(os.getenv("QUEUE_FEED_POLL_SECONDS", "1"))
+QUEUE_FEED_LISTEN = os.getenv("QUEUE_FEED_LISTEN", str(DB_POOL != "pgbouncer")).lower() == "true"
+
 # --- Security for production ---
 SECURE_SSL_REDIRECT = not DEBUG
 SESSION_COOKIE_SECURE = not DEBUG
@@ -98,6 +247,33 @@ SECURE_HSTS_SECONDS = 31536000 if not DEBUG else 0
 SECURE_HSTS_INCLUDE_SUBDOMAINS = not DEBUG
 SECURE_HSTS_PRELOAD = not DEBUG
 
+# --- Bulk import (python manage.py import_records, /admin/dashboard/import/) ---
+# Rows validated and committed per transaction; an interrupted import
+# resumes after the last committed batch
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+
+# --- Data retention (python manage.py purge_old_records, run daily) ---
+# "app_label.Model": {"field": date/datetime field, "days": rows to keep};
+# days <= 0 keeps rows forever. Cascaded rows (e.g. payments) go with them.
+RETENTION_POLICIES = {
+    "appointments.Appointment": {
+        "field": "created_at",
+        "days": int(os.getenv("RETENTION_APPOINTMENT_DAYS", "30")),
+    },
+    "payments.ExpenseRequest": {
+        "field": "created_at",
+        "days": int(os.getenv("RETENTION_EXPENSE_DAYS", "0")),
+    },
+    # Change log behind the live queue pages; only the last seconds matter
+    "appointments.QueueEvent": {
+        "field": "created_at",
+        "days": 1,
+    },
+}
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "1000"))
+# If set, deleted rows are first appended to JSON Lines files in this folder
+RETENTION_ARCHIVE_DIR = os.getenv("RETENTION_ARCHIVE_DIR", "")
+
 # --- Logging ---
 LOGGING = {
     "version": 1,
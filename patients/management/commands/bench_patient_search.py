@@ -0,0 +1,85 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from patients.models import Patient
+from patients.search import _prefix, normalize_name, search_patients
+
+SURNAMES = [
+    "Karimov", "Rahimov", "Yusupov", "Tursunov", "G‘ulomov", "Qodirov", "Xolmatov", "Ergashev",
+    "Abdullayev", "Sobirov", "Ismoilov", "Nazarov", "O‘rinboyev", "Shukurov", "Mirzayev", "Hasanov",
+    "Каримов", "Рахимов", "Юсупов", "Турсунов", "Ғуломов", "Қодиров", "Холматов", "Эргашев",
+]
+NAMES = [
+    "Aziz", "Dilshod", "Sardor", "Jasur", "Bekzod", "Otabek", "Nodira", "Madina", "Zarina",
+    "Shahzoda", "Gulnora", "Mohira", "O‘tkir", "Sherzod", "Азиз", "Дилшод", "Сардор", "Жасур",
+    "Нодира", "Мадина", "Шаҳзода", "Ўткир",
+]
+
+# (label, query): typed prefixes in both scripts, a second-word lookup and a typo
+QUERIES = [
+    ("lotin prefiks", "kari"),
+    ("lotin prefiks (uzun)", "gulomov o"),
+    ("kirill prefiks", "Ғулом"),
+    ("kirill prefiks (uzun)", "Юсупов Жас"),
+    ("ism bo'yicha", "sardor"),
+    ("xato bilan", "rahimof"),
+    ("topilmaydi", "zzqx"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Bemor qidiruvi (autocomplete) tezligini o'lchaydi. "
+        "--seed bilan avval sinov bemorlari yaratiladi (masalan 1000000)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="Avval shuncha sinov bemorini yaratish")
+        parser.add_argument('--repeat', type=int, default=50, help="Har bir so'rov necha marta o'lchansin")
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--explain', action='store_true', help="Prefiks so'rovi rejasini chiqarish")
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        self.stdout.write(f"DB: {connection.vendor}, bemorlar: {Patient.objects.count()}")
+        if options['explain']:
+            key = normalize_name(QUERIES[0][1])
+            self.stdout.write(_prefix(Patient.objects.all(), key)[:options['limit']].explain())
+        for label, q in QUERIES:
+            timings = []
+            for _ in range(max(1, options['repeat'])):
+                t0 = time.perf_counter()
+                results = search_patients(q, options['limit'])
+                timings.append((time.perf_counter() - t0) * 1000)
+            timings.sort()
+            p50 = timings[len(timings) // 2]
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            sample = results[0]['full_name'] if results else '-'
+            self.stdout.write(
+                f"{label:<22} {q!r:<14} p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  "
+                f"{len(results):>2} ta  (masalan: {sample})"
+            )
+
+    def seed(self, count, batch=5000):
+        rnd = random.Random(10)
+        made = 0
+        self.stdout.write(f"{count} ta bemor yaratilmoqda...")
+        while made < count:
+            size = min(batch, count - made)
+            objs = []
+            for i in range(size):
+                full_name = f"{rnd.choice(SURNAMES)} {rnd.choice(NAMES)} {made + i}"
+                # bulk_create skips save(), so the search key is set here
+                objs.append(Patient(full_name=full_name, phone=f"+99890{rnd.randint(0, 9999999):07d}",
+                                    search_name=normalize_name(full_name)))
+            with transaction.atomic():
+                Patient.objects.bulk_create(objs, batch_size=1000)
+            made += size
+        # bulk_create does not send signals: bring the dashboard counter up to date
+        from dashboard import counters
+        counters.reconcile(['patients'])
+        self.stdout.write(self.style.SUCCESS(f"Yaratildi: {made}"))
@@ -0,0 +1,79 @@
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+BATCH = 2000
+
+# Frozen copy of patients.search.normalize_name as of this migration, so later
+# changes to the search key do not alter what this migration writes
+_CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+_TRANSLIT = str.maketrans(_CYRILLIC)
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(value):
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKC', value).lower().translate(_TRANSLIT)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"['`ʻʼ‘’]", '', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def fill_search_name(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    db = schema_editor.connection.alias
+    last = 0
+    while True:
+        batch = list(Patient.objects.using(db).filter(pk__gt=last).order_by('pk')
+                     .only('pk', 'full_name')[:BATCH])
+        if not batch:
+            break
+        for p in batch:
+            p.search_name = normalize_name(p.full_name)
+        Patient.objects.using(db).bulk_update(batch, ['search_name'])
+        last = batch[-1].pk
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # pg_trgm ships with PostgreSQL's contrib package; the migration role
+    # needs CREATE on the database (or the extension pre-installed)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS patient_search_name_trgm '
+        'ON patients_patient USING gin (search_name gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS patient_search_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0002_alter_patient_options_alter_patient_address_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -7,10 +7,24 @@ class Patient(models.Model):
     address = models.CharField("Manzil", max_length=255, blank=True)
     birth_date = models.DateField("Tug'ilgan sana", null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Normalised full_name for lookups and autocomplete (see patients/search.py)
+    search_name = models.CharField(max_length=255, db_index=True, editable=False, default='')
 
     def __str__(self):
         return self.full_name
 
+    def save(self, *args, **kwargs):
+        from .search import normalize_name
+        self.search_name = normalize_name(self.full_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'full_name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'search_name'}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Bemor"
         verbose_name_plural = "Bemorlar"
+        indexes = [
+            # Patient list: ORDER BY -created_at, -id (keyset pagination)
+            models.Index(fields=['-created_at', '-id'], name='patient_created_idx'),
+        ]
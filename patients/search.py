@@ -0,0 +1,114 @@
+"""Patient name normalisation and the autocomplete query.
+
+``Patient.search_name`` holds the name lowercased, transliterated from
+Cyrillic (Uzbek and Russian letters) to Uzbek Latin and stripped of
+apostrophes and punctuation, so "Ғуломов Ўткир", "G‘ulomov O‘tkir" and
+"gulomov otkir" share one key. Queries are normalised the same way.
+
+Matching:
+
+* prefix — served by the ``search_name`` b-tree index: ``LIKE 'q%'`` on
+  PostgreSQL (Django adds a ``varchar_pattern_ops`` index for it), a range
+  scan (``search_name >= q AND search_name < q + U+FFFF``) elsewhere, since
+  SQLite's case-insensitive LIKE cannot use an index;
+* fuzzy — on PostgreSQL a pg_trgm word-similarity search (``%>``) served by
+  the GIN trigram index, so misspellings and the second word of the name
+  match too. Elsewhere a bounded substring scan is used instead.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import F
+
+_CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'yo', 'ж': 'j', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'x', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'sh',
+    'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+    # Uzbek letters
+    'ў': 'o', 'қ': 'q', 'ғ': 'g', 'ҳ': 'h',
+}
+_TRANSLIT = str.maketrans(_CYRILLIC)
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+MAX_RESULTS = 20
+
+
+def normalize_name(value):
+    """Search key of a person's name (see the module docstring)."""
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKC', value).lower().translate(_TRANSLIT)
+    # Drop accents (and with them stray combining marks) from Latin letters
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    # Apostrophes (o‘, g‘, ʼ) disappear; any other punctuation separates words
+    text = re.sub(r"['`ʻʼ‘’]", '', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def _prefix(qs, key):
+    if connection.vendor == 'postgresql':
+        qs = qs.filter(search_name__startswith=key)
+    else:
+        qs = qs.filter(search_name__gte=key, search_name__lt=key + '\uffff')
+    return qs.order_by('search_name')
+
+
+_FIELDS = ('id', 'full_name', 'phone', 'birth_date')
+
+
+def _fuzzy(key, seen):
+    """Non-prefix matches for ``key``, best first, excluding ids in ``seen``."""
+    from .models import Patient
+
+    rest = Patient.objects.exclude(pk__in=seen)
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.lookups import TrigramWordSimilar
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return (rest.filter(TrigramWordSimilar(F('search_name'), key))
+                .annotate(similarity=TrigramWordSimilarity(key, 'search_name'))
+                .order_by('-similarity', 'search_name'))
+    return rest.filter(search_name__contains=key).order_by()
+
+
+def search_patients(query, limit=10):
+    """Return up to ``limit`` patients matching ``query`` (prefix matches first)."""
+    from .models import Patient
+
+    key = normalize_name(query)
+    if not key:
+        return []
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    results = list(_prefix(Patient.objects.all(), key).values(*_FIELDS)[:limit])
+    if len(results) >= limit or len(key) < 3:
+        return results
+    results.extend(_fuzzy(key, {r['id'] for r in results}).values(*_FIELDS)[:limit - len(results)])
+    return results
+
+
+async def asearch_patients(query, limit=10):
+    """``search_patients()`` on the async ORM, for the async autocomplete view."""
+    from .models import Patient
+
+    key = normalize_name(query)
+    if not key:
+        return []
+    limit = max(1, min(int(limit), MAX_RESULTS))
+    results = [r async for r in _prefix(Patient.objects.all(), key).values(*_FIELDS)[:limit]]
+    if len(results) >= limit or len(key) < 3:
+        return results
+    results.extend([r async for r in
+                    _fuzzy(key, {r['id'] for r in results}).values(*_FIELDS)[:limit - len(results)]])
+    return results
+
+
+def find_patient(full_name):
+    """The most recent patient whose normalised name equals ``full_name``'s."""
+    from .models import Patient
+
+    key = normalize_name(full_name)
+    if not key:
+        return None
+    return Patient.objects.filter(search_name=key).order_by('-created_at').first()
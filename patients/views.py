@@ -1,17 +1,20 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
 
 from accounts.utils import role_required
+from klinika_project.pagination import keyset_page
 from .models import Patient
 from .forms import PatientForm
+from .search import asearch_patients
 
 
 @login_required
 @role_required(['creator', 'admin', 'admin1', 'staff'])
 def patient_list(request):
-    patients = Patient.objects.order_by('-created_at')[:200]
-    return render(request, 'patients/patient_list.html', {'patients': patients})
+    page = keyset_page(request, Patient.objects.all(), ('-created_at', '-id'), per_page=200)
+    return render(request, 'patients/patient_list.html', {'patients': page, 'page': page})
 
 
 @login_required
@@ -27,5 +30,25 @@ def patient_create(request):
         form = PatientForm()
     return render(request, 'patients/patient_form.html', {'form': form})
 
+
+@login_required
+@role_required(['creator', 'admin', 'admin1', 'staff'])
+async def patient_search(request):
+    """Autocomplete for the booking form: ?q=<name>[&limit=N] -> JSON."""
+    q = (request.GET.get('q') or '').strip()
+    try:
+        limit = int(request.GET.get('limit') or 10)
+    except ValueError:
+        limit = 10
+    # Called on every keystroke: async, so under ASGI it does not hold a worker
+    found = await asearch_patients(q, limit) if len(q) >= 2 else []
+    results = [{
+        'id': p['id'],
+        'full_name': p['full_name'],
+        'phone': p['phone'],
+        'birth_date': p['birth_date'].isoformat() if p['birth_date'] else '',
+    } for p in found]
+    return JsonResponse({'q': q, 'results': results})
+
 from django.contrib import messages  # duplicate import removed above
 from django.shortcuts import redirect  # duplicate import removed above
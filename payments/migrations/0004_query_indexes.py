@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0006_query_indexes'),
+        ('payments', '0003_expenserequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expenserequest',
+            index=models.Index(fields=['status', '-created_at'], name='expense_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserequest',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['approved_at'], name='expense_approved_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserequest',
+            index=models.Index(fields=['requested_by', '-created_at'], name='expense_requester_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['-created_at'], name='payment_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 20:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expenserequest',
+            name='expense_status_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='expenserequest',
+            name='expense_requester_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expenserequest',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='expense_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expenserequest',
+            index=models.Index(fields=['requested_by', '-created_at', '-id'], name='expense_requester_created_idx'),
+        ),
+    ]
@@ -1,6 +1,5 @@
 from django.db import models
 from django.conf import settings
-from django.utils.crypto import get_random_string
 from appointments.models import Appointment
 
 
@@ -19,7 +18,8 @@ class Payment(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.receipt_no:
-            self.receipt_no = get_random_string(10).upper()
+            from .utils import next_receipt_no
+            self.receipt_no = next_receipt_no()
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -28,6 +28,10 @@ class Payment(models.Model):
     class Meta:
         verbose_name = "To'lov"
         verbose_name_plural = "To'lovlar"
+        indexes = [
+            # Finance/Admin 3 reports: created_at range scans, newest first
+            models.Index(fields=['-created_at'], name='payment_created_at_idx'),
+        ]
 
 
 class ExpenseStatus(models.TextChoices):
@@ -49,6 +53,15 @@ class ExpenseRequest(models.Model):
         verbose_name = "Xarajat so'rovi"
         verbose_name_plural = "Xarajat so'rovlari"
         ordering = ['-created_at']
+        indexes = [
+            # Review page: WHERE status = ? ORDER BY -created_at, -id
+            models.Index(fields=['status', '-created_at', '-id'], name='expense_status_created_idx'),
+            # Finance: approved expenses by approved_at range
+            models.Index(fields=['approved_at'], name='expense_approved_at_idx',
+                         condition=models.Q(status='approved')),
+            # "My requests": WHERE requested_by_id = ? ORDER BY -created_at, -id
+            models.Index(fields=['requested_by', '-created_at', '-id'], name='expense_requester_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.amount} — {self.get_status_display()}"
@@ -0,0 +1,172 @@
+"""Cached PDF rendering for receipts.
+
+A receipt never changes once its data is fixed, so the PDF produced by
+WeasyPrint is stored in the media storage under
+``receipts/<doc_type>/<object id>/<version>.pdf``. The version is a hash of
+the rendered HTML, so any change that affects the document (a new price,
+edited clinic settings, a template change) yields a new version and the old
+file is simply no longer used; ``get_pdf`` removes it when it stores the new
+one, and ``invalidate`` drops the files of deleted documents.
+Responses carry an ETag/Last-Modified pair so browsers can revalidate with a
+304 instead of downloading the PDF again.
+"""
+import hashlib
+import logging
+import threading
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = 'receipts'
+
+
+def _enabled():
+    return getattr(settings, 'RECEIPT_CACHE_ENABLED', True)
+
+
+def _version(html):
+    return hashlib.sha256(html.encode('utf-8')).hexdigest()[:20]
+
+
+def _dir(doc_type, obj_id):
+    return f"{CACHE_DIR}/{doc_type}/{obj_id}"
+
+
+def _write_pdf(html):
+    from weasyprint import HTML
+    return HTML(string=html).write_pdf()
+
+
+_weasyprint = None
+
+
+def weasyprint_available():
+    global _weasyprint
+    if _weasyprint is None:
+        try:
+            import weasyprint  # noqa: F401
+            _weasyprint = True
+        except Exception:
+            _weasyprint = False
+    return _weasyprint
+
+
+def get_pdf(doc_type, obj_id, html):
+    """Return (pdf bytes, version, last modified datetime or None).
+
+    Raises whatever WeasyPrint raises if it is unavailable.
+    """
+    version = _version(html)
+    if not _enabled():
+        return _write_pdf(html), version, None
+    path = f"{_dir(doc_type, obj_id)}/{version}.pdf"
+    try:
+        if default_storage.exists(path):
+            with default_storage.open(path, 'rb') as fh:
+                return fh.read(), version, default_storage.get_modified_time(path)
+    except Exception:
+        logger.exception("Receipt cache: failed to read %s", path)
+    pdf = _write_pdf(html)
+    try:
+        invalidate(doc_type, obj_id)  # drop outdated versions of this document
+        default_storage.save(path, ContentFile(pdf))
+        return pdf, version, default_storage.get_modified_time(path)
+    except Exception:
+        logger.exception("Receipt cache: failed to store %s", path)
+        return pdf, version, None
+
+
+def pdf_response(request, doc_type, obj_id, html, filename):
+    """Serve the receipt PDF (cached) or the HTML if WeasyPrint is unavailable."""
+    version = _version(html)
+    etag = f'"{doc_type}-{obj_id}-{version}"'
+    # The version is known before rendering, so revalidation is answered
+    # without touching WeasyPrint or the storage
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        pdf, version, modified = get_pdf(doc_type, obj_id, html)
+    except Exception:
+        return HttpResponse(html)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    response['ETag'] = etag
+    if modified is not None:
+        response['Last-Modified'] = http_date(modified.astimezone(dt_timezone.utc).timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def invalidate(doc_type=None, obj_id=None):
+    """Delete cached PDFs: one document, all of a type, or everything."""
+    if doc_type and obj_id is not None:
+        prefix = _dir(doc_type, obj_id)
+    elif doc_type:
+        prefix = f"{CACHE_DIR}/{doc_type}"
+    else:
+        prefix = CACHE_DIR
+    try:
+        _delete_tree(prefix)
+    except Exception:
+        logger.exception("Receipt cache: failed to invalidate %s", prefix)
+
+
+def _delete_tree(prefix):
+    if not default_storage.exists(prefix):
+        return
+    dirs, files = default_storage.listdir(prefix)
+    for name in files:
+        default_storage.delete(f"{prefix}/{name}")
+    for name in dirs:
+        _delete_tree(f"{prefix}/{name}")
+
+
+# --- Payment receipt --------------------------------------------------------
+
+def payment_receipt_context(payment, setting, auto=False):
+    return {
+        'payment': payment,
+        'appointment': payment.appointment,
+        'doctor': payment.appointment.doctor,
+        'patient': payment.appointment.patient,
+        'setting': setting,
+        'auto_print': auto,
+    }
+
+
+def payment_receipt_html(payment, setting, auto=False):
+    return render_to_string('payments/receipt.html', payment_receipt_context(payment, setting, auto))
+
+
+def warm_payment_receipt(payment_id):
+    """Render and store the PDF receipt of a payment (runs off the request path)."""
+    from dashboard.clinic import get_setting
+    from .models import Payment
+    try:
+        payment = (Payment.objects
+                   .select_related('appointment__doctor', 'appointment__patient')
+                   .get(pk=payment_id))
+        get_pdf('payment', payment.pk, payment_receipt_html(payment, get_setting()))
+    except Exception:
+        logger.exception("Receipt cache: warm-up failed for payment %s", payment_id)
+    finally:
+        connection.close()
+
+
+def schedule_warmup(payment_id):
+    """Warm the payment receipt in a background thread after the commit."""
+    if not _enabled() or not getattr(settings, 'RECEIPT_CACHE_WARMUP', True) or not weasyprint_available():
+        return
+    transaction.on_commit(
+        lambda: threading.Thread(target=warm_payment_receipt, args=(payment_id,), daemon=True).start()
+    )
@@ -0,0 +1,46 @@
+"""Receipt cache maintenance: warm new payment receipts, drop PDFs of deleted
+documents.
+
+Edits need no invalidation: a cached file is named by the hash of the
+receipt's HTML, so a changed receipt is rendered anew and ``get_pdf`` then
+removes the old version. Keeping storage I/O out of these receivers keeps it
+out of the booking and pricing transactions.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from appointments.models import Appointment
+from dashboard.models import Setting
+
+from . import receipts
+from .models import Payment
+
+
+@receiver(post_save, sender=Payment, dispatch_uid='receipts_payment_saved')
+def _payment_saved(sender, instance, created, **kwargs):
+    receipts.schedule_warmup(instance.pk)
+
+
+@receiver(post_delete, sender=Payment, dispatch_uid='receipts_payment_deleted')
+def _payment_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: receipts.invalidate('payment', pk))
+
+
+@receiver(post_delete, sender=Appointment, dispatch_uid='receipts_appointment_deleted')
+def _appointment_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+
+    def drop():
+        receipts.invalidate('appointment', pk)
+        receipts.invalidate('price', pk)
+    transaction.on_commit(drop)
+
+
+@receiver(post_save, sender=Setting, dispatch_uid='receipts_setting_saved')
+def _setting_saved(sender, instance, update_fields=None, **kwargs):
+    # Counter bumps and cleanup dates do not appear on receipts
+    if update_fields is not None and set(update_fields) <= {'receipt_serial', 'last_cleanup'}:
+        return
+    receipts.invalidate()
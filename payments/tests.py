@@ -0,0 +1,48 @@
+from datetime import time as dtime
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from appointments.models import Appointment
+from dashboard.models import Setting
+from doctors.models import Doctor
+from patients.models import Patient
+
+from . import receipts
+from .models import Payment
+
+
+class ReceiptCacheSignalTests(TestCase):
+
+    def setUp(self):
+        Setting.objects.get_or_create(pk=1)  # its first save clears the whole cache
+        doctor = Doctor.objects.create(full_name='Kvitansiya Shifokor', department='Terapiya',
+                                       phone='+998900000000', room_number='1')
+        patient = Patient.objects.create(full_name='Kvitansiya Bemor', phone='')
+        self.appointment = Appointment.objects.create(doctor=doctor, patient=patient,
+                                                      date=timezone.localdate(), time=dtime(9, 0))
+
+    def test_edits_do_not_touch_storage(self):
+        with mock.patch.object(receipts, 'invalidate') as invalidate, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.appointment.service_price = Decimal('50000')
+            self.appointment.save()
+            payment = Payment.objects.create(appointment=self.appointment, amount=Decimal('50000'), method='cash')
+            payment.amount = Decimal('40000')
+            payment.save()
+        invalidate.assert_not_called()
+
+    def test_deletes_drop_files_after_commit(self):
+        payment = Payment.objects.create(appointment=self.appointment, amount=Decimal('50000'), method='cash')
+        pk = self.appointment.pk
+        with mock.patch.object(receipts, 'invalidate') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.appointment.delete()
+                invalidate.assert_not_called()
+        self.assertCountEqual(invalidate.call_args_list, [
+            mock.call('payment', payment.pk),
+            mock.call('appointment', pk),
+            mock.call('price', pk),
+        ])
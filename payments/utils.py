@@ -17,3 +17,56 @@ def qr_base64(data: str):
     b64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
     return f"data:image/png;base64,{b64}"
 
+
+
+def local_day_range(start, end):
+    """Return aware datetimes [start 00:00, day after end 00:00) in local time.
+
+    Filtering with ``created_at__gte``/``__lt`` on these bounds can use a plain
+    index on the datetime column, unlike ``created_at__date`` lookups.
+    """
+    from datetime import datetime, time, timedelta
+    from django.utils import timezone
+    tz = timezone.get_current_timezone()
+    lo = timezone.make_aware(datetime.combine(start, time.min), tz)
+    hi = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+    return lo, hi
+
+
+_receipt_numbers = None
+
+
+def receipt_number_allocator():
+    """Process-wide allocator for ``Setting.receipt_serial`` (Payment.receipt_no)."""
+    global _receipt_numbers
+    if _receipt_numbers is None:
+        from django.conf import settings
+        from klinika_project.sequences import SequenceAllocator
+        from dashboard.models import Setting
+        _receipt_numbers = SequenceAllocator(Setting, 'receipt_serial',
+                                             block=getattr(settings, 'SEQUENCE_BLOCK_SIZE', 1))
+    return _receipt_numbers
+
+
+def next_receipt_no():
+    """Return a new ``Payment.receipt_no`` like ``261018-0007``.
+
+    The serial comes from ``Setting.receipt_serial``; the date prefix keeps
+    numbers unique after the creator resets the counter. If the counter was
+    reset twice on the same day and the number is already taken, a random
+    code is used instead.
+    """
+    from django.utils import timezone
+    from django.utils.crypto import get_random_string
+    from dashboard.models import Setting
+    from .models import Payment
+
+    allocator = receipt_number_allocator()
+    serial = allocator.next(1)
+    if serial is None:
+        Setting.objects.get_or_create(pk=1)
+        serial = allocator.next(1)
+    candidate = f"{timezone.localdate():%y%m%d}-{serial:04d}"
+    if Payment.objects.filter(receipt_no=candidate).exists():
+        return get_random_string(10).upper()
+    return candidate
@@ -7,9 +7,14 @@ from django.utils import timezone
 
 from accounts.utils import role_required
 from appointments.models import Appointment
+from klinika_project.pagination import keyset_page
 from .models import Payment, ExpenseRequest, ExpenseStatus
 from .forms import PaymentForm, ExpenseRequestForm
 from .utils import qr_base64
+from .receipts import payment_receipt_html, pdf_response
+
+# Expense lists page through requests newest first (see klinika_project.pagination)
+EXPENSE_ORDER = ('-created_at', '-id')
 
 
 @login_required
@@ -55,38 +60,21 @@ def payment_create(request, appointment_id):
 @login_required
 @role_required(['creator', 'admin', 'admin3'])
 def receipt_pdf(request, payment_id):
-    payment = get_object_or_404(Payment, pk=payment_id)
+    payment = get_object_or_404(
+        Payment.objects.select_related('appointment__doctor', 'appointment__patient'), pk=payment_id)
     # Load optional clinic settings
     try:
-        from dashboard.models import Setting
-        setting = Setting.objects.first()
+        from dashboard.clinic import get_setting
+        setting = get_setting()
     except Exception:
         setting = None
     auto = request.GET.get('auto') == '1'
-    context = {
-        'payment': payment,
-        'appointment': payment.appointment,
-        'doctor': payment.appointment.doctor,
-        'patient': payment.appointment.patient,
-        'setting': setting,
-        'auto_print': auto,
-    }
-    # Render HTML
-    from django.template.loader import render_to_string
-    html = render_to_string('payments/receipt.html', context)
+    html = payment_receipt_html(payment, setting, auto)
     # If auto requested, return HTML so JS can print and close
     if auto:
         return HttpResponse(html)
-    # Otherwise generate PDF inline if possible
-    try:
-        from weasyprint import HTML
-        pdf = HTML(string=html).write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="receipt_{payment.receipt_no}.pdf"'
-        return response
-    except Exception:
-        # Fallback: return HTML inline
-        return HttpResponse(html)
+    # Otherwise serve the (cached) PDF inline, or the HTML without WeasyPrint
+    return pdf_response(request, 'payment', payment.pk, html, f"receipt_{payment.receipt_no}.pdf")
 
 
 # Expenses
@@ -104,8 +92,9 @@ def expenses_request(request):
             return redirect('payments:expenses_request')
     else:
         form = ExpenseRequestForm()
-    my_requests = ExpenseRequest.objects.filter(requested_by=request.user).order_by('-created_at')[:100]
-    return render(request, 'payments/expenses_request.html', {'form': form, 'items': my_requests})
+    page = keyset_page(request, ExpenseRequest.objects.filter(requested_by=request.user),
+                       EXPENSE_ORDER, per_page=100)
+    return render(request, 'payments/expenses_request.html', {'form': form, 'items': page, 'page': page})
 
 
 @login_required
@@ -132,6 +121,10 @@ def expenses_review(request):
             obj.save(update_fields=['status', 'approved_by', 'approved_at'])
             messages.warning(request, 'Xarajat so\'rovi rad etildi')
         return redirect('payments:expenses_review')
-    pending = ExpenseRequest.objects.filter(status=ExpenseStatus.PENDING).select_related('requested_by')[:200]
-    recent = ExpenseRequest.objects.exclude(status=ExpenseStatus.PENDING).select_related('requested_by')[:200]
+    pending = keyset_page(request,
+                          ExpenseRequest.objects.filter(status=ExpenseStatus.PENDING).select_related('requested_by'),
+                          EXPENSE_ORDER, per_page=200, param='pending')
+    recent = keyset_page(request,
+                         ExpenseRequest.objects.exclude(status=ExpenseStatus.PENDING).select_related('requested_by'),
+                         EXPENSE_ORDER, per_page=200, param='recent')
     return render(request, 'payments/expenses_review.html', {'pending': pending, 'recent': recent})